@@ -0,0 +1,106 @@
+# --- ANÁLISES EM LOTE (COLUNAR) ---
+# Calcula IMC e faturamento de todos os registros de uma vez. Usa NumPy quando
+# estiver instalado; sem NumPy cai no cálculo em Python puro, com os mesmos
+# resultados (as somas seguem a ordem das matrículas nos dois caminhos).
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+LIMITES_IMC = (18.5, 25, 30)
+DIAGNOSTICOS_IMC = ("Abaixo do peso", "Peso normal", "Sobrepeso", "Obesidade")
+
+def numpy_disponivel():
+    return np is not None
+
+def _diagnostico(imc):
+    if imc < 18.5: return DIAGNOSTICOS_IMC[0]
+    elif imc < 25: return DIAGNOSTICOS_IMC[1]
+    elif imc < 30: return DIAGNOSTICOS_IMC[2]
+    return DIAGNOSTICOS_IMC[3]
+
+def calcular_imc_lote(pesos, alturas, usar_numpy=True):
+    # Devolve (lista de imc, lista de diagnósticos), como calcular_imc faz
+    # para um aluno só.
+    if np is None or not usar_numpy:
+        imcs, diagnosticos = [], []
+        for peso, altura in zip(pesos, alturas):
+            if altura == 0:
+                imcs.append(0)
+                diagnosticos.append("Altura inválida")
+            else:
+                imc = peso / (altura * altura)
+                imcs.append(imc)
+                diagnosticos.append(_diagnostico(imc))
+        return imcs, diagnosticos
+
+    pesos = np.asarray(pesos, dtype=np.float64)
+    alturas = np.asarray(alturas, dtype=np.float64)
+    quadrado = alturas * alturas
+    invalida = alturas == 0
+    imcs = np.divide(pesos, quadrado, out=np.zeros_like(pesos), where=~invalida)
+    faixas = np.searchsorted(np.array(LIMITES_IMC, dtype=np.float64), imcs, side="right")
+    rotulos = np.array(DIAGNOSTICOS_IMC + ("Altura inválida",), dtype=object)
+    faixas[invalida] = len(DIAGNOSTICOS_IMC)
+    return imcs.tolist(), rotulos[faixas].tolist()
+
+class ColunasAcademia:
+    # Matrículas em colunas (arrays NumPy ou listas). As chaves estrangeiras
+    # já vêm convertidas nos valores usados no agrupamento (valor da aula,
+    # professor e cidade do aluno).
+
+    def __init__(self, dados, usar_numpy=True):
+        self.usar_numpy = np is not None and usar_numpy
+        alunos = dados["alunos"]
+        modalidades = dados["modalidades"]
+        matriculas = dados["matriculas"].values()
+
+        valor_aula, professor, cidade = [], [], []
+        for mat in matriculas:
+            mod = modalidades.get(mat.cod_modalidade)
+            aluno = alunos.get(mat.cod_aluno)
+            valor_aula.append(mod.valor_aula if mod is not None else 0.0)
+            professor.append(mod.cod_professor if mod is not None else 0)
+            cidade.append(aluno.cod_cidade if aluno is not None else 0)
+        self.mat_modalidade = [mat.cod_modalidade for mat in matriculas]
+        self.mat_qtde = [mat.qtde_aulas for mat in matriculas]
+        self.mat_valor_aula = valor_aula
+        self.mat_professor = professor
+        self.mat_cidade = cidade
+
+        if self.usar_numpy:
+            self.mat_valor_aula = np.asarray(self.mat_valor_aula, dtype=np.float64)
+            for nome in ("mat_modalidade", "mat_qtde", "mat_professor", "mat_cidade"):
+                setattr(self, nome, np.asarray(getattr(self, nome), dtype=np.int64))
+
+    def _agrupar(self, chaves, valores):
+        if not self.usar_numpy:
+            grupos = {}
+            for chave, valor in zip(chaves, valores):
+                grupos[chave] = grupos.get(chave, 0.0) + valor
+            return grupos
+        if len(chaves) == 0:
+            return {}
+        # bincount soma na ordem de entrada, igual ao laço em Python.
+        unicos, posicoes = np.unique(chaves, return_inverse=True)
+        somas = np.bincount(posicoes, weights=valores, minlength=len(unicos))
+        return dict(zip(unicos.tolist(), somas.tolist()))
+
+    def faturamento(self):
+        if self.usar_numpy:
+            valores = self.mat_qtde.astype(np.float64) * self.mat_valor_aula
+            total = float(np.bincount(np.zeros(len(valores), dtype=np.int64),
+                                      weights=valores, minlength=1)[0])
+        else:
+            valores = [q * v for q, v in zip(self.mat_qtde, self.mat_valor_aula)]
+            total = 0.0
+            for valor in valores:
+                total += valor
+        return {
+            "por_modalidade": self._agrupar(self.mat_modalidade, valores),
+            "por_professor": self._agrupar(self.mat_professor, valores),
+            "por_cidade": self._agrupar(self.mat_cidade, valores),
+            "total": total,
+            "total_matriculas": len(valores)
+        }
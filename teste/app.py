@@ -1,16 +1,255 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+import cProfile
+import os
+import re
+import time
+from flask import (Flask, Response, render_template, request, redirect, url_for, flash, jsonify, abort,
+                   g, session, get_flashed_messages, stream_with_context, before_render_template, template_rendered)
+from markupsafe import Markup
+from werkzeug.local import LocalProxy
 import gestao_academia_lib as lib
-from forms import CidadeForm, AlunoForm, ProfessorForm, ModalidadeForm, MatriculaForm
+import metricas
+import unidades
+from cache_respostas import CacheRespostas, Entrada
+from exportacao import FORMATOS, comprimir_gzip
+from forms import CidadeForm, AlunoForm, ProfessorForm, ModalidadeForm, MatriculaForm, MatriculaLoteForm
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'sua-chave-secreta-aqui-12345'
 
-lib.carregar_dados()
+# /metrics e o perfilamento (?perfilar=1 ou cabeçalho X-Perfilar: 1) só
+# atendem requisições da própria máquina.
+app.config['ENDERECOS_LOCAIS'] = ('127.0.0.1', '::1')
+app.config['DIRETORIO_PERFIS'] = 'perfis'
+
+# Cache das páginas de relatório e das tabelas das listagens (ver
+# cache_respostas.py), limitado em MB; 0 desliga. Com CACHE_RESPOSTAS_GZIP
+# os relatórios também ficam guardados já comprimidos.
+app.config['CACHE_RESPOSTAS_BYTES'] = int(os.environ.get('ACADEMIA_CACHE_RESPOSTAS_MB', '32')) * 1024 * 1024
+app.config['CACHE_RESPOSTAS_GZIP'] = os.environ.get('ACADEMIA_CACHE_RESPOSTAS_GZIP', '1') != '0'
+cache = CacheRespostas(app.config['CACHE_RESPOSTAS_BYTES'])
+
+# Com carga sob demanda cada tabela é lida no primeiro uso (ver lib.configuracao).
+# Com ACADEMIA_UNIDADES (ver unidades.py) cada filial tem a sua instância da
+# biblioteca e `lib` passa a apontar para a unidade escolhida na requisição.
+if unidades.DIRETORIO:
+    unidades.carregar()
+    unidades.preparar()
+    lib = LocalProxy(lambda: unidades.instancias[g.unidade])
+else:
+    lib.preparar_dados()
+
+# --- Métricas e perfilamento ---
+metricas.descrever("academia_http_requisicao_segundos", "histogram", "Latência das requisições por rota (até a resposta ser montada).")
+metricas.descrever("academia_http_requisicoes_total", "counter", "Requisições atendidas por rota, método e status.")
+metricas.descrever("academia_template_segundos", "histogram", "Tempo de renderização dos templates Jinja.")
+metricas.descrever("academia_registros", "gauge", "Registros em memória por tabela.")
+metricas.descrever("academia_memoria_bytes", "gauge", "Memória aproximada de cada tabela e dos seus índices.")
+metricas.descrever("academia_tabela_carregada", "gauge", "1 se a tabela já foi lida do disco.")
+
+def _requisicao_local():
+    return request.remote_addr in app.config['ENDERECOS_LOCAIS']
+
+@app.before_request
+def _iniciar_medicao():
+    g.inicio_requisicao = time.perf_counter()
+    perfilar = request.args.get('perfilar') == '1' or request.headers.get('X-Perfilar') == '1'
+    if perfilar and _requisicao_local():
+        g.perfil = cProfile.Profile()
+        g.perfil.enable()
+
+@app.before_request
+def _escolher_unidade():
+    # Unidade da requisição: ?unidade= (fica gravada na sessão), cabeçalho
+    # X-Unidade, a última escolhida ou a primeira.
+    if not unidades.instancias:
+        return
+    nome = request.args.get('unidade') or request.headers.get('X-Unidade')
+    if nome is None:
+        nome = session.get('unidade')
+        if nome not in unidades.instancias:
+            nome = unidades.padrao()
+    elif nome not in unidades.instancias:
+        abort(404)
+    elif 'unidade' in request.args:
+        session['unidade'] = nome
+    g.unidade = nome
+
+@app.context_processor
+def _contexto_unidades():
+    return {'unidades_disponiveis': list(unidades.instancias), 'unidade_atual': g.get('unidade')}
+
+@app.after_request
+def _registrar_medicao(resposta):
+    rota = request.url_rule.rule if request.url_rule else 'desconhecida'
+    perfil = g.pop('perfil', None)
+    if perfil is not None:
+        # Em respostas em fluxo o perfil cobre só até a resposta ser montada.
+        perfil.disable()
+        os.makedirs(app.config['DIRETORIO_PERFIS'], exist_ok=True)
+        nome = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'desconhecida'}-{os.getpid()}-{time.perf_counter_ns()}.prof"
+        caminho = os.path.join(app.config['DIRETORIO_PERFIS'], nome)
+        perfil.dump_stats(caminho)
+        resposta.headers['X-Perfil'] = caminho
+    metricas.observar("academia_http_requisicao_segundos", time.perf_counter() - g.inicio_requisicao,
+                      rota=rota, metodo=request.method)
+    metricas.incrementar("academia_http_requisicoes_total", rota=rota, metodo=request.method,
+                         status=resposta.status_code)
+    return resposta
+
+def _antes_do_template(remetente, template, context, **extra):
+    g.setdefault('inicio_templates', []).append(time.perf_counter())
+
+def _depois_do_template(remetente, template, context, **extra):
+    inicio = g.inicio_templates.pop()
+    metricas.observar("academia_template_segundos", time.perf_counter() - inicio, template=template.name)
+
+before_render_template.connect(_antes_do_template, app)
+template_rendered.connect(_depois_do_template, app)
+
+@app.route('/metrics')
+def metrics():
+    if not _requisicao_local():
+        abort(404)
+    if unidades.instancias:
+        estados = unidades.estado_carga()["unidades"]
+    else:
+        estados = {None: lib.estado_carga()}
+    for unidade, estado in estados.items():
+        rotulos = {'unidade': unidade} if unidade else {}
+        for tabela, item in estado["tabelas"].items():
+            metricas.definir("academia_registros", item["registros"], tabela=tabela, **rotulos)
+            metricas.definir("academia_memoria_bytes", item["memoria_bytes"], tabela=tabela, **rotulos)
+            metricas.definir("academia_tabela_carregada", int(item["carregada"]), tabela=tabela, **rotulos)
+    return Response(metricas.exportar_texto(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/pronto')
+def pronto():
+    # Prontidão para o balanceador: 503 enquanto a pré-carga não termina.
+    estado = unidades.estado_carga() if unidades.instancias else lib.estado_carga()
+    return jsonify(estado), 200 if estado["pronta"] else 503
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+# --- Cache de respostas ---
+def _chave_cache(tipo):
+    parametros = tuple(sorted((nome, valor) for nome, valor in request.args.items(multi=True)
+                              if nome not in ('perfilar', 'unidade')))
+    return tipo, request.endpoint, g.get('unidade'), parametros
+
+def _usar_cache():
+    # Mensagens flash pendentes e perfilamento pedem uma renderização nova.
+    return '_flashes' not in session and 'perfil' not in g
+
+def _listagem(tabela):
+    # Filtro, tabela e paginação de uma listagem. Sem formulário (token CSRF)
+    # nem mensagens, o trecho é igual para todos e pode vir do cache. A versão
+    # é lida antes dos dados: se algo mudar no meio, a próxima leitura vê
+    # outra versão e gera de novo.
+    versao = lib.versao_dados(lib.dependencias_detalhe[tabela])
+    chave = _chave_cache('listagem')
+    entrada = cache.obter(chave, versao) if 'perfil' not in g else None
+    if entrada is None:
+        pagina = lib.get_pagina(tabela, **_parametros_lista())
+        entrada = Entrada(versao, Markup(render_template(f'_lista_{tabela}.html', pagina=pagina,
+                                                         **{tabela: pagina['itens']})))
+        cache.guardar(chave, entrada)
+    return entrada.corpo
+
+def _resposta_em_cache(versao, modificado_em, gerar_partes):
+    # Páginas de relatório: na primeira vez o corpo vai em fluxo para o
+    # cliente e, se couber, é guardado no cache ao final (também em gzip).
+    # Depois sai do cache. As duas levam ETag e Last-Modified (a data em que
+    # os dados mudaram); se o navegador já tem esta versão, responde 304.
+    usar = _usar_cache()
+    etag = "-".join(filter(None, (request.endpoint, g.get('unidade'), versao)))
+    chave = _chave_cache('resposta')
+    entrada = cache.obter(chave, versao) if usar else None
+    if entrada is None:
+        if not usar:
+            return Response(stream_with_context(gerar_partes()), mimetype='text/html')
+        if request.if_none_match.contains(etag) or request.if_none_match.contains(etag + '.gz'):
+            resposta = Response(status=304)
+            etag_cliente = etag + '.gz' if request.if_none_match.contains(etag + '.gz') else etag
+            return _cabecalhos_cache(resposta, etag_cliente, modificado_em)
+        resposta = Response(stream_with_context(_enviar_e_guardar(chave, versao, modificado_em, gerar_partes())),
+                            mimetype='text/html')
+        return _cabecalhos_cache(resposta, etag, modificado_em)
+    comprimir = entrada.corpo_gzip is not None and request.accept_encodings['gzip'] > 0
+    resposta = Response(entrada.corpo_gzip if comprimir else entrada.corpo, mimetype='text/html')
+    if comprimir:
+        resposta.headers['Content-Encoding'] = 'gzip'
+    _cabecalhos_cache(resposta, etag + '.gz' if comprimir else etag, entrada.modificado_em)
+    return resposta.make_conditional(request)
+
+def _cabecalhos_cache(resposta, etag, modificado_em):
+    resposta.set_etag(etag)
+    resposta.last_modified = modificado_em
+    resposta.headers['Vary'] = 'Accept-Encoding'
+    resposta.cache_control.no_cache = True
+    return resposta
+
+def _enviar_e_guardar(chave, versao, modificado_em, partes):
+    # Repassa cada parte assim que é gerada, sem esperar o corpo inteiro, e
+    # guarda o corpo no cache só se a resposta foi até o fim e coube.
+    lidas = []
+    tamanho = 0
+    for parte in partes:
+        yield parte
+        if lidas is not None:
+            tamanho += len(parte)
+            if tamanho > cache.maximo_entrada:
+                lidas = None
+            else:
+                lidas.append(parte)
+    if lidas is not None:
+        corpo = "".join(lidas)
+        corpo_gzip = b"".join(comprimir_gzip([corpo])) if app.config['CACHE_RESPOSTAS_GZIP'] else None
+        cache.guardar(chave, Entrada(versao, corpo.encode('utf-8'), corpo_gzip, modificado_em))
+
+# --- Paginação e opções dos selects ---
+def _parametros_lista():
+    return {
+        'pagina': request.args.get('pagina', 1, type=int),
+        'por_pagina': min(max(request.args.get('por_pagina', 50, type=int), 1), 200),
+        'ordenar_por': request.args.get('ordem', 'cod'),
+        'decrescente': request.args.get('desc', 0, type=int) == 1,
+        'filtro': request.args.get('q', '').strip()
+    }
+
+def _opcoes(tabela, campo):
+    # Só as primeiras opções vão no HTML; o resto vem pelo autocompletar.
+    # O valor já escolhido (num POST com erro) continua aparecendo.
+    opcoes = lib.get_opcoes(tabela, limite=50)
+    if campo.data and all(cod != campo.data for cod, _ in opcoes):
+        opcoes = lib.get_opcoes(tabela, str(campo.data), limite=1)[:1] + opcoes
+    return opcoes
+
+@app.route('/api/<tabela>/opcoes')
+def api_opcoes(tabela):
+    if tabela not in lib.arquivos:
+        abort(404)
+    limite = min(max(request.args.get('limite', 20, type=int), 1), 100)
+    opcoes = lib.get_opcoes(tabela, request.args.get('q', '').strip(), limite)
+    return jsonify([{'id': cod, 'texto': texto} for cod, texto in opcoes])
+
+# --- Busca por nome ---
+@app.route('/busca')
+def busca():
+    termo = request.args.get('q', '').strip()
+    resultados = lib.buscar_nomes(termo) if termo else {}
+    return render_template('busca.html', termo=termo, resultados=resultados)
+
+@app.route('/api/busca')
+def api_busca():
+    termo = request.args.get('q', '').strip()
+    tabelas = request.args.getlist('tabela') or None
+    limite = min(max(request.args.get('limite', 20, type=int), 1), 100)
+    resultados = lib.buscar_nomes(termo, tabelas, limite) if termo else {}
+    return jsonify({tabela: [{'id': cod, 'texto': texto} for cod, texto in itens]
+                    for tabela, itens in resultados.items()})
+
 # --- Rotas de Cidades ---
 @app.route('/cidades', methods=['GET', 'POST'])
 def cidades():
@@ -20,8 +259,7 @@ def cidades():
         flash(msg, 'success' if sucesso else 'danger')
         return redirect(url_for('cidades'))
     
-    lista_cidades = lib.get_todas_cidades()
-    return render_template('cidades.html', cidades=lista_cidades, form=form)
+    return render_template('cidades.html', listagem=_listagem('cidades'), form=form)
 
 @app.route('/cidades/excluir/<int:cod>')
 def excluir_cidade(cod):
@@ -33,7 +271,7 @@ def excluir_cidade(cod):
 @app.route('/alunos', methods=['GET', 'POST'])
 def alunos():
     form = AlunoForm()
-    form.cod_cidade.choices = [(c[0], f"{c[1]} - {c[2]}") for c in lib.get_todas_cidades()]
+    form.cod_cidade.choices = _opcoes('cidades', form.cod_cidade)
     
     if form.validate_on_submit():
         sucesso, msg = lib.incluir_aluno(
@@ -43,8 +281,7 @@ def alunos():
         flash(msg, 'success' if sucesso else 'danger')
         return redirect(url_for('alunos'))
 
-    lista_alunos = lib.get_todos_alunos_detalhado()
-    return render_template('alunos.html', alunos=lista_alunos, form=form)
+    return render_template('alunos.html', listagem=_listagem('alunos'), form=form)
 
 @app.route('/alunos/excluir/<int:cod>')
 def excluir_aluno(cod):
@@ -56,7 +293,7 @@ def excluir_aluno(cod):
 @app.route('/professores', methods=['GET', 'POST'])
 def professores():
     form = ProfessorForm()
-    form.cod_cidade.choices = [(c[0], f"{c[1]} - {c[2]}") for c in lib.get_todas_cidades()]
+    form.cod_cidade.choices = _opcoes('cidades', form.cod_cidade)
 
     if form.validate_on_submit():
         sucesso, msg = lib.incluir_professor(
@@ -66,8 +303,7 @@ def professores():
         flash(msg, 'success' if sucesso else 'danger')
         return redirect(url_for('professores'))
 
-    lista_professores = lib.get_todos_professores_detalhado()
-    return render_template('professores.html', professores=lista_professores, form=form)
+    return render_template('professores.html', listagem=_listagem('professores'), form=form)
 
 @app.route('/professores/excluir/<int:cod>')
 def excluir_professor(cod):
@@ -79,7 +315,7 @@ def excluir_professor(cod):
 @app.route('/modalidades', methods=['GET', 'POST'])
 def modalidades():
     form = ModalidadeForm()
-    form.cod_professor.choices = [(p['cod_professor'], p['nome']) for p in lib.get_todos_professores_detalhado()]
+    form.cod_professor.choices = _opcoes('professores', form.cod_professor)
 
     if form.validate_on_submit():
         sucesso, msg = lib.incluir_modalidade(
@@ -89,8 +325,7 @@ def modalidades():
         flash(msg, 'success' if sucesso else 'danger')
         return redirect(url_for('modalidades'))
 
-    lista_modalidades = lib.get_todas_modalidades_detalhado()
-    return render_template('modalidades.html', modalidades=lista_modalidades, form=form)
+    return render_template('modalidades.html', listagem=_listagem('modalidades'), form=form)
 
 @app.route('/modalidades/excluir/<int:cod>')
 def excluir_modalidade(cod):
@@ -102,8 +337,8 @@ def excluir_modalidade(cod):
 @app.route('/matriculas', methods=['GET', 'POST'])
 def matriculas():
     form = MatriculaForm()
-    form.cod_aluno.choices = [(a['cod_aluno'], a['nome']) for a in lib.get_todos_alunos_detalhado()]
-    form.cod_modalidade.choices = [(m['cod_modalidade'], m['descricao']) for m in lib.get_todas_modalidades_detalhado()]
+    form.cod_aluno.choices = _opcoes('alunos', form.cod_aluno)
+    form.cod_modalidade.choices = _opcoes('modalidades', form.cod_modalidade)
 
     if form.validate_on_submit():
         sucesso, msg = lib.incluir_matricula(
@@ -113,8 +348,47 @@ def matriculas():
         flash(msg, 'success' if sucesso else 'danger')
         return redirect(url_for('matriculas'))
 
-    lista_matriculas = lib.get_todas_matriculas_detalhado()
-    return render_template('matriculas.html', matriculas=lista_matriculas, form=form)
+    return render_template('matriculas.html', listagem=_listagem('matriculas'), form=form)
+
+@app.route('/matriculas/lote', methods=['GET', 'POST'])
+def matriculas_lote():
+    form = MatriculaLoteForm()
+    form.cod_modalidade.choices = _opcoes('modalidades', form.cod_modalidade)
+    resultados = None
+
+    if form.validate_on_submit():
+        alunos = [int(cod) for cod in re.split(r'[\s,;]+', form.alunos.data.strip()) if cod]
+        cod_inicial = form.cod_inicial.data
+        itens = [(cod_inicial + i if cod_inicial else None, cod_aluno,
+                  form.cod_modalidade.data, form.qtde_aulas.data)
+                 for i, cod_aluno in enumerate(alunos)]
+        sucesso, msg, por_item = lib.incluir_matriculas_em_lote(itens)
+        flash(msg, 'success' if sucesso else 'danger')
+        if sucesso:
+            return redirect(url_for('matriculas'))
+        resultados = [{'cod_aluno': cod_aluno, 'cod_matricula': cod, 'ok': ok, 'mensagem': mensagem}
+                      for cod_aluno, (cod, ok, mensagem) in zip(alunos, por_item)]
+
+    return render_template('matriculas_lote.html', form=form, resultados=resultados)
+
+@app.route('/api/matriculas/lote', methods=['POST'])
+def api_matriculas_lote():
+    # {"itens": [{"cod_matricula": opcional, "cod_aluno", "cod_modalidade", "qtde_aulas"}]}
+    corpo = request.get_json(silent=True) or {}
+    try:
+        itens = [(None if item.get('cod_matricula') is None else int(item['cod_matricula']),
+                  int(item['cod_aluno']), int(item['cod_modalidade']), int(item['qtde_aulas']))
+                 for item in corpo.get('itens', [])]
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return jsonify({'sucesso': False, 'mensagem': 'Itens inválidos.'}), 400
+    if any(qtde < 1 for *_, qtde in itens):
+        return jsonify({'sucesso': False, 'mensagem': 'Deve haver pelo menos 1 aula em cada item.'}), 400
+    sucesso, msg, por_item = lib.incluir_matriculas_em_lote(itens)
+    return jsonify({
+        'sucesso': sucesso,
+        'mensagem': msg,
+        'resultados': [{'cod_matricula': cod, 'ok': ok, 'mensagem': mensagem} for cod, ok, mensagem in por_item]
+    }), 200 if sucesso else 409
 
 @app.route('/matriculas/excluir/<int:cod>')
 def excluir_matricula(cod):
@@ -125,16 +399,66 @@ def excluir_matricula(cod):
 # --- Rotas de Relatórios ---
 @app.route('/relatorio/faturamento')
 def relatorio_faturamento():
-    dados_faturamento = lib.get_relatorio_faturamento()
-    return render_template('relatorio_faturamento.html', faturamento=dados_faturamento)
+    tabelas = ("modalidades", "professores", "matriculas")
+    return _resposta_em_cache(
+        lib.versao_dados(tabelas), lib.modificado_em(tabelas),
+        lambda: [render_template('relatorio_faturamento.html', faturamento=lib.get_relatorio_faturamento())])
+
+@app.route('/relatorio/rede')
+def relatorio_rede():
+    # Totais somados de todas as unidades (só no modo com várias unidades).
+    if not unidades.instancias:
+        abort(404)
+    return _resposta_em_cache(
+        unidades.versao_rede(), unidades.modificado_em_rede(),
+        lambda: [render_template('relatorio_rede.html', rede=unidades.relatorio_rede())])
 
 @app.route('/relatorio/matriculas_geral')
 def relatorio_matriculas_geral():
-    dados_relatorio = lib.get_relatorio_matriculas_ordenado()
-    return render_template('relatorio_matriculas.html', 
-                           matriculas=dados_relatorio['matriculas'], 
-                           total_matriculas=dados_relatorio['total_matriculas'],
-                           valor_total_geral=dados_relatorio['valor_total_geral'])
+    apos = request.args.get('apos', type=int)
+    limite = request.args.get('limite', type=int)
+
+    def gerar():
+        relatorio = lib.RelatorioMatriculas(apos, limite)
+        return _partes_template('relatorio_matriculas.html', matriculas=relatorio,
+                                relatorio=relatorio, limite=limite)
+    tabelas = tuple(lib.arquivos)
+    return _resposta_em_cache(lib.versao_dados(tabelas), lib.modificado_em(tabelas), gerar)
+
+def _partes_template(nome_template, **contexto):
+    # Gera o HTML conforme o template é renderizado (Template.stream), em
+    # blocos de algumas dezenas de trechos para não fazer uma escrita por
+    # célula. As mensagens flash são lidas antes, enquanto a sessão ainda pode
+    # ser gravada no cabeçalho da resposta.
+    get_flashed_messages(with_categories=True)
+    app.update_template_context(contexto)
+    fluxo = app.jinja_env.get_template(nome_template).stream(contexto)
+    fluxo.enable_buffering(64)
+    return fluxo
+
+# --- Exportação (CSV / NDJSON) ---
+@app.route('/exportar/<nome>.<formato>')
+def exportar(nome, formato):
+    if nome not in lib.EXPORTACOES or formato not in FORMATOS:
+        abort(404)
+    campos, gerar_linhas, tabelas = lib.EXPORTACOES[nome]
+    comprimir = request.accept_encodings['gzip'] > 0
+    etag = f"{nome}.{formato}{'.gz' if comprimir else ''}-{lib.versao_dados(tabelas)}"
+    if request.if_none_match.contains(etag):
+        resposta = Response(status=304)
+    else:
+        gerar, mimetype = FORMATOS[formato]
+        corpo = gerar(campos, gerar_linhas())
+        if comprimir:
+            corpo = comprimir_gzip(corpo)
+        resposta = Response(stream_with_context(corpo), mimetype=mimetype)
+        resposta.headers['Content-Disposition'] = f'attachment; filename={nome}.{formato}'
+        if comprimir:
+            resposta.headers['Content-Encoding'] = 'gzip'
+    resposta.set_etag(etag)
+    resposta.last_modified = lib.modificado_em(tabelas)
+    resposta.headers['Vary'] = 'Accept-Encoding'
+    return resposta
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# --- BANCO COMPARTILHADO ENTRE PROCESSOS (SQLITE EM MODO WAL) ---
+# Guarda as linhas de todas as tabelas (no mesmo formato ';' dos .txt) e um
+# histórico de alterações numerado (seq). Cada processo mantém as tabelas em
+# memória e, pelo seq, aplica só o que os outros processos alteraram desde a
+# última sincronização. BEGIN IMMEDIATE serve de trava de escrita entre os
+# processos.
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS registros (
+    tabela TEXT NOT NULL,
+    chave INTEGER NOT NULL,
+    linha TEXT NOT NULL,
+    PRIMARY KEY (tabela, chave)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS alteracoes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    tabela TEXT NOT NULL,
+    chave INTEGER NOT NULL,
+    operacao TEXT NOT NULL,
+    linha TEXT
+);
+"""
+
+class BancoCompartilhado:
+    def __init__(self, caminho, espera_trava=30.0):
+        self.caminho = caminho
+        self.espera_trava = espera_trava
+        self._local = threading.local()
+        self._conexao().executescript(ESQUEMA)
+
+    def _conexao(self):
+        # Uma conexão por thread e por processo (conexões não podem
+        # atravessar um fork).
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None or self._local.pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=self.espera_trava,
+                                      isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+            self._local.pid = os.getpid()
+        return conexao
+
+    @contextmanager
+    def transacao(self):
+        conexao = self._conexao()
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        conexao.execute("COMMIT")
+
+    @contextmanager
+    def leitura(self):
+        # Transação só de leitura: enxerga um retrato consistente do banco.
+        conexao = self._conexao()
+        conexao.execute("BEGIN")
+        try:
+            yield
+        finally:
+            conexao.execute("COMMIT")
+
+    def vazio(self):
+        linha = self._conexao().execute("SELECT 1 FROM registros LIMIT 1").fetchone()
+        return linha is None
+
+    def ultima_seq(self):
+        linha = self._conexao().execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'alteracoes'").fetchone()
+        return linha[0] if linha else 0
+
+    def menor_seq(self):
+        linha = self._conexao().execute("SELECT MIN(seq) FROM alteracoes").fetchone()
+        return linha[0]
+
+    def linhas(self, tabela):
+        cursor = self._conexao().execute(
+            "SELECT linha FROM registros WHERE tabela = ? ORDER BY chave", (tabela,))
+        for (linha,) in cursor:
+            yield linha
+
+    def gravar(self, tabela, chave, linha):
+        conexao = self._conexao()
+        conexao.execute("INSERT OR REPLACE INTO registros (tabela, chave, linha) VALUES (?, ?, ?)",
+                        (tabela, chave, linha))
+        conexao.execute("INSERT INTO alteracoes (tabela, chave, operacao, linha) VALUES (?, ?, 'G', ?)",
+                        (tabela, chave, linha))
+
+    def excluir(self, tabela, chave):
+        conexao = self._conexao()
+        conexao.execute("DELETE FROM registros WHERE tabela = ? AND chave = ?", (tabela, chave))
+        conexao.execute("INSERT INTO alteracoes (tabela, chave, operacao, linha) VALUES (?, ?, 'E', NULL)",
+                        (tabela, chave))
+
+    def importar(self, tabela, pares):
+        # Carga inicial (a partir dos .txt); não entra no histórico.
+        self._conexao().executemany(
+            "INSERT OR REPLACE INTO registros (tabela, chave, linha) VALUES (?, ?, ?)",
+            ((tabela, chave, linha) for chave, linha in pares))
+
+    def alteracoes_desde(self, seq):
+        return self._conexao().execute(
+            "SELECT seq, tabela, chave, operacao, linha FROM alteracoes WHERE seq > ? ORDER BY seq",
+            (seq,)).fetchall()
+
+    def podar(self, manter):
+        # Mantém só as `manter` alterações mais recentes. Um processo que
+        # ficar para trás disso recarrega tudo.
+        limite = self.ultima_seq() - manter
+        if limite > 0:
+            self._conexao().execute("DELETE FROM alteracoes WHERE seq <= ?", (limite,))
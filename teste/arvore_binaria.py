@@ -74,4 +74,454 @@ class ArvoreBinariaBusca:
         if no:
             self._in_order_traversal(no.esquerda, chaves)
             chaves.append(no.chave)
-            self._in_order_traversal(no.direita, chaves)
\ No newline at end of file
+            self._in_order_traversal(no.direita, chaves)
+
+# --- ÁRVORE AVL (AUTO-BALANCEADA) ---
+# Mesma API da ArvoreBinariaBusca, mas mantém altura O(log n) mesmo com
+# chaves inseridas em ordem crescente. Todas as operações são iterativas.
+# Cada nó guarda também o tamanho da sua subárvore, usado por posicao/selecionar.
+
+class NoAVL:
+    __slots__ = ("chave", "esquerda", "direita", "altura", "tamanho")
+
+    def __init__(self, chave):
+        self.chave = chave
+        self.esquerda = None
+        self.direita = None
+        self.altura = 1
+        self.tamanho = 1
+
+def _altura(no):
+    return no.altura if no is not None else 0
+
+def _tamanho(no):
+    return no.tamanho if no is not None else 0
+
+def _atualizar_altura(no):
+    esq, dir = no.esquerda, no.direita
+    he = esq.altura if esq is not None else 0
+    hd = dir.altura if dir is not None else 0
+    no.altura = (he if he > hd else hd) + 1
+    no.tamanho = (esq.tamanho if esq is not None else 0) + (dir.tamanho if dir is not None else 0) + 1
+
+def _rotacionar_direita(no):
+    novo = no.esquerda
+    no.esquerda = novo.direita
+    novo.direita = no
+    _atualizar_altura(no)
+    _atualizar_altura(novo)
+    return novo
+
+def _rotacionar_esquerda(no):
+    novo = no.direita
+    no.direita = novo.esquerda
+    novo.esquerda = no
+    _atualizar_altura(no)
+    _atualizar_altura(novo)
+    return novo
+
+def _balancear(no):
+    _atualizar_altura(no)
+    fator = _altura(no.esquerda) - _altura(no.direita)
+    if fator > 1:
+        if _altura(no.esquerda.esquerda) < _altura(no.esquerda.direita):
+            no.esquerda = _rotacionar_esquerda(no.esquerda)
+        return _rotacionar_direita(no)
+    if fator < -1:
+        if _altura(no.direita.direita) < _altura(no.direita.esquerda):
+            no.direita = _rotacionar_direita(no.direita)
+        return _rotacionar_esquerda(no)
+    return no
+
+class ArvoreAVL(ArvoreBinariaBusca):
+    def __init__(self):
+        self.raiz = None
+        self.quantidade = 0
+
+    def __len__(self):
+        return self.quantidade
+
+    def inserir(self, chave):
+        if self.raiz is None:
+            self.raiz = NoAVL(chave)
+            self.quantidade = 1
+            return
+        caminho = []
+        no_atual = self.raiz
+        while no_atual is not None:
+            if chave == no_atual.chave:
+                return
+            caminho.append(no_atual)
+            no_atual = no_atual.esquerda if chave < no_atual.chave else no_atual.direita
+        pai = caminho[-1]
+        if chave < pai.chave:
+            pai.esquerda = NoAVL(chave)
+        else:
+            pai.direita = NoAVL(chave)
+        self.quantidade += 1
+        self._rebalancear_caminho(caminho)
+
+    def buscar(self, chave):
+        no_atual = self.raiz
+        while no_atual is not None:
+            if chave == no_atual.chave:
+                return True
+            no_atual = no_atual.esquerda if chave < no_atual.chave else no_atual.direita
+        return False
+
+    def remover(self, chave):
+        caminho = []
+        no_atual = self.raiz
+        while no_atual is not None and no_atual.chave != chave:
+            caminho.append(no_atual)
+            no_atual = no_atual.esquerda if chave < no_atual.chave else no_atual.direita
+        if no_atual is None:
+            return
+
+        if no_atual.esquerda is not None and no_atual.direita is not None:
+            # Copia o sucessor para o nó e passa a remover o sucessor.
+            caminho.append(no_atual)
+            sucessor = no_atual.direita
+            while sucessor.esquerda is not None:
+                caminho.append(sucessor)
+                sucessor = sucessor.esquerda
+            no_atual.chave = sucessor.chave
+            no_atual = sucessor
+
+        filho = no_atual.esquerda if no_atual.esquerda is not None else no_atual.direita
+        if not caminho:
+            self.raiz = filho
+        else:
+            pai = caminho[-1]
+            if pai.esquerda is no_atual:
+                pai.esquerda = filho
+            else:
+                pai.direita = filho
+        self.quantidade -= 1
+        self._rebalancear_caminho(caminho)
+
+    def _rebalancear_caminho(self, caminho):
+        for i in range(len(caminho) - 1, -1, -1):
+            no = caminho[i]
+            novo = _balancear(no)
+            if novo is not no:
+                if i == 0:
+                    self.raiz = novo
+                elif caminho[i - 1].esquerda is no:
+                    caminho[i - 1].esquerda = novo
+                else:
+                    caminho[i - 1].direita = novo
+
+    def obter_chaves_em_ordem(self):
+        chaves = []
+        pilha = []
+        no = self.raiz
+        while pilha or no is not None:
+            while no is not None:
+                pilha.append(no)
+                no = no.esquerda
+            no = pilha.pop()
+            chaves.append(no.chave)
+            no = no.direita
+        return chaves
+
+    def construir_de_ordenadas(self, chaves):
+        # Constrói a árvore em O(n) a partir de chaves já ordenadas e sem
+        # repetição (ex.: as chaves lidas de um arquivo salvo por salvar_dados).
+        chaves = list(chaves)
+
+        def construir(inicio, fim):
+            if inicio > fim:
+                return None
+            meio = (inicio + fim) // 2
+            no = NoAVL(chaves[meio])
+            no.esquerda = construir(inicio, meio - 1)
+            no.direita = construir(meio + 1, fim)
+            _atualizar_altura(no)
+            return no
+
+        self.raiz = construir(0, len(chaves) - 1)
+        self.quantidade = len(chaves)
+        return self
+
+    # --- CONSULTAS ORDENADAS ---
+
+    def iterar_em_ordem(self, inicio=None, inclusivo=True):
+        # Gera as chaves em ordem a partir de `inicio` sem montar a lista
+        # inteira: O(log n) para posicionar e O(1) amortizado por chave.
+        pilha = []
+        no = self.raiz
+        if inicio is None:
+            while no is not None:
+                pilha.append(no)
+                no = no.esquerda
+        else:
+            while no is not None:
+                if no.chave > inicio or (inclusivo and no.chave == inicio):
+                    pilha.append(no)
+                    no = no.esquerda
+                else:
+                    no = no.direita
+        while pilha:
+            no = pilha.pop()
+            yield no.chave
+            no = no.direita
+            while no is not None:
+                pilha.append(no)
+                no = no.esquerda
+
+    def iterar_decrescente(self, inicio=None):
+        # Como iterar_em_ordem, mas do maior para o menor, a partir das
+        # chaves <= `inicio`.
+        pilha = []
+        no = self.raiz
+        while no is not None:
+            if inicio is None or no.chave <= inicio:
+                pilha.append(no)
+                no = no.direita
+            else:
+                no = no.esquerda
+        while pilha:
+            no = pilha.pop()
+            yield no.chave
+            no = no.esquerda
+            while no is not None:
+                pilha.append(no)
+                no = no.direita
+
+    def iterar_intervalo(self, minimo=None, maximo=None):
+        for chave in self.iterar_em_ordem(minimo):
+            if maximo is not None and chave > maximo:
+                return
+            yield chave
+
+    def piso(self, chave):
+        # Maior chave <= chave, ou None.
+        resultado = None
+        no = self.raiz
+        while no is not None:
+            if no.chave == chave:
+                return chave
+            if no.chave < chave:
+                resultado = no.chave
+                no = no.direita
+            else:
+                no = no.esquerda
+        return resultado
+
+    def teto(self, chave):
+        # Menor chave >= chave, ou None.
+        resultado = None
+        no = self.raiz
+        while no is not None:
+            if no.chave == chave:
+                return chave
+            if no.chave > chave:
+                resultado = no.chave
+                no = no.esquerda
+            else:
+                no = no.direita
+        return resultado
+
+    def posicao(self, chave):
+        # Quantidade de chaves menores que `chave` (rank).
+        posicao = 0
+        no = self.raiz
+        while no is not None:
+            if chave <= no.chave:
+                no = no.esquerda
+            else:
+                posicao += _tamanho(no.esquerda) + 1
+                no = no.direita
+        return posicao
+
+    def selecionar(self, indice):
+        # Chave na posição `indice` (0 = menor chave).
+        if indice < 0 or indice >= self.quantidade:
+            raise IndexError("posição fora da árvore")
+        no = self.raiz
+        while True:
+            tamanho_esq = _tamanho(no.esquerda)
+            if indice < tamanho_esq:
+                no = no.esquerda
+            elif indice == tamanho_esq:
+                return no.chave
+            else:
+                indice -= tamanho_esq + 1
+                no = no.direita
+
+    def paginar(self, apos=None, limite=50):
+        # Paginação por chave: até `limite` chaves estritamente maiores que `apos`.
+        pagina = []
+        if limite <= 0:
+            return pagina
+        for chave in self.iterar_em_ordem(apos, inclusivo=False):
+            pagina.append(chave)
+            if len(pagina) >= limite:
+                break
+        return pagina
+
+# --- ÁRVORE PERSISTENTE (CÓPIA DO CAMINHO) ---
+# Variante da ArvoreAVL que guarda um valor em cada chave e nunca altera um
+# nó depois de ele estar na árvore: inserir e remover copiam só os nós do
+# caminho até a raiz (e os das rotações) e trocam a raiz. Assim,
+# instantaneo() é O(1) — uma árvore que compartilha a raiz atual e não vê
+# as alterações seguintes — e quem lê não precisa de trava.
+
+class NoPersistente(NoAVL):
+    __slots__ = ("valor",)
+
+    def __init__(self, chave, valor=None):
+        super().__init__(chave)
+        self.valor = valor
+
+def _copiar(no):
+    copia = NoPersistente(no.chave, no.valor)
+    copia.esquerda = no.esquerda
+    copia.direita = no.direita
+    copia.altura = no.altura
+    copia.tamanho = no.tamanho
+    return copia
+
+# As funções abaixo recebem um nó já copiado (ainda fora da árvore) e copiam
+# os demais nós que precisam alterar.
+
+def _rotacionar_direita_copiando(no):
+    novo = _copiar(no.esquerda)
+    no.esquerda = novo.direita
+    novo.direita = no
+    _atualizar_altura(no)
+    _atualizar_altura(novo)
+    return novo
+
+def _rotacionar_esquerda_copiando(no):
+    novo = _copiar(no.direita)
+    no.direita = novo.esquerda
+    novo.esquerda = no
+    _atualizar_altura(no)
+    _atualizar_altura(novo)
+    return novo
+
+def _balancear_copiando(no):
+    _atualizar_altura(no)
+    fator = _altura(no.esquerda) - _altura(no.direita)
+    if fator > 1:
+        if _altura(no.esquerda.esquerda) < _altura(no.esquerda.direita):
+            no.esquerda = _rotacionar_esquerda_copiando(_copiar(no.esquerda))
+        return _rotacionar_direita_copiando(no)
+    if fator < -1:
+        if _altura(no.direita.direita) < _altura(no.direita.esquerda):
+            no.direita = _rotacionar_direita_copiando(_copiar(no.direita))
+        return _rotacionar_esquerda_copiando(no)
+    return no
+
+def _inserir_copiando(no, chave, valor):
+    # Devolve (nova raiz da subárvore, True se a chave é nova).
+    if no is None:
+        return NoPersistente(chave, valor), True
+    copia = _copiar(no)
+    if chave == no.chave:
+        copia.valor = valor
+        return copia, False
+    if chave < no.chave:
+        copia.esquerda, nova = _inserir_copiando(no.esquerda, chave, valor)
+    else:
+        copia.direita, nova = _inserir_copiando(no.direita, chave, valor)
+    return (_balancear_copiando(copia) if nova else copia), nova
+
+def _remover_minimo_copiando(no):
+    # Devolve (nova raiz da subárvore, nó removido).
+    if no.esquerda is None:
+        return no.direita, no
+    copia = _copiar(no)
+    copia.esquerda, minimo = _remover_minimo_copiando(no.esquerda)
+    return _balancear_copiando(copia), minimo
+
+def _remover_copiando(no, chave):
+    # Devolve (nova raiz da subárvore, True se a chave existia).
+    if no is None:
+        return None, False
+    if chave != no.chave:
+        filho = no.esquerda if chave < no.chave else no.direita
+        novo_filho, removida = _remover_copiando(filho, chave)
+        if not removida:
+            return no, False
+        copia = _copiar(no)
+        if chave < no.chave:
+            copia.esquerda = novo_filho
+        else:
+            copia.direita = novo_filho
+        return _balancear_copiando(copia), True
+    if no.esquerda is None:
+        return no.direita, True
+    if no.direita is None:
+        return no.esquerda, True
+    # O sucessor toma o lugar do nó removido.
+    direita, sucessor = _remover_minimo_copiando(no.direita)
+    copia = NoPersistente(sucessor.chave, sucessor.valor)
+    copia.esquerda = no.esquerda
+    copia.direita = direita
+    return _balancear_copiando(copia), True
+
+class ArvorePersistente(ArvoreAVL):
+    def inserir(self, chave, valor=None):
+        # Inclui a chave ou troca o valor dela.
+        self.raiz, nova = _inserir_copiando(self.raiz, chave, valor)
+        if nova:
+            self.quantidade += 1
+
+    def remover(self, chave):
+        self.raiz, removida = _remover_copiando(self.raiz, chave)
+        if removida:
+            self.quantidade -= 1
+
+    def obter(self, chave, padrao=None):
+        no_atual = self.raiz
+        while no_atual is not None:
+            if chave == no_atual.chave:
+                return no_atual.valor
+            no_atual = no_atual.esquerda if chave < no_atual.chave else no_atual.direita
+        return padrao
+
+    def construir_de_ordenadas(self, chaves, valores=None):
+        # Como na ArvoreAVL; `valores` acompanha `chaves` posição a posição.
+        chaves = list(chaves)
+        valores = list(valores) if valores is not None else [None] * len(chaves)
+
+        def construir(inicio, fim):
+            if inicio > fim:
+                return None
+            meio = (inicio + fim) // 2
+            no = NoPersistente(chaves[meio], valores[meio])
+            no.esquerda = construir(inicio, meio - 1)
+            no.direita = construir(meio + 1, fim)
+            _atualizar_altura(no)
+            return no
+
+        self.raiz = construir(0, len(chaves) - 1)
+        self.quantidade = len(chaves)
+        return self
+
+    def instantaneo(self):
+        copia = ArvorePersistente()
+        copia.raiz = self.raiz
+        copia.quantidade = self.quantidade
+        return copia
+
+    def iterar_itens(self, inicio=None, inclusivo=True):
+        # Pares (chave, valor) em ordem, como iterar_em_ordem.
+        pilha = []
+        no = self.raiz
+        while no is not None:
+            if inicio is None or no.chave > inicio or (inclusivo and no.chave == inicio):
+                pilha.append(no)
+                no = no.esquerda
+            else:
+                no = no.direita
+        while pilha:
+            no = pilha.pop()
+            yield no.chave, no.valor
+            no = no.direita
+            while no is not None:
+                pilha.append(no)
+                no = no.esquerda
@@ -0,0 +1,6 @@
+# --- BENCHMARKS ---
+# gerador.py gera as tabelas sintéticas; cenarios.py mede as operações.
+# Uso (de dentro de teste/):
+#   python -m benchmarks --matriculas 100000 --saida resultado.json
+#   python -m benchmarks --matriculas 100000 --comparar resultado.json
+#   python -m benchmarks.gerador destino --matriculas 1000000 --aleatorio
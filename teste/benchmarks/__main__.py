@@ -0,0 +1,121 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.cenarios import GRUPOS
+from benchmarks.gerador import gerar_dados
+
+# --- EXECUÇÃO DOS BENCHMARKS ---
+# Gera os dados num diretório próprio, importa a aplicação lá dentro (os
+# .txt são lidos do diretório atual) e grava os resultados em JSON. Com
+# --comparar, mostra a razão entre as medianas e sai com código 1 se algum
+# cenário ficou mais lento que a tolerância.
+
+DIRETORIO_APLICACAO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def comparar(base, atual, tolerancia):
+    for chave in ("matriculas", "aleatorio", "persistencia", "repeticoes"):
+        if base["meta"].get(chave) != atual["meta"][chave]:
+            print(f"  Atenção: {chave} diferente ({base['meta'].get(chave)} -> {atual['meta'][chave]})")
+    regressoes = []
+    for nome, medida in atual["resultados"].items():
+        anterior = base["resultados"].get(nome)
+        if anterior is None:
+            print(f"  {nome}: novo ({medida['mediana'] * 1000:.2f} ms)")
+            continue
+        razao = medida["mediana"] / anterior["mediana"] if anterior["mediana"] else float("inf")
+        marca = ""
+        if razao > 1 + tolerancia:
+            marca = "  <-- REGRESSÃO"
+            regressoes.append(nome)
+        print(f"  {nome}: {anterior['mediana'] * 1000:.2f} ms -> {medida['mediana'] * 1000:.2f} ms "
+              f"({razao:.2f}x){marca}")
+    return regressoes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Mede carga, escrita, relatórios e rotas da academia.")
+    parser.add_argument("--matriculas", type=int, default=10000)
+    parser.add_argument("--aleatorio", action="store_true", help="códigos embaralhados e fora de ordem")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--persistencia", choices=("texto", "diario", "sqlite", "binario"), default="texto")
+    parser.add_argument("--grupos", nargs="+", choices=list(GRUPOS), default=list(GRUPOS))
+    parser.add_argument("--dados", help="diretório dos dados gerados (mantido ao final)")
+    parser.add_argument("--saida", help="arquivo JSON de resultados (padrão: saída padrão)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    destino = os.path.abspath(args.dados or tempfile.mkdtemp(prefix="academia-bench-"))
+    saida = os.path.abspath(args.saida) if args.saida else None
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+
+    inicio = time.perf_counter()
+    quantidades = gerar_dados(destino, args.matriculas, args.aleatorio, args.semente)
+    tempo_geracao = time.perf_counter() - inicio
+
+    diretorio_original = os.getcwd()
+    os.chdir(destino)
+    os.environ["ACADEMIA_PERSISTENCIA"] = args.persistencia
+    # Os cenários medem a partir dos dados todos em memória.
+    os.environ["ACADEMIA_CARGA_SOB_DEMANDA"] = "0"
+    os.environ["ACADEMIA_BANCO"] = os.path.join(destino, "academia.db")
+    sys.path.insert(0, DIRETORIO_APLICACAO)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import gestao_academia_lib as lib
+            import app
+            from analise import numpy_disponivel
+        resultados = {}
+        for grupo in args.grupos:
+            print(f"Executando {grupo}...", file=sys.stderr)
+            resultados.update(GRUPOS[grupo](lib, app, args.repeticoes))
+    finally:
+        os.chdir(diretorio_original)
+        if not args.dados:
+            shutil.rmtree(destino, ignore_errors=True)
+
+    relatorio = {
+        "meta": {
+            "matriculas": args.matriculas,
+            "quantidades": quantidades,
+            "aleatorio": args.aleatorio,
+            "semente": args.semente,
+            "repeticoes": args.repeticoes,
+            "persistencia": args.persistencia,
+            "numpy": numpy_disponivel(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "tempo_geracao": tempo_geracao
+        },
+        "resultados": resultados
+    }
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if saida:
+        with open(saida, 'w', encoding='utf-8') as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+    if base is not None:
+        print("Comparação com", args.comparar, file=sys.stderr)
+        with contextlib.redirect_stdout(sys.stderr):
+            regressoes = comparar(base, relatorio, args.tolerancia)
+        if regressoes:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
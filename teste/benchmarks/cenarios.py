@@ -0,0 +1,241 @@
+import contextlib
+import io
+import statistics
+import time
+
+# --- CENÁRIOS CRONOMETRADOS ---
+# Cada grupo recebe os módulos já importados (lib e app) e devolve
+# {nome do cenário: estatísticas em segundos}.
+
+def _estatisticas(tempos):
+    return {
+        "repeticoes": len(tempos),
+        "min": min(tempos),
+        "mediana": statistics.median(tempos),
+        "media": statistics.fmean(tempos),
+        "max": max(tempos)
+    }
+
+def medir(funcao, repeticoes, preparar=None):
+    tempos = []
+    for i in range(repeticoes):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcao(i)
+        tempos.append(time.perf_counter() - inicio)
+    return _estatisticas(tempos)
+
+def _conferir(resultado):
+    sucesso, msg = resultado
+    if not sucesso:
+        raise RuntimeError(f"Cenário falhou: {msg}")
+
+def _silencioso(funcao):
+    def executar(*args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return funcao(*args)
+    return executar
+
+def _proximo_codigo(lib, tabela):
+    indice = lib.indices[tabela]
+    return indice.selecionar(len(indice) - 1) + 1 if len(indice) else 1
+
+def cenarios_carga(lib, app, repeticoes):
+    carregar = _silencioso(lambda i: lib.carregar_dados())
+    resultados = {}
+    usar_instantaneo = lib.configuracao["instantaneo"]
+    lib.configuracao["instantaneo"] = False
+    resultados["carregar_dados texto"] = medir(carregar, repeticoes)
+    if lib.configuracao["persistencia"] != "sqlite":
+        # A primeira carga com instantâneo grava os .snap; as seguintes os leem.
+        lib.configuracao["instantaneo"] = True
+        carregar(0)
+        resultados["carregar_dados instantaneo"] = medir(carregar, repeticoes)
+    lib.configuracao["instantaneo"] = usar_instantaneo
+    if lib.configuracao["persistencia"] != "sqlite":
+        # Inicialização sob demanda até a primeira página de cidades.
+        sob_demanda = lib.configuracao["carga_sob_demanda"]
+        lib.configuracao["carga_sob_demanda"] = True
+        preparar = _silencioso(lambda i: (lib.preparar_dados(), lib.get_pagina("cidades")))
+        resultados["preparar_dados sob demanda + /cidades"] = medir(preparar, repeticoes)
+        lib.configuracao["carga_sob_demanda"] = sob_demanda
+        carregar(0)
+    return resultados
+
+def cenarios_escrita(lib, app, repeticoes):
+    # Inclui e exclui um registro de cada tabela por repetição, com códigos
+    # acima dos existentes, deixando os dados como estavam.
+    cidade = lib.indices["cidades"].selecionar(0)
+    professor = lib.indices["professores"].selecionar(0)
+    base = {tabela: _proximo_codigo(lib, tabela) for tabela in lib.arquivos}
+    operacoes = [
+        ("incluir_cidade", lambda i: lib.incluir_cidade(base["cidades"] + i, "Cidade Teste", "SP")),
+        ("incluir_professor", lambda i: lib.incluir_professor(base["professores"] + i, "Professor Teste",
+                                                              "Rua Teste, 1", "18999999999", cidade)),
+        ("incluir_modalidade", lambda i: lib.incluir_modalidade(base["modalidades"] + i, "Modalidade Teste",
+                                                                professor, 50.0, 10)),
+        ("incluir_aluno", lambda i: lib.incluir_aluno(base["alunos"] + i, "Aluno Teste", cidade,
+                                                      "01/01/2000", 70.0, 1.75)),
+        ("incluir_matricula", lambda i: lib.incluir_matricula(base["matriculas"] + i, base["alunos"] + i,
+                                                              base["modalidades"] + i, 4)),
+        ("excluir_matricula", lambda i: lib.excluir_matricula(base["matriculas"] + i)),
+        ("excluir_aluno", lambda i: lib.excluir_aluno(base["alunos"] + i)),
+        ("excluir_modalidade", lambda i: lib.excluir_modalidade(base["modalidades"] + i)),
+        ("excluir_professor", lambda i: lib.excluir_professor(base["professores"] + i)),
+        ("excluir_cidade", lambda i: lib.excluir_cidade(base["cidades"] + i))
+    ]
+    tempos = {nome: [] for nome, _ in operacoes}
+    for i in range(repeticoes):
+        for nome, operacao in operacoes:
+            inicio = time.perf_counter()
+            resultado = operacao(i)
+            tempos[nome].append(time.perf_counter() - inicio)
+            _conferir(resultado)
+    return {nome: _estatisticas(valores) for nome, valores in tempos.items()}
+
+def cenarios_relatorios(lib, app, repeticoes):
+    # Antes de cada medição as versões mudam, para não medir só o cache.
+    invalidar = lambda: lib._marcar_alteracao("matriculas")
+    return {
+        "get_relatorio_faturamento": medir(lambda i: lib.get_relatorio_faturamento(), repeticoes, invalidar),
+        "get_relatorio_matriculas_ordenado": medir(lambda i: lib.get_relatorio_matriculas_ordenado(),
+                                                   repeticoes, invalidar),
+        "RelatorioMatriculas (fluxo)": medir(lambda i: sum(1 for _ in lib.RelatorioMatriculas()), repeticoes),
+        "get_faturamento_agrupado": medir(lambda i: lib.get_faturamento_agrupado(), repeticoes, invalidar)
+    }
+
+ROTAS_GET = [
+    "/",
+    "/cidades",
+    "/alunos",
+    "/alunos?ordem=nome&pagina=2",
+    "/alunos?q=silva",
+    "/professores",
+    "/modalidades",
+    "/matriculas",
+    "/busca?q=silva",
+    "/api/busca?q=sil",
+    "/api/alunos/opcoes?q=ana",
+    "/relatorio/faturamento",
+    "/relatorio/matriculas_geral?limite=50",
+    "/relatorio/matriculas_geral",
+    "/exportar/matriculas.csv",
+    "/exportar/relatorio_faturamento.ndjson",
+    "/matriculas/lote",
+    "/pronto",
+    "/metrics"
+]
+
+# Mesmas páginas sem mudar os dados entre as medições: acertos no cache de
+# respostas (app.cache).
+ROTAS_CACHE = [
+    "/cidades",
+    "/relatorio/faturamento",
+    "/relatorio/matriculas_geral?limite=50"
+]
+
+def _invalidar(lib, app):
+    # Todas as tabelas mudam de versão e o cache de respostas é esvaziado,
+    # para medir a renderização e não só o cache.
+    for tabela in lib.arquivos:
+        lib._marcar_alteracao(tabela)
+    app.cache.limpar()
+
+def cenarios_rotas(lib, app, repeticoes):
+    app.app.config['WTF_CSRF_ENABLED'] = False
+    cliente = app.app.test_client()
+    resultados = {}
+
+    def requisitar(url):
+        def executar(i):
+            resposta = cliente.get(url)
+            resposta.get_data()
+            if resposta.status_code != 200:
+                raise RuntimeError(f"GET {url} devolveu {resposta.status_code}")
+        return executar
+
+    for url in ROTAS_GET:
+        resultados[f"GET {url}"] = medir(requisitar(url), repeticoes, lambda: _invalidar(lib, app))
+    for url in ROTAS_CACHE:
+        requisitar(url)(0)
+        resultados[f"GET {url} (cache)"] = medir(requisitar(url), repeticoes)
+
+    # /relatorio/rede só existe com várias unidades; aqui a própria lib faz o
+    # papel de unidade única.
+    if not app.unidades.instancias:
+        app.unidades.instancias["rede"] = lib
+        try:
+            resultados["GET /relatorio/rede"] = medir(requisitar("/relatorio/rede"), repeticoes,
+                                                      lambda: _invalidar(lib, app))
+        finally:
+            app.unidades.instancias.clear()
+
+    # Inclusões e exclusões pelos formulários e pela API, na ordem em que
+    # dependem umas das outras; cada passo confere o efeito nos dados.
+    base = {tabela: _proximo_codigo(lib, tabela) for tabela in lib.arquivos}
+    tempos = {}
+    for i in range(repeticoes):
+        for rotulo, metodo, url, corpo, conferir in _passos_cadastro(lib, base, i):
+            inicio = time.perf_counter()
+            if metodo == "json":
+                resposta = cliente.post(url, json=corpo)
+            elif metodo == "post":
+                resposta = cliente.post(url, data=corpo)
+            else:
+                resposta = cliente.get(url)
+            resposta.get_data()
+            tempos.setdefault(rotulo, []).append(time.perf_counter() - inicio)
+            if not conferir():
+                raise RuntimeError(f"{rotulo} ({url}) não teve efeito: status {resposta.status_code}")
+    resultados.update((rotulo, _estatisticas(valores)) for rotulo, valores in tempos.items())
+    return resultados
+
+def _passos_cadastro(lib, base, i):
+    # (rótulo, método, url, formulário/JSON, conferência)
+    dados = lib.dados
+    cidade, aluno, professor, modalidade = (base[tabela] + i for tabela in
+                                            ("cidades", "alunos", "professores", "modalidades"))
+    matriculas = [base["matriculas"] + 3 * i + n for n in range(3)]
+    passos = [
+        ("POST /cidades", "post", "/cidades",
+         {"cod": cidade, "desc": "Cidade Rota", "uf": "SP"},
+         lambda: cidade in dados["cidades"]),
+        ("POST /alunos", "post", "/alunos",
+         {"cod_aluno": aluno, "nome": "Aluno Rota", "cod_cidade": cidade,
+          "data_nasc": "01/01/2000", "peso": 70, "altura": 1.75},
+         lambda: aluno in dados["alunos"]),
+        ("POST /professores", "post", "/professores",
+         {"cod_professor": professor, "nome": "Professor Rota", "endereco": "Rua Rota 1",
+          "telefone": "43999990000", "cod_cidade": cidade},
+         lambda: professor in dados["professores"]),
+        ("POST /modalidades", "post", "/modalidades",
+         {"cod_modalidade": modalidade, "descricao": "Modalidade Rota", "cod_professor": professor,
+          "valor_aula": 10, "limite_alunos": 10},
+         lambda: modalidade in dados["modalidades"]),
+        ("POST /matriculas", "post", "/matriculas",
+         {"cod_matricula": matriculas[0], "cod_aluno": aluno, "cod_modalidade": modalidade, "qtde_aulas": 2},
+         lambda: matriculas[0] in dados["matriculas"]),
+        ("POST /matriculas/lote", "post", "/matriculas/lote",
+         {"cod_inicial": matriculas[1], "alunos": str(aluno), "cod_modalidade": modalidade, "qtde_aulas": 2},
+         lambda: matriculas[1] in dados["matriculas"]),
+        ("POST /api/matriculas/lote", "json", "/api/matriculas/lote",
+         {"itens": [{"cod_matricula": matriculas[2], "cod_aluno": aluno,
+                     "cod_modalidade": modalidade, "qtde_aulas": 2}]},
+         lambda: matriculas[2] in dados["matriculas"])
+    ]
+    for cod in matriculas:
+        passos.append(("GET /matriculas/excluir/<cod>", "get", f"/matriculas/excluir/{cod}", None,
+                       lambda cod=cod: cod not in dados["matriculas"]))
+    for tabela, cod in (("modalidades", modalidade), ("professores", professor),
+                        ("alunos", aluno), ("cidades", cidade)):
+        passos.append((f"GET /{tabela}/excluir/<cod>", "get", f"/{tabela}/excluir/{cod}", None,
+                       lambda tabela=tabela, cod=cod: cod not in dados[tabela]))
+    return passos
+
+GRUPOS = {
+    "carga": cenarios_carga,
+    "escrita": cenarios_escrita,
+    "relatorios": cenarios_relatorios,
+    "rotas": cenarios_rotas
+}
@@ -0,0 +1,115 @@
+import argparse
+import math
+import os
+import random
+
+# --- GERADOR DE DADOS SINTÉTICOS ---
+# Escreve os cinco .txt no formato da aplicação, com proporções parecidas
+# com as de uma academia real. A mesma semente gera sempre os mesmos
+# arquivos. Com `aleatorio` as linhas ficam fora de ordem de código.
+
+PRIMEIROS_NOMES = ["Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Fábio", "Gabriela", "Heitor",
+                   "Isabela", "João", "Júlia", "Lucas", "Márcia", "Nícolas", "Otávio", "Patrícia",
+                   "Rafael", "Sofia", "Tiago", "Vitória", "José", "Maria", "Antônio", "Luíza"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira",
+              "Lima", "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho", "Araújo", "Melo",
+              "Barbosa", "Cardoso", "Conceição", "Gonçalves", "Zago", "Begosso"]
+CIDADES = [("Assis", "SP"), ("Londrina", "PR"), ("Marília", "SP"), ("Ourinhos", "SP"),
+           ("Maringá", "PR"), ("Bauru", "SP"), ("Cândido Mota", "SP"), ("Paraguaçu Paulista", "SP"),
+           ("Presidente Prudente", "SP"), ("Curitiba", "PR"), ("Cuiabá", "MT"), ("Goiânia", "GO"),
+           ("Belo Horizonte", "MG"), ("Uberlândia", "MG"), ("Florianópolis", "SC"), ("Joinville", "SC")]
+MODALIDADES = ["Zumba", "Pilates", "Spinning", "Musculação", "Natação", "Yoga", "Crossfit",
+               "Jiu Jitsu", "Boxe", "Hidroginástica", "Funcional", "Dança"]
+RUAS = ["Rua das Flores", "Avenida Brasil", "Rua Sete de Setembro", "Rua Eliza Mercedes de Carvalho",
+        "Avenida Rui Barbosa", "Rua XV de Novembro"]
+
+def proporcoes(matriculas):
+    # Quantidade de registros de cada tabela para um total de matrículas.
+    alunos = max(10, matriculas // 2)
+    return {
+        "cidades": max(5, min(5000, alunos // 200)),
+        "alunos": alunos,
+        "professores": max(3, matriculas // 2000),
+        "modalidades": max(5, matriculas // 500),
+        "matriculas": matriculas
+    }
+
+def _codigos(quantidade, aleatorio, gerador):
+    # Códigos 1..n. Com `aleatorio` saem embaralhados por uma permutação
+    # afim (a*i + b) mod n, com a primo com n: sem repetição e sem lista.
+    if not aleatorio or quantidade < 2:
+        return range(1, quantidade + 1)
+    a = gerador.randrange(1, quantidade)
+    while math.gcd(a, quantidade) != 1:
+        a += 1
+    b = gerador.randrange(quantidade)
+    return ((a * i + b) % quantidade + 1 for i in range(quantidade))
+
+def _nome(gerador):
+    return f"{gerador.choice(PRIMEIROS_NOMES)} {gerador.choice(SOBRENOMES)} {gerador.choice(SOBRENOMES)}"
+
+def gerar_dados(destino, matriculas=1000, aleatorio=False, semente=42):
+    # Devolve a quantidade gerada de cada tabela.
+    gerador = random.Random(semente)
+    quantidades = proporcoes(matriculas)
+    os.makedirs(destino, exist_ok=True)
+    caminho = lambda nome: os.path.join(destino, f"{nome}.txt")
+
+    cidades = list(_codigos(quantidades["cidades"], aleatorio, gerador))
+    with open(caminho("cidades"), 'w', encoding='utf-8') as f:
+        for indice, cod in enumerate(cidades):
+            descricao, estado = CIDADES[indice % len(CIDADES)]
+            if indice >= len(CIDADES):
+                descricao = f"{descricao} {indice // len(CIDADES)}"
+            f.write(f"{cod};{descricao};{estado}\n")
+
+    professores = list(_codigos(quantidades["professores"], aleatorio, gerador))
+    with open(caminho("professores"), 'w', encoding='utf-8') as f:
+        for cod in professores:
+            endereco = f"{gerador.choice(RUAS)}, {gerador.randint(1, 3000)}"
+            telefone = f"{gerador.randint(11, 99)}9{gerador.randint(10000000, 99999999)}"
+            f.write(f"{cod};{_nome(gerador)};{endereco};{telefone};{gerador.choice(cidades)}\n")
+
+    # Os alunos não cabem numa lista nas escalas maiores; como os códigos
+    # são sempre 1..n, as matrículas sorteiam direto nesse intervalo.
+    with open(caminho("alunos"), 'w', encoding='utf-8') as f:
+        for cod in _codigos(quantidades["alunos"], aleatorio, gerador):
+            data_nasc = f"{gerador.randint(1, 28):02d}/{gerador.randint(1, 12):02d}/{gerador.randint(1950, 2010)}"
+            peso = round(gerador.uniform(45, 130), 1)
+            altura = round(gerador.uniform(1.50, 2.00), 2)
+            f.write(f"{cod};{_nome(gerador)};{gerador.choice(cidades)};{data_nasc};{peso};{altura}\n")
+
+    modalidades = list(_codigos(quantidades["modalidades"], aleatorio, gerador))
+    ocupadas = [0] * len(modalidades)
+    with open(caminho("matriculas"), 'w', encoding='utf-8') as f:
+        for cod in _codigos(matriculas, aleatorio, gerador):
+            posicao = gerador.randrange(len(modalidades))
+            ocupadas[posicao] += 1
+            cod_aluno = gerador.randint(1, quantidades["alunos"])
+            f.write(f"{cod};{cod_aluno};{modalidades[posicao]};{gerador.randint(1, 20)}\n")
+
+    with open(caminho("modalidades"), 'w', encoding='utf-8') as f:
+        for indice, cod in enumerate(modalidades):
+            descricao = MODALIDADES[indice % len(MODALIDADES)]
+            if indice >= len(MODALIDADES):
+                descricao = f"{descricao} {indice // len(MODALIDADES)}"
+            valor = round(gerador.uniform(20, 120), 2)
+            # Sobra um pouco de vaga para os cenários de inclusão.
+            limite = ocupadas[indice] + 50
+            f.write(f"{cod};{descricao};{gerador.choice(professores)};{valor};{limite};{ocupadas[indice]}\n")
+
+    return quantidades
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera as tabelas .txt sintéticas da academia.")
+    parser.add_argument("destino")
+    parser.add_argument("--matriculas", type=int, default=1000)
+    parser.add_argument("--aleatorio", action="store_true", help="códigos embaralhados e fora de ordem")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args(argv)
+    quantidades = gerar_dados(args.destino, args.matriculas, args.aleatorio, args.semente)
+    for tabela, quantidade in quantidades.items():
+        print(f"{tabela}: {quantidade}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import bisect
+import heapq
+import unicodedata
+from contextlib import contextmanager
+
+# --- ÍNDICE DE BUSCA POR NOME ---
+# Dois índices sobre o nome normalizado (sem acentos, minúsculo):
+#  - lista ordenada de (sufixo a partir de cada palavra, código), para busca
+#    por prefixo de qualquer palavra com bisect;
+#  - trigramas -> códigos, para busca por trecho em qualquer posição;
+#  - lista ordenada de (nome, código), para devolver os resultados em ordem
+#    alfabética sem ordenar todos os candidatos quando o termo é muito comum.
+
+# Quantos nomes a busca por trecho percorre em ordem alfabética antes de
+# desistir e partir para a interseção dos trigramas.
+ORCAMENTO_VARREDURA = 4096
+
+def normalizar(texto):
+    texto = str(texto)
+    # Texto só com ASCII não tem acentos a remover (caso mais comum na carga).
+    if not texto.isascii():
+        decomposto = unicodedata.normalize("NFKD", texto)
+        texto = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(texto.casefold().split())
+
+def _sufixos_de_palavras(nome):
+    partes = nome.split(" ")
+    return {" ".join(partes[i:]) for i in range(len(partes)) if partes[i]}
+
+def _trigramas(nome):
+    return {nome[i:i + 3] for i in range(len(nome) - 2)}
+
+class IndiceTexto:
+    def __init__(self):
+        self.nomes = {}
+        self._ordenados = []
+        self._trigramas = {}
+        self._por_nome = []
+        # Dentro de em_lote() as inclusões só são anexadas às listas, que
+        # são ordenadas uma vez no fim.
+        self._lote = 0
+        self._desordenado = False
+
+    def __len__(self):
+        return len(self.nomes)
+
+    def construir(self, pares):
+        # Montagem em lote: (código, texto) de todos os registros.
+        self.nomes = {cod: normalizar(texto) for cod, texto in pares}
+        self._ordenados = sorted((sufixo, cod) for cod, nome in self.nomes.items()
+                                 for sufixo in _sufixos_de_palavras(nome))
+        self._por_nome = sorted((nome, cod) for cod, nome in self.nomes.items())
+        self._trigramas = {}
+        for cod, nome in self.nomes.items():
+            for trigrama in _trigramas(nome):
+                self._trigramas.setdefault(trigrama, set()).add(cod)
+        return self
+
+    @contextmanager
+    def em_lote(self):
+        # Para muitas inclusões seguidas (ex.: sincronização do modo
+        # "sqlite"): bisect.insort custa O(n) cada, e n inclusões viram O(n²).
+        # Quem chama segura a trava de escrita, então nenhuma busca vê as
+        # listas fora de ordem.
+        self._lote += 1
+        try:
+            yield self
+        finally:
+            self._lote -= 1
+            if not self._lote:
+                self._ordenar()
+
+    def _ordenar(self):
+        if self._desordenado:
+            self._por_nome.sort()
+            self._ordenados.sort()
+            self._desordenado = False
+
+    def adicionar(self, cod, texto):
+        if cod in self.nomes:
+            self.remover(cod)
+        nome = normalizar(texto)
+        self.nomes[cod] = nome
+        if self._lote:
+            self._por_nome.append((nome, cod))
+            self._ordenados.extend((sufixo, cod) for sufixo in _sufixos_de_palavras(nome))
+            self._desordenado = True
+        else:
+            bisect.insort(self._por_nome, (nome, cod))
+            for sufixo in _sufixos_de_palavras(nome):
+                bisect.insort(self._ordenados, (sufixo, cod))
+        for trigrama in _trigramas(nome):
+            self._trigramas.setdefault(trigrama, set()).add(cod)
+
+    def remover(self, cod):
+        nome = self.nomes.pop(cod, None)
+        if nome is None:
+            return
+        self._ordenar()
+        posicao = bisect.bisect_left(self._por_nome, (nome, cod))
+        if posicao < len(self._por_nome) and self._por_nome[posicao] == (nome, cod):
+            del self._por_nome[posicao]
+        for sufixo in _sufixos_de_palavras(nome):
+            posicao = bisect.bisect_left(self._ordenados, (sufixo, cod))
+            if posicao < len(self._ordenados) and self._ordenados[posicao] == (sufixo, cod):
+                del self._ordenados[posicao]
+        for trigrama in _trigramas(nome):
+            codigos = self._trigramas.get(trigrama)
+            if codigos is not None:
+                codigos.discard(cod)
+                if not codigos:
+                    del self._trigramas[trigrama]
+
+    def buscar_prefixo(self, prefixo, limite=None):
+        # Códigos cujo nome tem alguma palavra começando com `prefixo`,
+        # em ordem alfabética.
+        prefixo = normalizar(prefixo)
+        resultado = []
+        vistos = set()
+        posicao = bisect.bisect_left(self._ordenados, (prefixo,))
+        while posicao < len(self._ordenados):
+            sufixo, cod = self._ordenados[posicao]
+            if not sufixo.startswith(prefixo):
+                break
+            if cod not in vistos:
+                vistos.add(cod)
+                resultado.append(cod)
+                if limite is not None and len(resultado) >= limite:
+                    break
+            posicao += 1
+        return resultado
+
+    def buscar(self, termo, limite=None):
+        # Códigos cujo nome contém `termo` (sem diferenciar acentos e
+        # maiúsculas), em ordem alfabética do nome.
+        termo = normalizar(termo)
+        if not termo:
+            return []
+        if len(termo) < 3:
+            return self.buscar_prefixo(termo, limite)
+        conjuntos = []
+        for trigrama in _trigramas(termo):
+            codigos = self._trigramas.get(trigrama)
+            if not codigos:
+                return []
+            conjuntos.append(codigos)
+        conjuntos.sort(key=len)
+        if limite is not None and len(conjuntos[0]) > ORCAMENTO_VARREDURA:
+            # Termo comum: achar os primeiros em ordem alfabética é mais
+            # barato do que cruzar e ordenar milhares de candidatos.
+            resultado = []
+            for nome, cod in self._por_nome[:ORCAMENTO_VARREDURA]:
+                if termo in nome:
+                    resultado.append(cod)
+                    if len(resultado) >= limite:
+                        return resultado
+        candidatos = conjuntos[0].intersection(*conjuntos[1:])
+        nomes = self.nomes
+        encontrados = ((nomes[cod], cod) for cod in candidatos if termo in nomes[cod])
+        if limite is not None:
+            encontrados = heapq.nsmallest(limite, encontrados)
+        else:
+            encontrados = sorted(encontrados)
+        return [cod for _, cod in encontrados]
@@ -0,0 +1,79 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+import metricas
+
+# --- CACHE DE RESPOSTAS E FRAGMENTOS HTML ---
+# LRU limitado pela memória ocupada pelos corpos guardados (não pelo número
+# de entradas). Cada entrada leva a versão dos dados com que foi gerada
+# (lib.versao_dados): se a versão atual é outra, a entrada é descartada e o
+# corpo é gerado de novo, então o cache nunca serve dados antigos.
+
+metricas.descrever("academia_cache_respostas_total", "counter", "Consultas ao cache de respostas por resultado (acerto/falta).")
+metricas.descrever("academia_cache_respostas_descartes_total", "counter", "Entradas descartadas do cache de respostas para liberar memória.")
+metricas.descrever("academia_cache_respostas_bytes", "gauge", "Memória ocupada pelos corpos no cache de respostas.")
+
+class Entrada:
+    __slots__ = ("versao", "corpo", "corpo_gzip", "modificado_em", "tamanho")
+
+    def __init__(self, versao, corpo, corpo_gzip=None, modificado_em=None):
+        self.versao = versao
+        self.corpo = corpo
+        self.corpo_gzip = corpo_gzip
+        # Para o Last-Modified: quando os dados desta versão mudaram (em
+        # segundos inteiros, a precisão do cabeçalho HTTP); sem a data, quando
+        # a entrada foi gerada.
+        self.modificado_em = int(time.time()) if modificado_em is None else modificado_em
+        self.tamanho = sys.getsizeof(corpo) + (sys.getsizeof(corpo_gzip) if corpo_gzip is not None else 0)
+
+class CacheRespostas:
+    def __init__(self, limite_bytes, fracao_maxima=4):
+        self.limite_bytes = limite_bytes
+        # Uma entrada maior que limite/fracao_maxima não é guardada, para que
+        # um relatório enorme não esvazie o cache inteiro.
+        self.maximo_entrada = limite_bytes // fracao_maxima
+        self.tamanho = 0
+        self._entradas = OrderedDict()
+        self._trava = threading.Lock()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obter(self, chave, versao):
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada.versao != versao:
+                del self._entradas[chave]
+                self.tamanho -= entrada.tamanho
+                entrada = None
+            if entrada is not None:
+                self._entradas.move_to_end(chave)
+        metricas.incrementar("academia_cache_respostas_total", resultado="acerto" if entrada else "falta")
+        return entrada
+
+    def guardar(self, chave, entrada):
+        if entrada.tamanho > self.maximo_entrada:
+            return False
+        descartadas = 0
+        with self._trava:
+            antiga = self._entradas.pop(chave, None)
+            if antiga is not None:
+                self.tamanho -= antiga.tamanho
+            self._entradas[chave] = entrada
+            self.tamanho += entrada.tamanho
+            while self.tamanho > self.limite_bytes:
+                _, removida = self._entradas.popitem(last=False)
+                self.tamanho -= removida.tamanho
+                descartadas += 1
+            tamanho = self.tamanho
+        if descartadas:
+            metricas.incrementar("academia_cache_respostas_descartes_total", descartadas)
+        metricas.definir("academia_cache_respostas_bytes", tamanho)
+        return True
+
+    def limpar(self):
+        with self._trava:
+            self._entradas.clear()
+            self.tamanho = 0
+        metricas.definir("academia_cache_respostas_bytes", 0)
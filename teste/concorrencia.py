@@ -0,0 +1,77 @@
+import threading
+from contextlib import contextmanager
+
+# --- TRAVA DE LEITURA/ESCRITA ---
+# Vários leitores ou um único escritor por vez. Escritores esperando têm
+# preferência sobre leitores novos, para não ficarem famintos. A mesma thread
+# pode readquirir a trava que já tem (leitura dentro de leitura, leitura ou
+# escrita dentro de escrita); só não pode passar de leitura para escrita.
+
+class TravaLeituraEscrita:
+    def __init__(self):
+        self._condicao = threading.Condition(threading.Lock())
+        self._leitores = {}
+        self._escritor = None
+        self._escritas = 0
+        self._escritores_esperando = 0
+
+    def adquirir_leitura(self):
+        eu = threading.get_ident()
+        with self._condicao:
+            if self._escritor == eu or eu in self._leitores:
+                self._leitores[eu] = self._leitores.get(eu, 0) + 1
+                return
+            while self._escritor is not None or self._escritores_esperando:
+                self._condicao.wait()
+            self._leitores[eu] = 1
+
+    def liberar_leitura(self):
+        eu = threading.get_ident()
+        with self._condicao:
+            restantes = self._leitores[eu] - 1
+            if restantes:
+                self._leitores[eu] = restantes
+            else:
+                del self._leitores[eu]
+                if not self._leitores:
+                    self._condicao.notify_all()
+
+    def adquirir_escrita(self):
+        eu = threading.get_ident()
+        with self._condicao:
+            if self._escritor == eu:
+                self._escritas += 1
+                return
+            if eu in self._leitores:
+                raise RuntimeError("Não é possível passar de leitura para escrita na mesma trava.")
+            self._escritores_esperando += 1
+            try:
+                while self._escritor is not None or self._leitores:
+                    self._condicao.wait()
+            finally:
+                self._escritores_esperando -= 1
+            self._escritor = eu
+            self._escritas = 1
+
+    def liberar_escrita(self):
+        with self._condicao:
+            self._escritas -= 1
+            if not self._escritas:
+                self._escritor = None
+                self._condicao.notify_all()
+
+    @contextmanager
+    def leitura(self):
+        self.adquirir_leitura()
+        try:
+            yield
+        finally:
+            self.liberar_leitura()
+
+    @contextmanager
+    def escrita(self):
+        self.adquirir_escrita()
+        try:
+            yield
+        finally:
+            self.liberar_escrita()
@@ -0,0 +1,70 @@
+import os
+import time
+
+# --- DIÁRIO (WRITE-AHEAD LOG) POR TABELA ---
+# Cada alteração vira uma linha anexada ao final do arquivo:
+#   G;<campos do registro>   -> grava (inclui ou substitui) o registro
+#   E;<chave>                -> exclui o registro
+# As operações são idempotentes, então reaplicar o diário sobre um snapshot
+# mais novo que ele não altera o resultado.
+
+class Diario:
+    def __init__(self, caminho, sincronizar_a_cada=32, intervalo_sync=0.05):
+        self.caminho = caminho
+        self.sincronizar_a_cada = sincronizar_a_cada
+        self.intervalo_sync = intervalo_sync
+        self.registros = 0
+        self._arquivo = None
+        self._pendentes = 0
+        self._ultimo_sync = time.monotonic()
+
+    def ler(self):
+        # Linhas sem '\n' no final são restos de uma escrita interrompida
+        # e são ignoradas.
+        self.registros = 0
+        if not os.path.exists(self.caminho):
+            return
+        with open(self.caminho, 'r', encoding='utf-8') as f:
+            for linha in f:
+                if not linha.endswith("\n"):
+                    break
+                linha = linha.rstrip("\n")
+                if not linha:
+                    continue
+                operacao, _, resto = linha.partition(';')
+                self.registros += 1
+                yield operacao, resto.split(';')
+
+    def anexar(self, operacao, campos):
+        if self._arquivo is None:
+            self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+        linha = operacao + ";" + ";".join(map(str, campos)) + "\n"
+        self._arquivo.write(linha)
+        self._arquivo.flush()
+        self.registros += 1
+        self._pendentes += 1
+        if (self._pendentes >= self.sincronizar_a_cada or
+                time.monotonic() - self._ultimo_sync >= self.intervalo_sync):
+            self.sincronizar()
+        # Devolve quantos bytes foram anexados.
+        return len(linha.encode('utf-8'))
+
+    def sincronizar(self):
+        if self._arquivo is not None and self._pendentes:
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+        self._pendentes = 0
+        self._ultimo_sync = time.monotonic()
+
+    def truncar(self):
+        self.fechar()
+        if os.path.exists(self.caminho):
+            with open(self.caminho, 'w', encoding='utf-8'):
+                pass
+        self.registros = 0
+
+    def fechar(self):
+        if self._arquivo is not None:
+            self.sincronizar()
+            self._arquivo.close()
+            self._arquivo = None
@@ -0,0 +1,50 @@
+import csv
+import io
+import json
+import zlib
+
+# --- EXPORTAÇÃO EM CSV / NDJSON ---
+# Geradores que transformam uma sequência de linhas (tuplas na ordem de
+# `campos`) em blocos de texto, sem montar o arquivo inteiro em memória.
+
+TAMANHO_BLOCO = 64 * 1024
+
+def gerar_csv(campos, linhas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(campos)
+    for linha in linhas:
+        escritor.writerow(linha)
+        if buffer.tell() >= TAMANHO_BLOCO:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def gerar_ndjson(campos, linhas):
+    partes = []
+    tamanho = 0
+    for linha in linhas:
+        parte = json.dumps(dict(zip(campos, linha)), ensure_ascii=False) + "\n"
+        partes.append(parte)
+        tamanho += len(parte)
+        if tamanho >= TAMANHO_BLOCO:
+            yield "".join(partes)
+            partes = []
+            tamanho = 0
+    yield "".join(partes)
+
+def comprimir_gzip(blocos, nivel=6):
+    # wbits=31 gera o formato gzip (cabeçalho + crc), não zlib puro.
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    for bloco in blocos:
+        comprimido = compressor.compress(bloco.encode('utf-8'))
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
+
+# formato: (gerador, mimetype)
+FORMATOS = {
+    "csv": (gerar_csv, "text/csv; charset=utf-8"),
+    "ndjson": (gerar_ndjson, "application/x-ndjson; charset=utf-8")
+}
@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, SubmitField, IntegerField, SelectField, FloatField
-from wtforms.validators import DataRequired, Length, Regexp, NumberRange
+from wtforms import StringField, SubmitField, IntegerField, SelectField, FloatField, TextAreaField
+from wtforms.validators import DataRequired, Length, Regexp, NumberRange, Optional
 
 class CidadeForm(FlaskForm):
     cod = IntegerField('Código', validators=[
@@ -29,7 +29,8 @@ class AlunoForm(FlaskForm):
         Length(min=3, max=100),
         Regexp(r'^[A-ZÀ-Ö][A-Za-zÀ-ÖØ-öø-ÿ0-9\s]*$', message='Descrição inválida. Use apenas letras e espaços. E letra maiúscula no começo!')
     ])
-    cod_cidade = SelectField('Cidade', coerce=int, validators=[
+    cod_cidade = SelectField('Cidade', coerce=int, validate_choice=False,
+                             render_kw={"data-autocompletar": "cidades"}, validators=[
         DataRequired(message="Selecione uma cidade.")
     ])
     data_nasc = StringField('Data de Nascimento', validators=[
@@ -63,7 +64,8 @@ class ProfessorForm(FlaskForm):
         DataRequired(message="O telefone é obrigatório."),
         Regexp(r'^\d{10,11}$', message='Telefone inválido. Use apenas números, com DDD e sem espaços ou caracteres.')
     ])
-    cod_cidade = SelectField('Cidade', coerce=int, validators=[
+    cod_cidade = SelectField('Cidade', coerce=int, validate_choice=False,
+                             render_kw={"data-autocompletar": "cidades"}, validators=[
         DataRequired(message="Selecione uma cidade.")
     ])
     submit = SubmitField('Salvar Professor')
@@ -78,7 +80,8 @@ class ModalidadeForm(FlaskForm):
         Length(min=3, max=50),
         Regexp(r'^[A-ZÀ-Ö][A-Za-zÀ-ÖØ-öø-ÿ0-9\s]*$', message='Descrição inválida. Use apenas letras e espaços. E letra maiúscula no começo!')
     ])
-    cod_professor = SelectField('Professor', coerce=int, validators=[
+    cod_professor = SelectField('Professor', coerce=int, validate_choice=False,
+                                render_kw={"data-autocompletar": "professores"}, validators=[
         DataRequired(message="Selecione um professor.")
     ])
     valor_aula = FloatField('Valor da Aula (R$)', validators=[
@@ -96,10 +99,12 @@ class MatriculaForm(FlaskForm):
         DataRequired(message="O código é obrigatório."),
         NumberRange(min=1, message="O código deve ser um número positivo.")
     ])
-    cod_aluno = SelectField('Aluno', coerce=int, validators=[
+    cod_aluno = SelectField('Aluno', coerce=int, validate_choice=False,
+                            render_kw={"data-autocompletar": "alunos"}, validators=[
         DataRequired(message="Selecione um aluno.")
     ])
-    cod_modalidade = SelectField('Modalidade', coerce=int, validators=[
+    cod_modalidade = SelectField('Modalidade', coerce=int, validate_choice=False,
+                                 render_kw={"data-autocompletar": "modalidades"}, validators=[
         DataRequired(message="Selecione uma modalidade.")
     ])
     qtde_aulas = IntegerField('Quantidade de Aulas', validators=[
@@ -108,3 +113,21 @@ class MatriculaForm(FlaskForm):
     ])
     submit = SubmitField('Realizar Matrícula')
 
+class MatriculaLoteForm(FlaskForm):
+    cod_modalidade = SelectField('Modalidade', coerce=int, validate_choice=False,
+                                 render_kw={"data-autocompletar": "modalidades"}, validators=[
+        DataRequired(message="Selecione uma modalidade.")
+    ])
+    alunos = TextAreaField('Códigos dos Alunos', validators=[
+        DataRequired(message="Informe os códigos dos alunos."),
+        Regexp(r'^[\d\s,;]+$', message="Use apenas códigos numéricos separados por vírgula, espaço ou linha.")
+    ])
+    qtde_aulas = IntegerField('Quantidade de Aulas', validators=[
+        DataRequired(message="A quantidade de aulas é obrigatória."),
+        NumberRange(min=1, message="Deve haver pelo menos 1 aula.")
+    ])
+    cod_inicial = IntegerField('Código Inicial (opcional)', validators=[
+        Optional(),
+        NumberRange(min=1, message="O código deve ser um número positivo.")
+    ])
+    submit = SubmitField('Matricular Turma')
@@ -1,5 +1,25 @@
+import atexit
+import functools
+import gc
+import itertools
+import metricas
 import os
-from arvore_binaria import ArvoreBinariaBusca
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from analise import ColunasAcademia, calcular_imc_lote
+from armazenamento_sqlite import BancoCompartilhado
+from arvore_binaria import ArvorePersistente, NoPersistente
+from busca_texto import IndiceTexto
+from concorrencia import TravaLeituraEscrita
+from diario import Diario
+from gravacao import AgendadorGravacao
+from importacao import RelatorioImportacao, ler_lotes
+from instantaneo import carregar_instantaneo, gravar_instantaneo
+from registros import Registro, Cidade, Aluno, Professor, Modalidade, Matricula
+from tabela_binaria import TabelaBinaria, converter_de_texto
 
 # --- ESTRUTURA DOS DADOS E ARQUIVOS ---
 dados = {
@@ -9,12 +29,16 @@ dados = {
     "modalidades": {},
     "matriculas": {}
 }
+# Árvores persistentes: guardam também os registros (os mesmos de `dados`)
+# e permitem tirar instantâneos para leitura (ver tirar_instantaneo).
+# Registros já publicados não são alterados: uma alteração grava um novo
+# objeto.
 indices = {
-    "cidades": ArvoreBinariaBusca(),
-    "alunos": ArvoreBinariaBusca(),
-    "professores": ArvoreBinariaBusca(),
-    "modalidades": ArvoreBinariaBusca(),
-    "matriculas": ArvoreBinariaBusca()
+    "cidades": ArvorePersistente(),
+    "alunos": ArvorePersistente(),
+    "professores": ArvorePersistente(),
+    "modalidades": ArvorePersistente(),
+    "matriculas": ArvorePersistente()
 }
 arquivos = {
     "cidades": "cidades.txt",
@@ -23,30 +47,808 @@ arquivos = {
     "modalidades": "modalidades.txt",
     "matriculas": "matriculas.txt"
 }
+tipos_registro = {
+    "cidades": Cidade,
+    "alunos": Aluno,
+    "professores": Professor,
+    "modalidades": Modalidade,
+    "matriculas": Matricula
+}
+
+# Usados quando um registro referenciado não existe mais.
+CIDADE_AUSENTE = Cidade(0, "N/A", "N/A")
+ALUNO_AUSENTE = Aluno(0, "N/A", 0, "", 0.0, 0.0)
+PROFESSOR_AUSENTE = Professor(0, "N/A", "", "", 0)
+MODALIDADE_AUSENTE = Modalidade(0, "N/A", 0, 0.0, 0, 0)
+
+# Índices reversos das chaves estrangeiras: código do pai -> códigos dos filhos.
+# chaves_estrangeiras[tabela_filha] = {nome_do_indice: campo do registro}.
+chaves_estrangeiras = {
+    "alunos": {"alunos_por_cidade": "cod_cidade"},
+    "professores": {"professores_por_cidade": "cod_cidade"},
+    "modalidades": {"modalidades_por_professor": "cod_professor"},
+    "matriculas": {"matriculas_por_aluno": "cod_aluno", "matriculas_por_modalidade": "cod_modalidade"}
+}
+indices_reversos = {
+    nome: {} for campos in chaves_estrangeiras.values() for nome in campos
+}
+
+# Campo de texto usado para ordenar/filtrar cada tabela por nome. Matrículas
+# usam o nome do aluno.
+campos_texto = {
+    "cidades": "descricao",
+    "alunos": "nome",
+    "professores": "nome",
+    "modalidades": "descricao",
+    "matriculas": None
+}
+# Índices de busca por nome (prefixo e trecho, sem acentos).
+indices_texto = {
+    "cidades": IndiceTexto(),
+    "alunos": IndiceTexto(),
+    "professores": IndiceTexto()
+}
+
+# Total de aulas matriculadas por modalidade, mantido a cada inclusão/exclusão
+# de matrícula. Faturamento da modalidade = aulas * valor_aula.
+aulas_por_modalidade = {}
+
+# Uma trava de leitura/escrita por tabela. As funções públicas declaram as
+# tabelas que leem e escrevem com @_travar, e as travas são sempre
+# adquiridas na ordem de `arquivos`, o que evita deadlock entre elas.
+travas = {tabela: TravaLeituraEscrita() for tabela in arquivos}
+_local = threading.local()
+
+# Versão de cada tabela, incrementada a cada alteração. As consultas
+# memorizadas guardam as versões das tabelas de que dependem.
+versoes = {tabela: 0 for tabela in arquivos}
+# Quando cada tabela mudou pela última vez nesta instância (carga, alteração
+# local ou sincronizada), para o Last-Modified das respostas.
+alteradas_em = {tabela: 0.0 for tabela in arquivos}
+# Resultados memorizados, do menos para o mais usado recentemente: quando o
+# limite é atingido sai só o mais antigo, e uma rajada de filtros diferentes
+# numa listagem não derruba as ordenações que estão sendo usadas.
+_cache_leituras = OrderedDict()
+_trava_cache_leituras = threading.Lock()
+LIMITE_CACHE_LEITURAS = 256
+
+# "texto": regrava o .txt da tabela a cada alteração.
+# "diario": anexa a alteração ao .log da tabela e compacta de tempos em tempos.
+# "sqlite": banco compartilhado entre processos (vários workers do gunicorn);
+#           cada processo aplica as alterações dos outros antes de ler.
+# "binario": registros de tamanho fixo no .dat da tabela; cada alteração
+#            grava só o registro alterado. O .dat é criado a partir do .txt.
+configuracao = {
+    "persistencia": os.environ.get("ACADEMIA_PERSISTENCIA", "texto"),
+    "diario_sincronizar_a_cada": 32,
+    "diario_intervalo_sync": 0.05,
+    "diario_limite_compactacao": 10000,
+    "banco": os.environ.get("ACADEMIA_BANCO", "academia.db"),
+    "sqlite_intervalo_sincronizacao": 0.0,
+    "sqlite_historico": 10000,
+    # Cópia binária (.snap) de cada .txt para acelerar a inicialização.
+    "instantaneo": os.environ.get("ACADEMIA_INSTANTANEO", "1") != "0",
+    # Modo "texto": quando os .txt são regravados depois de cada alteração.
+    #   sincrona   - dentro da própria operação (padrão);
+    #   grupo      - por uma thread, juntando as alterações de várias
+    #                requisições; cada uma só retorna depois da gravação;
+    #   assincrona - pela thread, sem esperar (perde o que não foi gravado
+    #                se o processo cair).
+    "gravacao": os.environ.get("ACADEMIA_GRAVACAO", "sincrona"),
+    "gravacao_intervalo": 0.05,
+    "gravacao_limite": 256,
+    "binario_sincronizar_a_cada": 32,
+    "binario_intervalo_sync": 0.05,
+    # preparar_dados(): lê cada tabela só quando ela é usada pela primeira
+    # vez (exceto no modo "sqlite") e, com pré-carga, lê todas numa thread
+    # logo depois da inicialização.
+    "carga_sob_demanda": os.environ.get("ACADEMIA_CARGA_SOB_DEMANDA", "1") != "0",
+    "pre_carga": os.environ.get("ACADEMIA_PRE_CARGA", "0") == "1"
+}
+diarios = {}
+tabelas_binarias = {}
+_banco = None
+_agendador = None
+# seq da última alteração do banco já aplicada em memória (-1 = recarregar).
+_sincronizacao = {"seq": 0, "verificado_em": 0.0}
+# Tabelas cujo .txt foi regravado e cujo .snap deve ser refeito na saída:
+# tabela -> (caminho absoluto, mtime_ns, tamanho) do .txt que foi gravado.
+_instantaneos_pendentes = {}
+# Identifica a carga atual dos dados; entra nas etiquetas (ETag) das
+# exportações para que um reinício não reaproveite versões antigas.
+_geracao = ""
+# Tabelas ainda não lidas do disco na carga sob demanda. Cada uma é lida e
+# indexada quando uma função declarada com @_travar a usa pela primeira vez.
+tabelas_pendentes = set()
+_pre_carga = None
+
+# --- MÉTRICAS ---
+metricas.descrever("academia_lib_segundos", "histogram", "Duração das funções da biblioteca, com a espera pelas travas.")
+metricas.descrever("academia_trava_espera_segundos", "histogram", "Tempo esperando as travas das tabelas.")
+metricas.descrever("academia_arvore_segundos", "histogram", "Duração das operações nos índices (árvores AVL).")
+metricas.descrever("academia_carga_tabela_segundos", "histogram", "Duração da carga sob demanda de cada tabela.")
+metricas.descrever("academia_disco_gravacao_segundos", "histogram", "Duração das gravações em disco por tabela.")
+metricas.descrever("academia_disco_bytes_total", "counter", "Bytes gravados em disco por tabela.")
+metricas.descrever("academia_juncao_linhas_total", "counter", "Linhas montadas com junção entre tabelas, por consulta.")
+metricas.descrever("academia_reconstrucao_segundos", "histogram", "Duração da reconstrução completa dos índices.")
+
+def _buscar_chave(tabela, chave):
+    with metricas.cronometrar("academia_arvore_segundos", tabela=tabela, operacao="buscar"):
+        return indices[tabela].buscar(chave)
+
+def _contar_juncao(consulta, linhas):
+    metricas.incrementar("academia_juncao_linhas_total", len(linhas), consulta=consulta)
+    return linhas
 
 # --- FUNÇÕES DE PERSISTÊNCIA ---
 
+def usar_diretorio(diretorio):
+    # Modo com várias unidades (ver unidades.py): os arquivos e o banco desta
+    # instância ficam no diretório da unidade. Chamar antes da carga.
+    for tabela, nome_arquivo in arquivos.items():
+        arquivos[tabela] = os.path.join(diretorio, os.path.basename(nome_arquivo))
+    configuracao["banco"] = os.path.join(diretorio, os.path.basename(configuracao["banco"]))
+
+def _diario(tabela):
+    if tabela not in diarios:
+        caminho = os.path.splitext(arquivos[tabela])[0] + ".log"
+        diarios[tabela] = Diario(caminho,
+                                 configuracao["diario_sincronizar_a_cada"],
+                                 configuracao["diario_intervalo_sync"])
+    return diarios[tabela]
+
+def _caminho_binario(tabela):
+    return os.path.splitext(arquivos[tabela])[0] + ".dat"
+
+def _tabela_binaria(tabela):
+    if tabela not in tabelas_binarias:
+        tabelas_binarias[tabela] = TabelaBinaria(_caminho_binario(tabela), tipos_registro[tabela],
+                                                 configuracao["binario_sincronizar_a_cada"],
+                                                 configuracao["binario_intervalo_sync"])
+    return tabelas_binarias[tabela]
+
+def _obter_agendador():
+    global _agendador
+    if _agendador is None:
+        _agendador = AgendadorGravacao(_gravar_tabela_suja,
+                                       configuracao["gravacao_intervalo"],
+                                       configuracao["gravacao_limite"])
+        # Registrado depois de salvar_instantaneos, então roda antes dele.
+        atexit.register(_agendador.encerrar)
+    return _agendador
+
+def _gravar_tabela_suja(tabela):
+    with travas[tabela].leitura():
+        salvar_dados(tabela)
+
+def descarregar_gravacoes():
+    # Grava já as tabelas pendentes da gravação adiada. Não chamar de dentro
+    # de uma função que segura travas.
+    if _agendador is not None:
+        _agendador.descarregar()
+
+def _obter_banco():
+    global _banco
+    if _banco is None:
+        _banco = BancoCompartilhado(configuracao["banco"])
+    return _banco
+
+def _travar(leitura=(), escrita=(), compartilhar=True, carregar=True):
+    # No modo "sqlite" a escrita é serializada entre processos pelo banco,
+    # então quem escreve trava todas as tabelas, abre a transação e aplica
+    # antes as alterações dos outros processos; quem lê só sincroniza.
+    # `leitura` pode ser uma função que recebe os argumentos da chamada e
+    # devolve as tabelas lidas. Com `carregar`, as tabelas ainda pendentes
+    # da carga sob demanda são lidas antes de travar.
+    def ordenar(leitura):
+        return [(tabela, tabela in escrita) for tabela in arquivos
+                if tabela in leitura or tabela in escrita]
+    ordem_fixa = None if callable(leitura) else ordenar(leitura)
+    ordem_exclusiva = [(tabela, True) for tabela in arquivos]
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            ordem = ordem_fixa if ordem_fixa is not None else ordenar(leitura(*args, **kwargs))
+            if carregar and tabelas_pendentes:
+                _garantir_carregadas([tabela for tabela, _ in ordem])
+            compartilhado = compartilhar and configuracao["persistencia"] == "sqlite"
+            externa = not getattr(_local, "profundidade", 0)
+            if compartilhado and externa and not escrita:
+                sincronizar()
+            adquiridas = []
+            _local.profundidade = getattr(_local, "profundidade", 0) + 1
+            inicio = time.perf_counter()
+            try:
+                for tabela, exclusiva in (ordem_exclusiva if compartilhado and escrita else ordem):
+                    if exclusiva:
+                        travas[tabela].adquirir_escrita()
+                        adquiridas.append(travas[tabela].liberar_escrita)
+                    else:
+                        travas[tabela].adquirir_leitura()
+                        adquiridas.append(travas[tabela].liberar_leitura)
+                metricas.observar("academia_trava_espera_segundos", time.perf_counter() - inicio,
+                                  funcao=funcao.__name__)
+                if compartilhado and escrita and externa:
+                    resultado = _executar_em_transacao(funcao, args, kwargs)
+                else:
+                    resultado = funcao(*args, **kwargs)
+            finally:
+                _local.profundidade -= 1
+                for liberar in reversed(adquiridas):
+                    liberar()
+                bilhete = _local.__dict__.pop("bilhete", 0) if externa else 0
+            # Modo "grupo": espera a gravação já sem travas, para que a
+            # thread de gravação consiga ler as tabelas.
+            if bilhete:
+                _agendador.aguardar(bilhete)
+            metricas.observar("academia_lib_segundos", time.perf_counter() - inicio,
+                              funcao=funcao.__name__)
+            return resultado
+        return envoltorio
+    return decorador
+
+def _atualizar_antes(*tabelas):
+    # Só a entrada de _travar, sem segurar travas: carrega as tabelas ainda
+    # pendentes e, no modo "sqlite", aplica as alterações dos outros
+    # processos. Para leituras feitas sobre um instantâneo, antes que
+    # @_memorizar confira as versões.
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            if tabelas_pendentes:
+                _garantir_carregadas(tabelas)
+            if not getattr(_local, "profundidade", 0):
+                sincronizar()
+            return funcao(*args, **kwargs)
+        return envoltorio
+    return decorador
+
+def _executar_em_transacao(funcao, args, kwargs):
+    banco = _obter_banco()
+    try:
+        with banco.transacao():
+            _aplicar_alteracoes_pendentes(banco)
+            resultado = funcao(*args, **kwargs)
+            banco.podar(configuracao["sqlite_historico"])
+            _sincronizacao["seq"] = banco.ultima_seq()
+    except Exception:
+        # A memória pode ter ficado à frente do banco: recarrega na próxima.
+        _sincronizacao["seq"] = -1
+        raise
+    return resultado
+
+def sincronizar():
+    # Aplica as alterações feitas por outros processos no banco compartilhado.
+    if configuracao["persistencia"] != "sqlite":
+        return
+    agora = time.monotonic()
+    if agora - _sincronizacao["verificado_em"] < configuracao["sqlite_intervalo_sincronizacao"]:
+        return
+    _sincronizacao["verificado_em"] = agora
+    if _obter_banco().ultima_seq() != _sincronizacao["seq"]:
+        _sincronizar_com_travas()
+
+@_travar(escrita=tuple(arquivos), compartilhar=False, carregar=False)
+def _sincronizar_com_travas():
+    banco = _obter_banco()
+    with banco.leitura():
+        _aplicar_alteracoes_pendentes(banco)
+
+def _aplicar_alteracoes_pendentes(banco):
+    seq = _sincronizacao["seq"]
+    menor = banco.menor_seq()
+    if seq < 0 or (menor is not None and menor > seq + 1):
+        _carregar_do_banco(banco)
+        return
+    with ExitStack() as pilha:
+        # Muitas alterações de uma vez (ex.: importação em outro processo):
+        # os índices de texto são reordenados só no fim.
+        for indice in indices_texto.values():
+            pilha.enter_context(indice.em_lote())
+        for seq, tabela, chave, operacao, linha in banco.alteracoes_desde(seq):
+            if operacao == "G":
+                _aplicar_gravacao(tabela, tipos_registro[tabela](*linha.split(';')))
+            elif chave in dados[tabela]:
+                _aplicar_exclusao(tabela, chave)
+            _sincronizacao["seq"] = seq
+
+@contextmanager
+def _coletor_pausado():
+    # A carga cria centenas de milhares de objetos de uma vez; o coletor de
+    # ciclos não tem o que recolher aqui e só atrasaria.
+    coletor_ativo = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if coletor_ativo:
+            gc.enable()
+
+@_travar(escrita=tuple(arquivos), compartilhar=False, carregar=False)
 def carregar_dados():
+    global _geracao
     print("Carregando dados e construindo índices...")
-    for tabela, nome_arquivo in arquivos.items():
-        if os.path.exists(nome_arquivo):
-            with open(nome_arquivo, 'r', encoding='utf-8') as f:
-                for linha in f:
-                    linha = linha.strip()
-                    if linha:
-                        partes = linha.split(';')
-                        chave = int(partes[0])
-                        dados[tabela][chave] = partes
-                        indices[tabela].inserir(chave)
+    _geracao = f"{os.getpid():x}.{time.time_ns():x}"
+    with _coletor_pausado():
+        _carregar_dados()
+    tabelas_pendentes.clear()
     print("Dados carregados!")
 
+# --- CARGA SOB DEMANDA ---
+
+def preparar_dados():
+    # Ponto de entrada da aplicação. Com carga sob demanda não lê nada agora:
+    # a inicialização não depende do tamanho dos dados. No modo "sqlite" a
+    # sincronização entre processos precisa de todas as tabelas em memória.
+    global _pre_carga
+    if not configuracao["carga_sob_demanda"] or configuracao["persistencia"] == "sqlite":
+        carregar_dados()
+        return
+    _adiar_carga()
+    if configuracao["pre_carga"]:
+        _pre_carga = threading.Thread(target=_garantir_carregadas, args=(tuple(arquivos),),
+                                      name="pre-carga", daemon=True)
+        _pre_carga.start()
+
+@_travar(escrita=tuple(arquivos), compartilhar=False, carregar=False)
+def _adiar_carga():
+    global _geracao
+    _geracao = f"{os.getpid():x}.{time.time_ns():x}"
+    for tabela in arquivos:
+        if tabela in tabelas_binarias:
+            tabelas_binarias.pop(tabela).fechar(indices[tabela].iterar_em_ordem())
+        dados[tabela].clear()
+        _construir_estruturas(tabela)
+    tabelas_pendentes.update(arquivos)
+    print("Tabelas serão carregadas sob demanda.")
+
+def _garantir_carregadas(tabelas):
+    for tabela in tabelas:
+        if tabela in tabelas_pendentes:
+            _carregar_tabela(tabela)
+
+def _carregar_tabela(tabela):
+    inicio = time.perf_counter()
+    with travas[tabela].escrita():
+        if tabela not in tabelas_pendentes:
+            return
+        with _coletor_pausado():
+            if configuracao["persistencia"] == "binario":
+                _ler_binario(tabela)
+                compactar_diario = False
+            else:
+                compactar_diario = _ler_arquivo(tabela)
+            _construir_estruturas(tabela)
+        if compactar_diario:
+            _compactar(tabela)
+        tabelas_pendentes.discard(tabela)
+    metricas.observar("academia_carga_tabela_segundos", time.perf_counter() - inicio, tabela=tabela)
+
+def estado_carga():
+    # Situação de cada tabela e se a aplicação está pronta: dados preparados
+    # e, com pré-carga, todas as tabelas já lidas. Não espera por uma tabela
+    # que esteja sendo carregada (ela aparece como não carregada).
+    tabelas = {}
+    for tabela in arquivos:
+        item = {"carregada": tabela not in tabelas_pendentes, "registros": 0, "memoria_bytes": 0}
+        if item["carregada"]:
+            with travas[tabela].leitura():
+                item["registros"] = len(dados[tabela])
+                item["memoria_bytes"] = _memoria_tabela(tabela)
+        tabelas[tabela] = item
+    return {
+        "pronta": bool(_geracao) and not (configuracao["pre_carga"] and tabelas_pendentes),
+        "tabelas": tabelas,
+        "memoria_bytes": sum(item["memoria_bytes"] for item in tabelas.values())
+    }
+
+TAMANHO_NO_ARVORE = sys.getsizeof(NoPersistente(0))
+TAMANHO_AMOSTRA_MEMORIA = 100
+
+def _tamanho_item(item, profundidade=2):
+    tamanho = sys.getsizeof(item)
+    if profundidade and isinstance(item, (tuple, list, set, frozenset, Registro)):
+        tamanho += sum(_tamanho_item(valor, profundidade - 1) for valor in item)
+    return tamanho
+
+def _tamanho_aproximado(colecao):
+    # Contêiner + tamanho médio de uma amostra dos itens vezes a quantidade.
+    total = sys.getsizeof(colecao)
+    if not isinstance(colecao, (dict, list, set, tuple)) or not colecao:
+        return total
+    passo = max(len(colecao) // TAMANHO_AMOSTRA_MEMORIA, 1)
+    if isinstance(colecao, dict):
+        amostra = [_tamanho_item(chave) + _tamanho_item(valor) for chave, valor in
+                   itertools.islice(colecao.items(), 0, passo * TAMANHO_AMOSTRA_MEMORIA, passo)]
+    else:
+        amostra = [_tamanho_item(item) for item in
+                   itertools.islice(colecao, 0, passo * TAMANHO_AMOSTRA_MEMORIA, passo)]
+    return total + int(sum(amostra) / len(amostra) * len(colecao))
+
+def _memoria_tabela(tabela):
+    # Estimativa por amostragem dos bytes da tabela e dos índices derivados
+    # dela (árvore, índices reversos, faturamento e índice de texto).
+    total = _tamanho_aproximado(dados[tabela]) + len(indices[tabela]) * TAMANHO_NO_ARVORE
+    for nome in chaves_estrangeiras.get(tabela, {}):
+        total += _tamanho_aproximado(indices_reversos[nome])
+    if tabela == "matriculas":
+        total += _tamanho_aproximado(aulas_por_modalidade)
+    if tabela in indices_texto:
+        total += sum(_tamanho_aproximado(colecao) for colecao in vars(indices_texto[tabela]).values())
+    return total
+
+def _carregar_dados():
+    if configuracao["persistencia"] == "sqlite":
+        banco = _obter_banco()
+        with banco.transacao():
+            if banco.vazio():
+                _carregar_arquivos()
+                for tabela in arquivos:
+                    banco.importar(tabela, ((chave, registro.para_linha())
+                                            for chave, registro in dados[tabela].items()))
+            _carregar_do_banco(banco)
+    elif configuracao["persistencia"] == "binario":
+        _carregar_binarios()
+    else:
+        _carregar_arquivos()
+
+def _carregar_do_banco(banco):
+    for tabela, tipo in tipos_registro.items():
+        inicio = time.perf_counter()
+        dados[tabela].clear()
+        for linha in banco.linhas(tabela):
+            registro = tipo(*linha.split(';'))
+            dados[tabela][registro.cod] = registro
+        _registrar_carga(tabela, inicio, "sqlite")
+    _sincronizacao["seq"] = banco.ultima_seq()
+    inicio = time.perf_counter()
+    _reconstruir_estruturas()
+    print(f"  índices: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+def _registrar_carga(tabela, inicio, origem):
+    milissegundos = (time.perf_counter() - inicio) * 1000
+    print(f"  {tabela}: {len(dados[tabela])} registro(s) em {milissegundos:.1f} ms ({origem})")
+
+def _ler_texto(nome_arquivo, tipo):
+    registros = []
+    with open(nome_arquivo, 'r', encoding='utf-8') as f:
+        for linha in f:
+            linha = linha.strip()
+            if linha:
+                registros.append(tipo(*linha.split(';')))
+    return registros
+
+def _ler_tabela(nome_arquivo, tipo):
+    # Usa o instantâneo binário quando ele corresponde ao .txt; senão lê o
+    # texto e já deixa o instantâneo pronto para a próxima inicialização.
+    if configuracao["instantaneo"]:
+        registros = carregar_instantaneo(nome_arquivo, tipo)
+        if registros is not None:
+            return registros, "instantâneo"
+    registros = _ler_texto(nome_arquivo, tipo)
+    if configuracao["instantaneo"]:
+        _gravar_instantaneo(nome_arquivo, tipo, registros)
+    return registros, "texto"
+
+def _gravar_instantaneo(nome_arquivo, tipo, registros):
+    # O instantâneo é só um acelerador: se não der para gravar, segue sem ele.
+    try:
+        gravar_instantaneo(nome_arquivo, tipo, registros)
+    except OSError:
+        pass
+
+def _carregar_arquivos():
+    com_diario = [tabela for tabela in arquivos if _ler_arquivo(tabela)]
+    inicio = time.perf_counter()
+    _reconstruir_estruturas()
+    print(f"  índices: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    for tabela in com_diario:
+        _compactar(tabela)
+
+def _ler_arquivo(tabela):
+    # Lê o .txt (ou o instantâneo) e o diário da tabela. Devolve True se o
+    # diário tinha alterações que ainda precisam ser compactadas no .txt.
+    nome_arquivo = arquivos[tabela]
+    inicio = time.perf_counter()
+    tipo = tipos_registro[tabela]
+    dados[tabela].clear()
+    origem = "sem arquivo"
+    if os.path.exists(nome_arquivo):
+        registros, origem = _ler_tabela(nome_arquivo, tipo)
+        dados[tabela].update((registro.cod, registro) for registro in registros)
+    diario = _diario(tabela)
+    for operacao, partes in diario.ler():
+        if operacao == "G":
+            registro = tipo(*partes)
+            dados[tabela][registro.cod] = registro
+        elif operacao == "E":
+            dados[tabela].pop(int(partes[0]), None)
+    if diario.registros:
+        origem += f" + {diario.registros} do diário"
+    _registrar_carga(tabela, inicio, origem)
+    return bool(diario.registros) and configuracao["persistencia"] != "diario"
+
+def _carregar_binarios():
+    for tabela in arquivos:
+        _ler_binario(tabela)
+    inicio = time.perf_counter()
+    _reconstruir_estruturas()
+    print(f"  índices: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+def _ler_binario(tabela):
+    # O .dat é (re)criado a partir do .txt quando não existe ou quando o .txt
+    # é mais novo (editado ou gravado em outro modo de persistência).
+    nome_arquivo = arquivos[tabela]
+    inicio = time.perf_counter()
+    if tabela in tabelas_binarias:
+        tabelas_binarias.pop(tabela).fechar(indices[tabela].iterar_em_ordem())
+    dados[tabela].clear()
+    caminho = _caminho_binario(tabela)
+    origem = "binário"
+    if os.path.exists(nome_arquivo) and (not os.path.exists(caminho) or
+                                         os.path.getmtime(nome_arquivo) > os.path.getmtime(caminho)):
+        converter_de_texto(nome_arquivo, caminho, tipos_registro[tabela])
+        origem = "binário, convertido do texto"
+    dados[tabela].update((registro.cod, registro) for registro in _tabela_binaria(tabela).ler_todos())
+    _registrar_carga(tabela, inicio, origem)
+
+@metricas.cronometrado("academia_reconstrucao_segundos")
+def _reconstruir_estruturas():
+    for tabela in arquivos:
+        _construir_estruturas(tabela)
+
+def _construir_estruturas(tabela):
+    # Tudo o que é derivado de uma tabela: árvore, índices reversos das
+    # chaves estrangeiras dela, faturamento (matrículas) e índice de texto.
+    # Os arquivos são gravados em ordem de chave, então a ordenação aqui é
+    # praticamente linear e a árvore é montada de uma vez só.
+    chaves = sorted(dados[tabela])
+    indices[tabela].construir_de_ordenadas(chaves, map(dados[tabela].__getitem__, chaves))
+    for nome, campo in chaves_estrangeiras.get(tabela, {}).items():
+        reverso = indices_reversos[nome]
+        reverso.clear()
+        for chave, registro in dados[tabela].items():
+            reverso.setdefault(getattr(registro, campo), set()).add(chave)
+    if tabela == "matriculas":
+        _reconstruir_faturamento()
+    if tabela in indices_texto:
+        campo = campos_texto[tabela]
+        indices_texto[tabela].construir((cod, getattr(registro, campo)) for cod, registro in dados[tabela].items())
+    _marcar_alteracao(tabela)
+
 def salvar_dados(tabela):
+    # Grava num arquivo temporário e troca pelo definitivo com os.replace,
+    # assim quem lê o arquivo nunca vê uma tabela pela metade.
     nome_arquivo = arquivos[tabela]
-    with open(nome_arquivo, 'w', encoding='utf-8') as f:
-        chaves_ordenadas = sorted(dados[tabela].keys())
-        for chave in chaves_ordenadas:
-            linha = ";".join(map(str, dados[tabela][chave]))
-            f.write(f"{linha}\n")
+    temporario = nome_arquivo + ".tmp"
+    inicio = time.perf_counter()
+    with open(temporario, 'w', encoding='utf-8') as f:
+        for chave in indices[tabela].iterar_em_ordem():
+            f.write(f"{dados[tabela][chave].para_linha()}\n")
+        f.flush()
+        os.fsync(f.fileno())
+        gravados = os.fstat(f.fileno()).st_size
+    os.replace(temporario, nome_arquivo)
+    gravado = os.stat(nome_arquivo)
+    metricas.observar("academia_disco_gravacao_segundos", time.perf_counter() - inicio,
+                      tabela=tabela, modo="texto")
+    metricas.incrementar("academia_disco_bytes_total", gravados, tabela=tabela, modo="texto")
+    _instantaneos_pendentes[tabela] = (os.path.abspath(nome_arquivo), gravado.st_mtime_ns, gravado.st_size)
+
+def _compactar(tabela):
+    if configuracao["persistencia"] == "binario":
+        # Regrava o .dat sem as lápides, em ordem de chave.
+        _tabela_binaria(tabela).compactar([dados[tabela][chave] for chave in indices[tabela].iterar_em_ordem()])
+        return
+    # Grava o snapshot ordenado e só depois esvazia o diário.
+    diario = _diario(tabela)
+    diario.sincronizar()
+    salvar_dados(tabela)
+    diario.truncar()
+    # Logo após a compactação o .txt é igual à memória.
+    _atualizar_instantaneo(tabela)
+
+def _atualizar_instantaneo(tabela, nome_arquivo=None):
+    _instantaneos_pendentes.pop(tabela, None)
+    if configuracao["instantaneo"]:
+        _gravar_instantaneo(nome_arquivo or arquivos[tabela], tipos_registro[tabela],
+                            [dados[tabela][chave] for chave in indices[tabela].iterar_em_ordem()])
+
+@_travar(leitura=tuple(arquivos), compartilhar=False, carregar=False)
+def salvar_instantaneos():
+    # No modo texto cada alteração regrava o .txt; o instantâneo é refeito
+    # uma vez só, na saída. Nos outros modos a memória pode ter alterações
+    # que ainda não estão no .txt, então não se grava daqui.
+    # Só vale se o .txt ainda é o que este processo gravou (mesmo caminho
+    # absoluto, mtime e tamanho), mesmo que o diretório atual tenha mudado.
+    if configuracao["persistencia"] == "texto":
+        for tabela, (caminho, mtime_ns, tamanho) in list(_instantaneos_pendentes.items()):
+            try:
+                atual = os.stat(caminho)
+            except FileNotFoundError:
+                atual = None
+            if atual is not None and (atual.st_mtime_ns, atual.st_size) == (mtime_ns, tamanho):
+                _atualizar_instantaneo(tabela, caminho)
+            else:
+                _instantaneos_pendentes.pop(tabela, None)
+
+@_travar(leitura=tuple(arquivos))
+def compactar(tabela=None):
+    for nome in ([tabela] if tabela else list(arquivos)):
+        _compactar(nome)
+
+@_travar(leitura=tuple(arquivos))
+def converter_para_texto(tabela=None):
+    # Modo "binario": regrava o .txt a partir do .dat (sem perda), por
+    # exemplo antes de voltar para o modo "texto".
+    if configuracao["persistencia"] != "binario":
+        return
+    for nome in ([tabela] if tabela else list(arquivos)):
+        _tabela_binaria(nome).exportar_texto(arquivos[nome])
+
+def fechar_diarios():
+    for diario in diarios.values():
+        diario.fechar()
+
+def fechar_tabelas_binarias():
+    # O índice de cada .dat é gravado na ordem da árvore da tabela.
+    for tabela, binaria in list(tabelas_binarias.items()):
+        binaria.fechar(indices[tabela].iterar_em_ordem())
+    tabelas_binarias.clear()
+
+atexit.register(fechar_diarios)
+atexit.register(fechar_tabelas_binarias)
+atexit.register(salvar_instantaneos)
+
+def _indexar_reverso(tabela, chave, registro):
+    for nome, campo in chaves_estrangeiras.get(tabela, {}).items():
+        indices_reversos[nome].setdefault(getattr(registro, campo), set()).add(chave)
+
+def _desindexar_reverso(tabela, chave, registro):
+    for nome, campo in chaves_estrangeiras.get(tabela, {}).items():
+        pai = getattr(registro, campo)
+        filhos = indices_reversos[nome].get(pai)
+        if filhos is not None:
+            filhos.discard(chave)
+            if not filhos:
+                del indices_reversos[nome][pai]
+
+def _agrupar_aulas_por_modalidade():
+    agrupado = {}
+    for mat in dados["matriculas"].values():
+        cod_mod = mat.cod_modalidade
+        agrupado[cod_mod] = agrupado.get(cod_mod, 0) + mat.qtde_aulas
+    return agrupado
+
+def _reconstruir_faturamento():
+    aulas_por_modalidade.clear()
+    aulas_por_modalidade.update(_agrupar_aulas_por_modalidade())
+
+def _acumular_faturamento(matricula, sinal):
+    cod_mod = matricula.cod_modalidade
+    total = aulas_por_modalidade.get(cod_mod, 0) + sinal * matricula.qtde_aulas
+    if total:
+        aulas_por_modalidade[cod_mod] = total
+    else:
+        aulas_por_modalidade.pop(cod_mod, None)
+
+def _marcar_alteracao(tabela):
+    versoes[tabela] += 1
+    alteradas_em[tabela] = time.time()
+
+def _memorizar(*tabelas):
+    # Memoriza o resultado enquanto nenhuma das `tabelas` mudar. O resultado
+    # é compartilhado entre as chamadas e não deve ser alterado por quem chama.
+    # Se `tabelas` for uma função, ela recebe os argumentos da chamada e
+    # devolve as tabelas de que aquele resultado depende.
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args):
+            chave = (funcao.__name__,) + args
+            dependencias = tabelas[0](*args) if callable(tabelas[0]) else tabelas
+            versao = tuple(versoes[t] for t in dependencias)
+            with _trava_cache_leituras:
+                item = _cache_leituras.get(chave)
+                if item is not None and item[0] == versao:
+                    _cache_leituras.move_to_end(chave)
+                    return item[1]
+            resultado = funcao(*args)
+            with _trava_cache_leituras:
+                _cache_leituras[chave] = (versao, resultado)
+                _cache_leituras.move_to_end(chave)
+                while len(_cache_leituras) > LIMITE_CACHE_LEITURAS:
+                    _cache_leituras.popitem(last=False)
+            return resultado
+        return envoltorio
+    return decorador
+
+def _aplicar_gravacao(tabela, registro):
+    chave = registro.cod
+    anterior = dados[tabela].get(chave)
+    if anterior is not None:
+        _desindexar_reverso(tabela, chave, anterior)
+        if tabela == "matriculas":
+            _acumular_faturamento(anterior, -1)
+    dados[tabela][chave] = registro
+    with metricas.cronometrar("academia_arvore_segundos", tabela=tabela, operacao="inserir"):
+        indices[tabela].inserir(chave, registro)
+    _indexar_reverso(tabela, chave, registro)
+    if tabela == "matriculas":
+        _acumular_faturamento(registro, 1)
+    if tabela in indices_texto:
+        indices_texto[tabela].adicionar(chave, getattr(registro, campos_texto[tabela]))
+    _marcar_alteracao(tabela)
+
+def _aplicar_exclusao(tabela, chave):
+    registro = dados[tabela].pop(chave)
+    with metricas.cronometrar("academia_arvore_segundos", tabela=tabela, operacao="remover"):
+        indices[tabela].remover(chave)
+    _desindexar_reverso(tabela, chave, registro)
+    if tabela == "matriculas":
+        _acumular_faturamento(registro, -1)
+    if tabela in indices_texto:
+        indices_texto[tabela].remover(chave)
+    _marcar_alteracao(tabela)
+
+def _ajustar_total_alunos(modalidade, quantidade):
+    # Troca a modalidade por uma cópia com o novo total (a antiga pode estar
+    # num instantâneo).
+    atualizada = Modalidade(*modalidade)
+    atualizada.total_alunos += quantidade
+    _substituir_registro("modalidades", atualizada)
+
+def _substituir_registro(tabela, registro):
+    # Só para campos que não entram nos índices reversos nem no de texto.
+    dados[tabela][registro.cod] = registro
+    indices[tabela].inserir(registro.cod, registro)
+    _marcar_alteracao(tabela)
+
+def _possui_filhos(nome_indice, cod):
+    return bool(indices_reversos[nome_indice].get(cod))
+
+def get_filhos(nome_indice, cod):
+    return sorted(indices_reversos[nome_indice].get(cod, ()))
+
+def _persistir(tabela, operacao, chave):
+    if configuracao["persistencia"] == "diario":
+        diario = _diario(tabela)
+        with metricas.cronometrar("academia_disco_gravacao_segundos", tabela=tabela, modo="diario"):
+            if operacao == "G":
+                gravados = diario.anexar("G", dados[tabela][chave])
+            else:
+                gravados = diario.anexar("E", [chave])
+        metricas.incrementar("academia_disco_bytes_total", gravados, tabela=tabela, modo="diario")
+        if diario.registros >= configuracao["diario_limite_compactacao"]:
+            _compactar(tabela)
+    elif configuracao["persistencia"] == "binario":
+        binaria = _tabela_binaria(tabela)
+        with metricas.cronometrar("academia_disco_gravacao_segundos", tabela=tabela, modo="binario"):
+            if operacao == "G":
+                gravados = binaria.gravar(dados[tabela][chave])
+            else:
+                gravados = binaria.excluir(chave)
+        metricas.incrementar("academia_disco_bytes_total", gravados, tabela=tabela, modo="binario")
+    elif configuracao["persistencia"] == "sqlite":
+        with metricas.cronometrar("academia_disco_gravacao_segundos", tabela=tabela, modo="sqlite"):
+            if operacao == "G":
+                _obter_banco().gravar(tabela, chave, dados[tabela][chave].para_linha())
+            else:
+                _obter_banco().excluir(tabela, chave)
+    elif configuracao["gravacao"] == "sincrona":
+        salvar_dados(tabela)
+    else:
+        bilhete = _obter_agendador().marcar(tabela)
+        if configuracao["gravacao"] == "grupo":
+            _local.bilhete = max(getattr(_local, "bilhete", 0), bilhete)
+
+def _persistir_gravacoes(tabela, chaves):
+    # No modo texto uma regravação da tabela já cobre todas as chaves.
+    if configuracao["persistencia"] == "texto":
+        if chaves:
+            _persistir(tabela, "G", chaves[0])
+    else:
+        for chave in chaves:
+            _persistir(tabela, "G", chave)
 
 # --- FUNÇÕES AUXILIARES ---
 
@@ -65,285 +867,808 @@ def calcular_imc(peso, altura):
     except ValueError:
         return 0, "Dados inválidos"
 
+def _chaves_pagina(tabela, apos=None, limite=None):
+    # Sem limite percorre a tabela inteira em ordem; com limite usa a
+    # paginação por chave do índice (O(log n + página)).
+    if limite is None:
+        return indices[tabela].iterar_em_ordem(apos, inclusivo=False)
+    return indices[tabela].paginar(apos, limite)
+
 # --- FUNÇÕES DE CIDADES ---
 
+@_travar(leitura=("cidades",))
+@_memorizar("cidades")
 def get_todas_cidades():
-    return sorted(dados["cidades"].values(), key=lambda x: int(x[0]))
+    return [dados["cidades"][cod] for cod in indices["cidades"].iterar_em_ordem()]
 
+@_travar(leitura=("cidades",))
 def get_cidade(cod):
     return dados["cidades"].get(cod)
 
+@_travar(escrita=("cidades",))
 def incluir_cidade(cod, descricao, estado):
-    if indices["cidades"].buscar(cod):
+    if _buscar_chave("cidades", cod):
         return False, "Código de cidade já existe."
-    dados["cidades"][cod] = [cod, descricao, estado]
-    indices["cidades"].inserir(cod)
-    salvar_dados("cidades")
+    _aplicar_gravacao("cidades", Cidade(cod, descricao, estado))
+    _persistir("cidades", "G", cod)
     return True, "Cidade incluída com sucesso."
 
+@_travar(leitura=("alunos", "professores"), escrita=("cidades",))
 def excluir_cidade(cod):
-    if not indices["cidades"].buscar(cod):
+    if not _buscar_chave("cidades", cod):
         return False, "Cidade não encontrada."
     
-    if any(int(aluno[2]) == cod for aluno in dados['alunos'].values()) or \
-       any(int(prof[4]) == cod for prof in dados['professores'].values()):
+    if _possui_filhos("alunos_por_cidade", cod) or \
+       _possui_filhos("professores_por_cidade", cod):
         return False, "Não é possível excluir, cidade em uso por alunos ou professores."
         
-    del dados["cidades"][cod]
-    indices["cidades"].remover(cod)
-    salvar_dados("cidades")
+    _aplicar_exclusao("cidades", cod)
+    _persistir("cidades", "E", cod)
     return True, "Cidade excluída com sucesso."
 
 # --- FUNÇÕES DE ALUNOS ---
 
+@_travar(leitura=("alunos", "cidades"))
+@_memorizar("alunos", "cidades")
 def get_todos_alunos_detalhado():
-    alunos_detalhados = []
-    for aluno in dados["alunos"].values():
-        alunos_detalhados.append(get_aluno_detalhado(int(aluno[0])))
-    return alunos_detalhados
+    return _contar_juncao("alunos", _detalhar_pagina("alunos", list(dados["alunos"].values())))
 
+@_travar(leitura=("alunos", "cidades"))
 def get_aluno_detalhado(cod):
     aluno = dados["alunos"].get(cod)
     if not aluno:
         return None
-    
-    cod_cidade = int(aluno[2])
-    cidade_info = dados["cidades"].get(cod_cidade, ["", "N/A", "N/A"])
-    
-    imc, diag_imc = calcular_imc(aluno[4], aluno[5])
-    
+    imc, diag_imc = calcular_imc(aluno.peso, aluno.altura)
+    return _detalhar_aluno(aluno, imc, diag_imc)
+
+def _detalhar_aluno(aluno, imc, diag_imc):
+    cidade_info = dados["cidades"].get(aluno.cod_cidade, CIDADE_AUSENTE)
     return {
-        "cod_aluno": aluno[0],
-        "nome": aluno[1],
-        "cod_cidade": aluno[2],
-        "data_nasc": aluno[3],
-        "peso": aluno[4],
-        "altura": aluno[5],
-        "cidade_nome": cidade_info[1],
-        "cidade_uf": cidade_info[2],
+        "cod_aluno": aluno.cod_aluno,
+        "nome": aluno.nome,
+        "cod_cidade": aluno.cod_cidade,
+        "data_nasc": aluno.data_nasc,
+        "peso": aluno.peso,
+        "altura": aluno.altura,
+        "cidade_nome": cidade_info.descricao,
+        "cidade_uf": cidade_info.estado,
         "imc": f"{imc:.2f}",
         "imc_diag": diag_imc
     }
 
+@_travar(leitura=("cidades",), escrita=("alunos",))
 def incluir_aluno(cod, nome, cod_cidade, data_nasc, peso, altura):
-    if indices["alunos"].buscar(cod):
+    if _buscar_chave("alunos", cod):
         return False, "Código de aluno já existe."
-    if not indices["cidades"].buscar(cod_cidade):
+    if not _buscar_chave("cidades", cod_cidade):
         return False, "Cidade não encontrada."
     
-    dados["alunos"][cod] = [cod, nome, cod_cidade, data_nasc, peso, altura]
-    indices["alunos"].inserir(cod)
-    salvar_dados("alunos")
+    _aplicar_gravacao("alunos", Aluno(cod, nome, cod_cidade, data_nasc, peso, altura))
+    _persistir("alunos", "G", cod)
     return True, "Aluno incluído com sucesso."
 
+@_travar(leitura=("matriculas",), escrita=("alunos",))
 def excluir_aluno(cod):
-    if not indices["alunos"].buscar(cod):
+    if not _buscar_chave("alunos", cod):
         return False, "Aluno não encontrado."
-    if any(int(mat[1]) == cod for mat in dados['matriculas'].values()):
+    if _possui_filhos("matriculas_por_aluno", cod):
         return False, "Não é possível excluir, aluno possui matrículas."
         
-    del dados["alunos"][cod]
-    indices["alunos"].remover(cod)
-    salvar_dados("alunos")
+    _aplicar_exclusao("alunos", cod)
+    _persistir("alunos", "E", cod)
     return True, "Aluno excluído com sucesso."
 
 
 # --- FUNÇÕES DE PROFESSORES --- 
 
+@_travar(leitura=("professores", "cidades"))
+@_memorizar("professores", "cidades")
 def get_todos_professores_detalhado():
-    lista = []
-    for prof in dados["professores"].values():
-        cod_cidade = int(prof[4])
-        cidade_info = dados["cidades"].get(cod_cidade, ["", "N/A", "N/A"])
-        lista.append({
-            "cod_professor": prof[0],
-            "nome": prof[1],
-            "endereco": prof[2],
-            "telefone": prof[3],
-            "cidade_nome": cidade_info[1],
-            "cidade_uf": cidade_info[2]
-        })
-    return lista
+    return _contar_juncao("professores", _detalhar_pagina("professores", list(dados["professores"].values())))
+
+def _detalhar_professor(prof):
+    cidade_info = dados["cidades"].get(prof.cod_cidade, CIDADE_AUSENTE)
+    return {
+        "cod_professor": prof.cod_professor,
+        "nome": prof.nome,
+        "endereco": prof.endereco,
+        "telefone": prof.telefone,
+        "cidade_nome": cidade_info.descricao,
+        "cidade_uf": cidade_info.estado
+    }
 
+@_travar(leitura=("cidades",), escrita=("professores",))
 def incluir_professor(cod, nome, endereco, telefone, cod_cidade):
-    if indices["professores"].buscar(cod):
+    if _buscar_chave("professores", cod):
         return False, "Código de professor já existe."
-    if not indices["cidades"].buscar(cod_cidade):
+    if not _buscar_chave("cidades", cod_cidade):
         return False, "Cidade não encontrada."
     
-    dados["professores"][cod] = [cod, nome, endereco, telefone, cod_cidade]
-    indices["professores"].inserir(cod)
-    salvar_dados("professores")
+    _aplicar_gravacao("professores", Professor(cod, nome, endereco, telefone, cod_cidade))
+    _persistir("professores", "G", cod)
     return True, "Professor incluído com sucesso."
 
+@_travar(leitura=("modalidades",), escrita=("professores",))
 def excluir_professor(cod):
-    if not indices["professores"].buscar(cod):
+    if not _buscar_chave("professores", cod):
         return False, "Professor não encontrado."
-    if any(int(mod[2]) == cod for mod in dados['modalidades'].values()):
+    if _possui_filhos("modalidades_por_professor", cod):
         return False, "Não é possível excluir, professor está em uma modalidade."
     
-    del dados["professores"][cod]
-    indices["professores"].remover(cod)
-    salvar_dados("professores")
+    _aplicar_exclusao("professores", cod)
+    _persistir("professores", "E", cod)
     return True, "Professor excluído com sucesso."
 
 # --- FUNÇÕES DE MODALIDADES ---
 
+@_travar(leitura=("modalidades", "professores"))
+@_memorizar("modalidades", "professores")
 def get_todas_modalidades_detalhado():
-    lista = []
-    for mod in dados["modalidades"].values():
-        cod_prof = int(mod[2])
-        prof_info = dados["professores"].get(cod_prof, ["", "N/A"])
-        lista.append({
-            "cod_modalidade": mod[0],
-            "descricao": mod[1],
-            "professor_nome": prof_info[1],
-            "valor_aula": float(mod[3]),
-            "limite_alunos": mod[4],
-            "total_alunos": mod[5]
-        })
-    return lista
+    return _contar_juncao("modalidades", _detalhar_pagina("modalidades", list(dados["modalidades"].values())))
 
+def _detalhar_modalidade(mod):
+    prof_info = dados["professores"].get(mod.cod_professor, PROFESSOR_AUSENTE)
+    return {
+        "cod_modalidade": mod.cod_modalidade,
+        "descricao": mod.descricao,
+        "professor_nome": prof_info.nome,
+        "valor_aula": mod.valor_aula,
+        "limite_alunos": mod.limite_alunos,
+        "total_alunos": mod.total_alunos
+    }
+
+@_travar(leitura=("professores",), escrita=("modalidades",))
 def incluir_modalidade(cod, desc, cod_prof, valor, limite):
-    if indices["modalidades"].buscar(cod):
+    if _buscar_chave("modalidades", cod):
         return False, "Código de modalidade já existe."
-    if not indices["professores"].buscar(cod_prof):
+    if not _buscar_chave("professores", cod_prof):
         return False, "Professor não encontrado."
     
-    dados["modalidades"][cod] = [cod, desc, cod_prof, valor, limite, 0]
-    indices["modalidades"].inserir(cod)
-    salvar_dados("modalidades")
+    _aplicar_gravacao("modalidades", Modalidade(cod, desc, cod_prof, valor, limite, 0))
+    _persistir("modalidades", "G", cod)
     return True, "Modalidade incluída com sucesso."
 
+@_travar(leitura=("matriculas",), escrita=("modalidades",))
 def excluir_modalidade(cod):
-    if not indices["modalidades"].buscar(cod):
+    if not _buscar_chave("modalidades", cod):
         return False, "Modalidade não encontrada."
-    if any(int(mat[2]) == cod for mat in dados['matriculas'].values()):
+    if _possui_filhos("matriculas_por_modalidade", cod):
         return False, "Não é possível excluir, modalidade possui matrículas."
         
-    del dados["modalidades"][cod]
-    indices["modalidades"].remover(cod)
-    salvar_dados("modalidades")
+    _aplicar_exclusao("modalidades", cod)
+    _persistir("modalidades", "E", cod)
     return True, "Modalidade excluída com sucesso."
 
 
 # --- FUNÇÕES DE MATRÍCULAS ---
 
-def get_todas_matriculas_detalhado():
-    lista = []
-    for mat in dados["matriculas"].values():
-        cod_aluno = int(mat[1])
-        cod_mod = int(mat[2])
-        
-        aluno_info = dados["alunos"].get(cod_aluno, ["", "N/A"])
-        mod_info = dados["modalidades"].get(cod_mod, ["", "N/A", 0, 0.0])
-        
-        valor_a_pagar = int(mat[3]) * float(mod_info[3])
-        
-        lista.append({
-            "cod_matricula": mat[0],
-            "aluno_nome": aluno_info[1],
-            "modalidade_desc": mod_info[1],
-            "qtde_aulas": mat[3],
-            "valor_a_pagar": f"{valor_a_pagar:.2f}"
-        })
-    return lista
+@_travar(leitura=("matriculas", "alunos", "modalidades"))
+@_memorizar("matriculas", "alunos", "modalidades")
+def get_todas_matriculas_detalhado(apos=None, limite=None):
+    return _contar_juncao("matriculas", _detalhar_pagina("matriculas", [dados["matriculas"][cod]
+                                                         for cod in _chaves_pagina("matriculas", apos, limite)]))
 
+def _detalhar_matricula(mat):
+    aluno_info = dados["alunos"].get(mat.cod_aluno, ALUNO_AUSENTE)
+    mod_info = dados["modalidades"].get(mat.cod_modalidade, MODALIDADE_AUSENTE)
+    
+    valor_a_pagar = mat.qtde_aulas * mod_info.valor_aula
+    
+    return {
+        "cod_matricula": mat.cod_matricula,
+        "aluno_nome": aluno_info.nome,
+        "modalidade_desc": mod_info.descricao,
+        "qtde_aulas": mat.qtde_aulas,
+        "valor_a_pagar": f"{valor_a_pagar:.2f}"
+    }
+
+@_travar(leitura=("alunos",), escrita=("matriculas", "modalidades"))
 def incluir_matricula(cod, cod_aluno, cod_modalidade, qtde_aulas):
-    if indices["matriculas"].buscar(cod):
+    if _buscar_chave("matriculas", cod):
         return False, "Código de matrícula já existe."
-    if not indices["alunos"].buscar(cod_aluno):
+    if not _buscar_chave("alunos", cod_aluno):
         return False, "Aluno não encontrado."
-    if not indices["modalidades"].buscar(cod_modalidade):
+    if not _buscar_chave("modalidades", cod_modalidade):
         return False, "Modalidade não encontrada."
 
     modalidade = dados["modalidades"][cod_modalidade]
-    limite_alunos = int(modalidade[4])
-    total_matriculados = int(modalidade[5])
 
-    if total_matriculados >= limite_alunos:
+    if modalidade.total_alunos >= modalidade.limite_alunos:
         return False, "Não há vagas nesta modalidade."
 
-    dados["matriculas"][cod] = [cod, cod_aluno, cod_modalidade, qtde_aulas]
-    indices["matriculas"].inserir(cod)
+    _aplicar_gravacao("matriculas", Matricula(cod, cod_aluno, cod_modalidade, qtde_aulas))
     
-    dados["modalidades"][cod_modalidade][5] = total_matriculados + 1
+    _ajustar_total_alunos(modalidade, 1)
     
-    salvar_dados("matriculas")
-    salvar_dados("modalidades")
+    _persistir("matriculas", "G", cod)
+    _persistir("modalidades", "G", cod_modalidade)
     return True, "Matrícula realizada com sucesso."
 
+@_travar(leitura=("alunos",), escrita=("matriculas", "modalidades"))
+def incluir_matriculas_em_lote(itens):
+    # itens = [(cod_matricula ou None, cod_aluno, cod_modalidade, qtde_aulas)].
+    # Tudo ou nada: todos os itens e as vagas de cada modalidade são
+    # conferidos antes de qualquer alteração. Códigos None recebem os
+    # próximos códigos livres. Devolve (sucesso, msg, [(cod, ok, msg)]).
+    if not itens:
+        return False, "Nenhum item informado.", []
+    proximo = (indices["matriculas"].selecionar(len(indices["matriculas"]) - 1) + 1
+               if len(indices["matriculas"]) else 1)
+    # Os códigos automáticos pulam os pedidos explicitamente em qualquer
+    # posição do lote, não só nos itens anteriores.
+    explicitos = {item[0] for item in itens if item[0] is not None}
+    vistos = set()
+    pedidos = {}
+    validados = []
+    for cod, cod_aluno, cod_modalidade, qtde_aulas in itens:
+        if cod is None:
+            while proximo in explicitos:
+                proximo += 1
+            cod = proximo
+            proximo += 1
+        if cod in vistos:
+            msg = "Código repetido no lote."
+        elif _buscar_chave("matriculas", cod):
+            msg = "Código de matrícula já existe."
+        elif not _buscar_chave("alunos", cod_aluno):
+            msg = "Aluno não encontrado."
+        elif not _buscar_chave("modalidades", cod_modalidade):
+            msg = "Modalidade não encontrada."
+        else:
+            msg = None
+            pedidos[cod_modalidade] = pedidos.get(cod_modalidade, 0) + 1
+        vistos.add(cod)
+        validados.append([cod, msg, cod_aluno, cod_modalidade, qtde_aulas])
+
+    sem_vagas = {}
+    for cod_modalidade, quantidade in pedidos.items():
+        modalidade = dados["modalidades"][cod_modalidade]
+        restantes = modalidade.limite_alunos - modalidade.total_alunos
+        if quantidade > restantes:
+            sem_vagas[cod_modalidade] = f"Vagas insuficientes nesta modalidade (restam {max(restantes, 0)})."
+    for item in validados:
+        if item[1] is None and item[3] in sem_vagas:
+            item[1] = sem_vagas[item[3]]
+
+    if any(msg is not None for _, msg, *_ in validados):
+        resultados = [(cod, False, msg or "Não realizada: o lote tem itens com erro.")
+                      for cod, msg, *_ in validados]
+        return False, "Nenhuma matrícula realizada: corrija os itens com erro.", resultados
+
+    # Inserção em ordem de código e uma gravação por tabela.
+    for cod, _, cod_aluno, cod_modalidade, qtde_aulas in sorted(validados):
+        _aplicar_gravacao("matriculas", Matricula(cod, cod_aluno, cod_modalidade, qtde_aulas))
+    for cod_modalidade, quantidade in pedidos.items():
+        _ajustar_total_alunos(dados["modalidades"][cod_modalidade], quantidade)
+    _persistir_gravacoes("matriculas", [item[0] for item in validados])
+    _persistir_gravacoes("modalidades", list(pedidos))
+    resultados = [(cod, True, "Matrícula realizada com sucesso.") for cod, *_ in validados]
+    return True, f"{len(resultados)} matrícula(s) realizada(s) com sucesso.", resultados
+
+@_travar(escrita=("matriculas", "modalidades"))
 def excluir_matricula(cod):
-    if not indices["matriculas"].buscar(cod):
+    if not _buscar_chave("matriculas", cod):
         return False, "Matrícula não encontrada."
     
     matricula = dados["matriculas"][cod]
-    cod_modalidade = int(matricula[2])
+    cod_modalidade = matricula.cod_modalidade
 
     if cod_modalidade in dados["modalidades"]:
-        dados["modalidades"][cod_modalidade][5] = int(dados["modalidades"][cod_modalidade][5]) - 1
-        salvar_dados("modalidades")
+        _ajustar_total_alunos(dados["modalidades"][cod_modalidade], -1)
+        _persistir("modalidades", "G", cod_modalidade)
         
-    del dados["matriculas"][cod]
-    indices["matriculas"].remover(cod)
-    salvar_dados("matriculas")
+    _aplicar_exclusao("matriculas", cod)
+    _persistir("matriculas", "E", cod)
     return True, "Matrícula excluída com sucesso."
 
+@_travar(leitura=("matriculas",))
+def get_matriculas_do_aluno(cod_aluno):
+    return [dados["matriculas"][cod] for cod in get_filhos("matriculas_por_aluno", cod_aluno)]
+
+@_travar(leitura=("matriculas",))
+def get_matriculas_da_modalidade(cod_modalidade):
+    return [dados["matriculas"][cod] for cod in get_filhos("matriculas_por_modalidade", cod_modalidade)]
+
+# --- IMPORTAÇÃO EM LOTE ---
+
+# Chaves estrangeiras conferidas na importação: (campo, tabela pai, mensagem).
+referencias = {
+    "alunos": [("cod_cidade", "cidades", "Cidade não encontrada.")],
+    "professores": [("cod_cidade", "cidades", "Cidade não encontrada.")],
+    "modalidades": [("cod_professor", "professores", "Professor não encontrado.")],
+    "matriculas": [("cod_aluno", "alunos", "Aluno não encontrado."),
+                   ("cod_modalidade", "modalidades", "Modalidade não encontrada.")]
+}
+
+def _persistir_lote(tabela, registros):
+    if configuracao["persistencia"] == "sqlite":
+        banco = _obter_banco()
+        for registro in registros:
+            banco.gravar(tabela, registro.cod, registro.para_linha())
+    elif configuracao["persistencia"] == "diario":
+        _compactar(tabela)
+    elif configuracao["persistencia"] == "binario":
+        binaria = _tabela_binaria(tabela)
+        for registro in registros:
+            binaria.gravar(registro)
+    else:
+        salvar_dados(tabela)
+
+@_travar(escrita=tuple(arquivos))
+def importar_dados(entradas, tamanho_lote=5000):
+    # entradas = {tabela: caminho}. As tabelas são importadas na ordem de
+    # `arquivos` (pais antes dos filhos), com as mesmas regras de incluir_*.
+    # Os índices são reconstruídos em lote e cada tabela é gravada uma vez.
+    relatorio = RelatorioImportacao()
+    novos = {tabela: {} for tabela in arquivos}
+    ocupadas = {}
+
+    def existe(tabela, cod):
+        return cod in dados[tabela] or cod in novos[tabela]
+
+    for tabela in arquivos:
+        if tabela not in entradas:
+            continue
+        for lote in ler_lotes(entradas[tabela], tipos_registro[tabela], relatorio, tabela, tamanho_lote):
+            for numero, registro in lote:
+                motivo = None
+                if existe(tabela, registro.cod):
+                    motivo = "Código já existe."
+                else:
+                    for campo, pai, mensagem in referencias.get(tabela, ()):
+                        if not existe(pai, getattr(registro, campo)):
+                            motivo = mensagem
+                            break
+                if motivo is None and tabela == "matriculas":
+                    cod_mod = registro.cod_modalidade
+                    modalidade = novos["modalidades"].get(cod_mod) or dados["modalidades"][cod_mod]
+                    if cod_mod not in ocupadas:
+                        # Como em incluir_matricula: as vagas vêm de total_alunos.
+                        ocupadas[cod_mod] = modalidade.total_alunos
+                    if ocupadas[cod_mod] >= modalidade.limite_alunos:
+                        motivo = "Não há vagas nesta modalidade."
+                    else:
+                        ocupadas[cod_mod] += 1
+                if motivo is not None:
+                    relatorio.rejeitar(tabela, numero, motivo)
+                    continue
+                if tabela == "modalidades":
+                    registro.total_alunos = 0
+                novos[tabela][registro.cod] = registro
+                relatorio.aceitar(tabela)
+
+    for tabela in arquivos:
+        dados[tabela].update(novos[tabela])
+    for cod_mod, total in ocupadas.items():
+        modalidade = dados["modalidades"][cod_mod]
+        if modalidade.total_alunos != total:
+            modalidade = Modalidade(*modalidade)
+            modalidade.total_alunos = total
+            dados["modalidades"][cod_mod] = novos["modalidades"][cod_mod] = modalidade
+    alteradas = [tabela for tabela in arquivos if novos[tabela]]
+    if alteradas:
+        _reconstruir_estruturas()
+        for tabela in alteradas:
+            _persistir_lote(tabela, novos[tabela].values())
+    return relatorio
+
+# --- LISTAGENS PAGINADAS E SUGESTÕES ---
+
+ORDENACOES = ("cod", "nome")
+
+def _dependencias_lista(tabela, *_, **__):
+    return ("matriculas", "alunos") if tabela == "matriculas" else (tabela,)
+
+# Tabelas lidas ao detalhar os registros de cada tabela numa listagem.
+dependencias_detalhe = {
+    "cidades": ("cidades",),
+    "alunos": ("alunos", "cidades"),
+    "professores": ("professores", "cidades"),
+    "modalidades": ("modalidades", "professores"),
+    "matriculas": ("matriculas", "alunos", "modalidades")
+}
+
+def _dependencias_pagina(tabela, *_, **__):
+    return dependencias_detalhe[tabela]
+
+def _texto_registro(tabela, registro):
+    if tabela == "matriculas":
+        return dados["alunos"].get(registro.cod_aluno, ALUNO_AUSENTE).nome
+    return getattr(registro, campos_texto[tabela])
+
+def _detalhar_pagina(tabela, registros):
+    # Roda com as travas de quem chama já seguradas: usa os _detalhar_*
+    # direto, e o IMC dos alunos sai de um só calcular_imc_lote.
+    if tabela == "alunos":
+        imcs, diagnosticos = calcular_imc_lote([a.peso for a in registros], [a.altura for a in registros])
+        return [_detalhar_aluno(aluno, imc, diag) for aluno, imc, diag in zip(registros, imcs, diagnosticos)]
+    if tabela == "professores":
+        return [_detalhar_professor(registro) for registro in registros]
+    if tabela == "modalidades":
+        return [_detalhar_modalidade(registro) for registro in registros]
+    if tabela == "matriculas":
+        return [_detalhar_matricula(registro) for registro in registros]
+    return registros
+
+@_memorizar(_dependencias_lista)
+def _chaves_ordenadas(tabela, ordenar_por, decrescente, filtro):
+    chaves = indices[tabela].iterar_em_ordem()
+    if filtro and tabela in indices_texto:
+        # O índice de texto já devolve em ordem alfabética.
+        chaves = indices_texto[tabela].buscar(filtro)
+        if ordenar_por != "nome":
+            chaves.sort()
+        if decrescente:
+            chaves.reverse()
+        return chaves
+    if filtro:
+        termo = filtro.casefold()
+        chaves = [cod for cod in chaves
+                  if termo in _texto_registro(tabela, dados[tabela][cod]).casefold()]
+    if ordenar_por == "nome":
+        chaves = sorted(chaves, key=lambda cod: (_texto_registro(tabela, dados[tabela][cod]).casefold(), cod))
+    else:
+        chaves = list(chaves)
+    if decrescente:
+        chaves.reverse()
+    return chaves
+
+@_travar(leitura=_dependencias_pagina)
+def get_pagina(tabela, pagina=1, por_pagina=50, ordenar_por="cod", decrescente=False, filtro=None):
+    # Sem filtro e ordenado por código, a página sai direto do índice:
+    # selecionar() acha a primeira chave em O(log n) e só a página é lida.
+    if ordenar_por not in ORDENACOES:
+        ordenar_por = "cod"
+    pagina = max(pagina, 1)
+    inicio = (pagina - 1) * por_pagina
+    if ordenar_por == "cod" and not filtro:
+        total = len(indices[tabela])
+        if inicio >= total:
+            chaves = []
+        elif decrescente:
+            primeira = indices[tabela].selecionar(total - 1 - inicio)
+            chaves = itertools.islice(indices[tabela].iterar_decrescente(primeira), por_pagina)
+        else:
+            primeira = indices[tabela].selecionar(inicio)
+            chaves = itertools.islice(indices[tabela].iterar_em_ordem(primeira), por_pagina)
+    else:
+        todas = _chaves_ordenadas(tabela, ordenar_por, decrescente, filtro or None)
+        total = len(todas)
+        chaves = todas[inicio:inicio + por_pagina]
+    return {
+        "itens": _contar_juncao(f"pagina_{tabela}", _detalhar_pagina(tabela, [dados[tabela][cod] for cod in chaves])),
+        "pagina": pagina,
+        "por_pagina": por_pagina,
+        "total": total,
+        "paginas": max((total + por_pagina - 1) // por_pagina, 1),
+        "ordenar_por": ordenar_por,
+        "decrescente": decrescente,
+        "filtro": filtro or ""
+    }
+
+def _rotulo_opcao(tabela, registro):
+    if tabela == "cidades":
+        return f"{registro.descricao} - {registro.estado}"
+    return _texto_registro(tabela, registro)
+
+@_travar(leitura=_dependencias_lista)
+def get_opcoes(tabela, termo=None, limite=20):
+    # Pares (código, rótulo) para preencher selects e o autocompletar. Um
+    # termo numérico também casa com o código.
+    if not termo:
+        chaves = itertools.islice(indices[tabela].iterar_em_ordem(), limite)
+    elif tabela in indices_texto:
+        chaves = indices_texto[tabela].buscar(termo, limite)
+        if termo.isdigit() and int(termo) in dados[tabela] and int(termo) not in chaves:
+            chaves = [int(termo)] + chaves[:limite - 1]
+    else:
+        chaves = list(_chaves_ordenadas(tabela, "nome", False, termo)[:limite])
+        if termo.isdigit() and int(termo) in dados[tabela] and int(termo) not in chaves:
+            chaves.insert(0, int(termo))
+            chaves = chaves[:limite]
+    return [(cod, _rotulo_opcao(tabela, dados[tabela][cod])) for cod in chaves]
+
+@_travar(leitura=tuple(indices_texto))
+def buscar_nomes(termo, tabelas=None, limite=20):
+    # Busca por nome (trecho ou início de palavra, sem acentos) em cidades,
+    # alunos e professores: {tabela: [(código, rótulo), ...]}.
+    resultado = {}
+    for tabela in (tabelas or indices_texto):
+        if tabela in indices_texto:
+            resultado[tabela] = [(cod, _rotulo_opcao(tabela, dados[tabela][cod]))
+                                 for cod in indices_texto[tabela].buscar(termo, limite)]
+    return resultado
+
 # --- FUNÇÕES DE RELATÓRIOS ---
 
+@_travar(leitura=("modalidades", "professores", "matriculas"))
+@_memorizar("modalidades", "professores", "matriculas")
 def get_relatorio_faturamento():
     faturamento = {}
     for mod in dados["modalidades"].values():
-        cod_mod = int(mod[0])
-        valor_aula = float(mod[3])
-        total_mod = 0
-        for mat in dados["matriculas"].values():
-            if int(mat[2]) == cod_mod:
-                total_mod += int(mat[3]) * valor_aula
+        cod_mod = mod.cod_modalidade
+        total_mod = aulas_por_modalidade.get(cod_mod, 0) * mod.valor_aula
         
-        prof_info = dados["professores"].get(int(mod[2]), ["", "N/A"])
+        prof_info = dados["professores"].get(mod.cod_professor, PROFESSOR_AUSENTE)
         
         faturamento[cod_mod] = {
-            "descricao": mod[1],
-            "professor_nome": prof_info[1],
+            "descricao": mod.descricao,
+            "professor_nome": prof_info.nome,
             "valor_faturado": f"{total_mod:.2f}"
         }
+    metricas.incrementar("academia_juncao_linhas_total", len(faturamento), consulta="relatorio_faturamento")
     return faturamento
 
-def get_relatorio_matriculas_ordenado():
-    chaves_ordenadas = indices["matriculas"].obter_chaves_em_ordem()
+@_travar(leitura=("alunos", "modalidades", "matriculas"))
+@_memorizar("alunos", "modalidades", "matriculas")
+def get_faturamento_agrupado():
+    # Faturamento por modalidade, professor e cidade do aluno, calculado em
+    # lote (NumPy quando disponível). As colunas só são montadas de novo
+    # quando uma das tabelas muda.
+    return ColunasAcademia(dados).faturamento()
+
+@_travar(leitura=("matriculas",))
+def verificar_consistencia_faturamento():
+    # Compara os acumulados com um recálculo completo; devolve as modalidades
+    # divergentes como {cod: (acumulado, recalculado)}.
+    recalculado = _agrupar_aulas_por_modalidade()
+    divergentes = {}
+    for cod_mod in set(recalculado) | set(aulas_por_modalidade):
+        acumulado = aulas_por_modalidade.get(cod_mod, 0)
+        if acumulado != recalculado.get(cod_mod, 0):
+            divergentes[cod_mod] = (acumulado, recalculado.get(cod_mod, 0))
+    return not divergentes, divergentes
+
+# --- INSTANTÂNEOS PARA LEITURA ---
+# Um instantâneo guarda a raiz atual da árvore de cada tabela (O(1) por
+# tabela) e uma cópia do resumo de aulas por modalidade (uma entrada por
+# modalidade). As travas de leitura só são seguradas enquanto ele é tirado,
+# para que nenhuma alteração apareça pela metade; depois disso o relatório
+# lê uma versão congelada dos dados sem bloquear incluir_*/excluir_*.
+
+TABELAS_ACHADOS = ("cidades", "modalidades", "professores")
+
+class Instantaneo:
+    def __init__(self, arvores, aulas_por_modalidade, versao):
+        self.arvores = arvores
+        self.aulas_por_modalidade = aulas_por_modalidade
+        self.versao = versao
+        # Os relatórios buscam os mesmos pais (cidades, modalidades...) muitas
+        # vezes; guarda o que já foi achado na árvore, que é O(log n). Só as
+        # tabelas pequenas: guardar os alunos faria a memória de um relatório
+        # em fluxo crescer com o número de alunos distintos.
+        self._achados = {tabela: _Achados(arvore) for tabela, arvore in arvores.items()
+                         if tabela in TABELAS_ACHADOS}
+
+    def obter(self, tabela, cod, padrao=None):
+        achados = self._achados.get(tabela)
+        registro = achados[cod] if achados is not None else self.arvores[tabela].obter(cod)
+        return padrao if registro is None else registro
+
+class _Achados(dict):
+    def __init__(self, arvore):
+        super().__init__()
+        self.arvore = arvore
+
+    def __missing__(self, cod):
+        registro = self[cod] = self.arvore.obter(cod)
+        return registro
+
+@_travar(leitura=lambda tabelas=tuple(arquivos): tabelas)
+def tirar_instantaneo(tabelas=tuple(arquivos)):
+    return Instantaneo({tabela: indices[tabela].instantaneo() for tabela in tabelas},
+                       dict(aulas_por_modalidade) if "matriculas" in tabelas else {},
+                       tuple(versoes[tabela] for tabela in tabelas))
+
+def agregar_instantaneo(foto):
+    # Totais de uma unidade para os relatórios da rede. Só lê o instantâneo
+    # (sem travas nem métricas), então pode rodar num processo filho.
+    faturamento = {}
+    for cod_mod, modalidade in foto.arvores["modalidades"].iterar_itens():
+        professor = foto.obter("professores", modalidade.cod_professor, PROFESSOR_AUSENTE)
+        faturamento[cod_mod] = (modalidade.descricao, professor.nome,
+                                foto.aulas_por_modalidade.get(cod_mod, 0) * modalidade.valor_aula)
+    por_cidade = {}
+    valor_total = 0
+    for _, matricula in foto.arvores["matriculas"].iterar_itens():
+        aluno = foto.obter("alunos", matricula.cod_aluno, ALUNO_AUSENTE)
+        cidade = foto.obter("cidades", aluno.cod_cidade, CIDADE_AUSENTE)
+        modalidade = foto.obter("modalidades", matricula.cod_modalidade, MODALIDADE_AUSENTE)
+        valor = matricula.qtde_aulas * modalidade.valor_aula
+        valor_total += valor
+        # Os códigos são de cada unidade; a rede junta as cidades pelo nome.
+        totais = por_cidade.setdefault((cidade.descricao, cidade.estado), [0, 0])
+        totais[0] += 1
+        totais[1] += valor
+    return {
+        "matriculas": len(foto.arvores["matriculas"]),
+        "valor_total": valor_total,
+        "faturamento": faturamento,
+        "por_cidade": por_cidade
+    }
+
+def _centavos(qtde_aulas, valor_aula):
+    # Os totais dos relatórios são somados em centavos inteiros: a soma das
+    # linhas e a soma por modalidade (nas páginas) dão exatamente o mesmo valor.
+    return round(qtde_aulas * valor_aula * 100)
+
+def _valor_total_matriculas(foto):
+    total = 0
+    for cod_mod, aulas in foto.aulas_por_modalidade.items():
+        modalidade = foto.obter("modalidades", cod_mod)
+        if modalidade is not None:
+            total += _centavos(aulas, modalidade.valor_aula)
+    return total
+
+def _linha_relatorio_matricula(matricula, foto):
+    aluno_info = foto.obter("alunos", matricula.cod_aluno, ALUNO_AUSENTE)
+    cidade_aluno_info = foto.obter("cidades", aluno_info.cod_cidade, CIDADE_AUSENTE)
+
+    modalidade_info = foto.obter("modalidades", matricula.cod_modalidade, MODALIDADE_AUSENTE)
+    prof_info = foto.obter("professores", modalidade_info.cod_professor, PROFESSOR_AUSENTE)
+
+    valor_a_pagar = _centavos(matricula.qtde_aulas, modalidade_info.valor_aula)
+    return valor_a_pagar, {
+        "cod_matricula": matricula.cod_matricula,
+        "aluno_nome": aluno_info.nome,
+        "cidade_aluno": cidade_aluno_info.descricao,
+        "modalidade_desc": modalidade_info.descricao,
+        "professor_nome": prof_info.nome,
+        "valor_a_pagar": f"{valor_a_pagar / 100:.2f}"
+    }
+
+@_atualizar_antes("matriculas", "alunos", "cidades", "modalidades", "professores")
+@_memorizar("matriculas", "alunos", "cidades", "modalidades", "professores")
+def get_relatorio_matriculas_ordenado(apos=None, limite=None):
+    # Lido de um instantâneo. A memorização usa as versões de antes do
+    # instantâneo, então um resultado mais novo que a chave nunca é servido
+    # como atual por engano (no máximo é recalculado).
+    foto = tirar_instantaneo()
+    matriculas = foto.arvores["matriculas"]
     valor_total_geral = 0
     matriculas_detalhadas = []
 
-    for cod_matricula in chaves_ordenadas:
-        matricula = dados["matriculas"][cod_matricula]
-        
-        cod_aluno = int(matricula[1])
-        aluno_info = dados["alunos"].get(cod_aluno, ["", "N/A", "0"])
-        cidade_aluno_info = dados["cidades"].get(int(aluno_info[2]), ["", "N/A"])
-        
-        cod_modalidade = int(matricula[2])
-        modalidade_info = dados["modalidades"].get(cod_modalidade, ["", "N/A", "0", "0.0"])
-        
-        cod_prof = int(modalidade_info[2])
-        prof_info = dados["professores"].get(cod_prof, ["", "N/A"])
-
-        qtde_aulas = int(matricula[3])
-        valor_aula = float(modalidade_info[3])
-        valor_a_pagar = qtde_aulas * valor_aula
+    itens = matriculas.iterar_itens(apos, inclusivo=False)
+    if limite is not None:
+        itens = itertools.islice(itens, max(limite, 0))
+    for _, matricula in itens:
+        valor_a_pagar, linha = _linha_relatorio_matricula(matricula, foto)
         valor_total_geral += valor_a_pagar
-        
-        matriculas_detalhadas.append({
-            "cod_matricula": matricula[0],
-            "aluno_nome": aluno_info[1],
-            "cidade_aluno": cidade_aluno_info[1],
-            "modalidade_desc": modalidade_info[1],
-            "professor_nome": prof_info[1],
-            "valor_a_pagar": f"{valor_a_pagar:.2f}"
-        })
+        matriculas_detalhadas.append(linha)
+    _contar_juncao("relatorio_matriculas", matriculas_detalhadas)
+
+    if limite is None:
+        total_matriculas = len(matriculas_detalhadas)
+        proxima = None
+    else:
+        # Numa página os totais continuam sendo os da tabela inteira.
+        total_matriculas = len(matriculas)
+        valor_total_geral = _valor_total_matriculas(foto)
+        proxima = None
+        if len(matriculas_detalhadas) == limite:
+            ultima = matriculas_detalhadas[-1]["cod_matricula"]
+            if matriculas.teto(ultima + 1) is not None:
+                proxima = ultima
         
     return {
         "matriculas": matriculas_detalhadas,
-        "total_matriculas": len(matriculas_detalhadas),
-        "valor_total_geral": f"{valor_total_geral:.2f}"
-    }
\ No newline at end of file
+        "total_matriculas": total_matriculas,
+        "valor_total_geral": f"{valor_total_geral / 100:.2f}",
+        "proxima": proxima
+    }
+
+# Relatório geral em fluxo: as linhas são montadas em pedaços a partir de um
+# instantâneo tirado no início e entregues ao template uma a uma. A memória
+# fica limitada a um pedaço, nenhuma trava fica presa enquanto o cliente
+# recebe a resposta e todas as linhas e totais são da mesma versão dos dados.
+TAMANHO_PEDACO_RELATORIO = 500
+
+class RelatorioMatriculas:
+    # Iterável de linhas em ordem de código. Os totais (total_matriculas,
+    # valor_total_geral, proxima) só ficam prontos depois da última linha,
+    # por isso o template os mostra no rodapé.
+    def __init__(self, apos=None, limite=None, tamanho_pedaco=TAMANHO_PEDACO_RELATORIO):
+        self.apos = apos
+        self.limite = limite
+        self.tamanho_pedaco = tamanho_pedaco
+        self.total_matriculas = 0
+        self.proxima = None
+        self._valor_total = 0
+
+    @property
+    def valor_total_geral(self):
+        return f"{self._valor_total / 100:.2f}"
+
+    def __iter__(self):
+        foto = tirar_instantaneo()
+        matriculas = foto.arvores["matriculas"]
+        itens = matriculas.iterar_itens(self.apos, inclusivo=False)
+        if self.limite is not None:
+            itens = itertools.islice(itens, max(self.limite, 0))
+        emitidas = 0
+        ultima = None
+        while True:
+            pedaco = _contar_juncao("relatorio_matriculas",
+                                    [_linha_relatorio_matricula(matricula, foto)
+                                     for _, matricula in itertools.islice(itens, self.tamanho_pedaco)])
+            for valor_a_pagar, linha in pedaco:
+                emitidas += 1
+                ultima = linha["cod_matricula"]
+                self._valor_total += valor_a_pagar
+                self.total_matriculas = emitidas
+                yield linha
+            if len(pedaco) < self.tamanho_pedaco:
+                break
+        if self.limite is not None:
+            # Numa página os totais continuam sendo os da tabela inteira.
+            self.total_matriculas = len(matriculas)
+            self._valor_total = _valor_total_matriculas(foto)
+            if emitidas and emitidas == self.limite and matriculas.teto(ultima + 1) is not None:
+                self.proxima = ultima
+
+# --- EXPORTAÇÃO ---
+# Linhas das tabelas e dos relatórios em ordem de código. Tabelas e relatório
+# de matrículas saem de um instantâneo; o faturamento, que depende do resumo
+# de aulas, é lido em pedaços sob a trava de leitura.
+
+def _iterar_em_pedacos(pedaco, chave, tamanho=TAMANHO_PEDACO_RELATORIO):
+    # pedaco(apos, quantidade) devolve até `quantidade` itens após `apos`.
+    apos = None
+    while True:
+        itens = pedaco(apos, tamanho)
+        yield from itens
+        if len(itens) < tamanho:
+            return
+        apos = chave(itens[-1])
+
+def iterar_tabela(tabela):
+    foto = tirar_instantaneo((tabela,))
+    for _, registro in foto.arvores[tabela].iterar_itens():
+        yield tuple(registro)
+
+@_travar(leitura=("modalidades", "professores", "matriculas"))
+def _pedaco_faturamento(apos, quantidade):
+    linhas = []
+    for cod_mod in indices["modalidades"].paginar(apos, quantidade):
+        mod = dados["modalidades"][cod_mod]
+        prof_info = dados["professores"].get(mod.cod_professor, PROFESSOR_AUSENTE)
+        total_mod = aulas_por_modalidade.get(cod_mod, 0) * mod.valor_aula
+        linhas.append((cod_mod, mod.descricao, prof_info.nome, round(total_mod, 2)))
+    return _contar_juncao("relatorio_faturamento", linhas)
+
+def iterar_relatorio_faturamento():
+    return _iterar_em_pedacos(_pedaco_faturamento, lambda linha: linha[0])
+
+def iterar_relatorio_matriculas():
+    foto = tirar_instantaneo()
+    for _, matricula in foto.arvores["matriculas"].iterar_itens():
+        valor_a_pagar, linha = _linha_relatorio_matricula(matricula, foto)
+        yield (linha["cod_matricula"], linha["aluno_nome"], linha["cidade_aluno"],
+               linha["modalidade_desc"], linha["professor_nome"], valor_a_pagar / 100)
+
+# nome: (campos, gerador de linhas, tabelas das quais depende)
+EXPORTACOES = {tabela: (tipos_registro[tabela].campos, functools.partial(iterar_tabela, tabela), (tabela,))
+               for tabela in arquivos}
+EXPORTACOES["relatorio_faturamento"] = (
+    ("cod_modalidade", "descricao", "professor_nome", "valor_faturado"),
+    iterar_relatorio_faturamento,
+    ("modalidades", "professores", "matriculas"))
+EXPORTACOES["relatorio_matriculas"] = (
+    ("cod_matricula", "aluno_nome", "cidade_aluno", "modalidade_desc", "professor_nome", "valor_a_pagar"),
+    iterar_relatorio_matriculas,
+    tuple(arquivos))
+
+@_travar(leitura=lambda tabelas: tabelas)
+def versao_dados(tabelas):
+    # No modo "sqlite" o seq do banco é o mesmo em todos os processos; nos
+    # outros modos vale o contador de versões das tabelas nesta carga.
+    if configuracao["persistencia"] == "sqlite":
+        return f"s{_sincronizacao['seq']}"
+    return _geracao + "-" + ".".join(str(versoes[tabela]) for tabela in tabelas)
+
+@_travar(leitura=lambda tabelas: tabelas)
+def modificado_em(tabelas):
+    # Última alteração das `tabelas` (segundos inteiros, a precisão do
+    # Last-Modified). Ler depois de versao_dados: assim a data nunca é mais
+    # antiga que a versão que a acompanha.
+    return int(max(alteradas_em[tabela] for tabela in tabelas))
@@ -0,0 +1,96 @@
+import sys
+import threading
+import time
+
+# --- GRAVAÇÃO ADIADA (WRITE-BEHIND) ---
+# As alterações marcam a tabela como suja e uma thread regrava as tabelas
+# sujas de uma vez: depois de `intervalo` segundos da primeira marcação ou
+# assim que `limite` alterações se acumulam. Cada marcação recebe um bilhete
+# (número crescente); aguardar(bilhete) bloqueia até uma gravação que começou
+# depois daquela marcação terminar. É assim que o modo "grupo" junta várias
+# requisições numa única regravação e ainda responde só depois do disco.
+
+class AgendadorGravacao:
+    def __init__(self, gravar, intervalo=0.05, limite=256):
+        self._gravar = gravar
+        self.intervalo = intervalo
+        self.limite = limite
+        self._condicao = threading.Condition()
+        self._gravando = threading.Lock()
+        self._sujas = set()
+        self._pendentes = 0
+        self._marcado = 0
+        self._gravado = 0
+        self._erro = None
+        self._erro_ate = 0
+        self._encerrado = False
+        self._thread = threading.Thread(target=self._laco, name="gravacao-adiada", daemon=True)
+        self._thread.start()
+
+    def marcar(self, tabela):
+        with self._condicao:
+            self._sujas.add(tabela)
+            self._marcado += 1
+            self._pendentes += 1
+            self._condicao.notify_all()
+            return self._marcado
+
+    def aguardar(self, bilhete):
+        # Se a gravação que cobria o bilhete falhou, o erro vai para quem espera.
+        with self._condicao:
+            while self._gravado < bilhete:
+                if self._erro is not None and self._erro_ate >= bilhete:
+                    raise self._erro
+                self._condicao.wait()
+
+    def _laco(self):
+        while True:
+            with self._condicao:
+                while not self._sujas and not self._encerrado:
+                    self._condicao.wait()
+                if self._encerrado:
+                    return
+                prazo = time.monotonic() + self.intervalo
+                while self._pendentes < self.limite and not self._encerrado:
+                    restante = prazo - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self._condicao.wait(restante)
+            try:
+                self.descarregar()
+            except Exception as erro:
+                # As tabelas continuam sujas; tenta de novo no próximo ciclo.
+                print(f"Falha na gravação adiada: {erro}", file=sys.stderr)
+                time.sleep(self.intervalo)
+
+    def descarregar(self):
+        # Grava agora todas as tabelas sujas. Não deve ser chamada por quem
+        # segura travas de tabela: a gravação precisa da trava de leitura.
+        with self._gravando:
+            with self._condicao:
+                tabelas = self._sujas
+                self._sujas = set()
+                self._pendentes = 0
+                ate = self._marcado
+            try:
+                for tabela in tabelas:
+                    self._gravar(tabela)
+            except Exception as erro:
+                with self._condicao:
+                    self._sujas |= tabelas
+                    self._erro = erro
+                    self._erro_ate = ate
+                    self._condicao.notify_all()
+                raise
+            with self._condicao:
+                self._gravado = max(self._gravado, ate)
+                self._erro = None
+                self._condicao.notify_all()
+            return len(tabelas)
+
+    def encerrar(self):
+        with self._condicao:
+            self._encerrado = True
+            self._condicao.notify_all()
+        self._thread.join()
+        self.descarregar()
@@ -0,0 +1,77 @@
+import argparse
+import csv
+import itertools
+
+# --- IMPORTAÇÃO EM LOTE ---
+# Lê arquivos grandes (CSV com ',' ou o formato ';' dos .txt) em fluxo, um
+# lote de linhas por vez, convertendo cada linha no registro tipado da
+# tabela. A validação de chaves e vagas e a gravação ficam em
+# gestao_academia_lib.importar_dados.
+
+class RelatorioImportacao:
+    def __init__(self):
+        self.aceitos = {}
+        self.rejeitados = []
+
+    def aceitar(self, tabela):
+        self.aceitos[tabela] = self.aceitos.get(tabela, 0) + 1
+
+    def rejeitar(self, tabela, linha, motivo):
+        self.rejeitados.append((tabela, linha, motivo))
+
+    def resumo(self):
+        linhas = [f"{tabela}: {total} registro(s) importado(s)" for tabela, total in self.aceitos.items()]
+        linhas.append(f"{len(self.rejeitados)} linha(s) rejeitada(s)")
+        for tabela, linha, motivo in self.rejeitados:
+            linhas.append(f"  {tabela}, linha {linha}: {motivo}")
+        return "\n".join(linhas)
+
+def _detectar_separador(caminho):
+    with open(caminho, 'r', encoding='utf-8', newline='') as f:
+        for linha in f:
+            if linha.strip():
+                return ';' if ';' in linha else ','
+    return ';'
+
+def ler_lotes(caminho, tipo, relatorio, tabela, tamanho_lote=5000):
+    # Gera listas de (número da linha, registro). Linhas que não convertem
+    # vão direto para o relatório; um cabeçalho na primeira linha é ignorado.
+    separador = _detectar_separador(caminho)
+    with open(caminho, 'r', encoding='utf-8', newline='') as f:
+        leitor = csv.reader(f, delimiter=separador)
+        numerados = ((numero, campos) for numero, campos in enumerate(leitor, 1) if campos)
+        while True:
+            brutos = list(itertools.islice(numerados, tamanho_lote))
+            if not brutos:
+                return
+            lote = []
+            for numero, campos in brutos:
+                campos = [campo.strip() for campo in campos]
+                if numero == 1 and not campos[0].lstrip('-').isdigit():
+                    continue
+                try:
+                    lote.append((numero, tipo(*campos)))
+                except (TypeError, ValueError) as erro:
+                    relatorio.rejeitar(tabela, numero, f"linha inválida ({erro})")
+            if lote:
+                yield lote
+
+def main(argv=None):
+    import gestao_academia_lib as lib
+
+    parser = argparse.ArgumentParser(description="Importa arquivos grandes para as tabelas da academia.")
+    for tabela in lib.arquivos:
+        parser.add_argument(f"--{tabela}", metavar="ARQUIVO", help=f"arquivo com {tabela} (CSV ou ';')")
+    parser.add_argument("--lote", type=int, default=5000, help="linhas validadas por lote")
+    args = parser.parse_args(argv)
+
+    entradas = {tabela: getattr(args, tabela) for tabela in lib.arquivos if getattr(args, tabela)}
+    if not entradas:
+        parser.error("informe ao menos um arquivo para importar")
+    lib.carregar_dados()
+    relatorio = lib.importar_dados(entradas, args.lote)
+    print(relatorio.resumo())
+    return 1 if relatorio.rejeitados else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
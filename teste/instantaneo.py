@@ -0,0 +1,148 @@
+import mmap
+import os
+import pickle
+import struct
+import sys
+import zlib
+from array import array
+
+# --- INSTANTÂNEO BINÁRIO DAS TABELAS (.snap) ---
+# Cópia binária de cada .txt, usada para acelerar a carga na inicialização.
+# Os dados ficam em colunas: as numéricas viram array('q')/array('d')
+# gravadas fora do pickle (protocolo 5, buffers out-of-band) e lidas direto
+# do mmap; as de texto vão dentro do pickle como listas de str.
+#
+# Layout: cabeçalho | tamanho de cada buffer | pickle | buffers
+# O cabeçalho guarda mtime, tamanho e crc32 do .txt de origem: se o .txt
+# mudou, o instantâneo é ignorado e a tabela é lida do texto.
+
+MAGICO = b"ACADSNAP"
+VERSAO = 1
+CABECALHO = struct.Struct("<8sHHHxxqqIIqq")
+# magico, versao, ordem dos bytes, colunas, mtime_ns, tamanho, crc da
+# origem, crc dos dados, registros, tamanho do pickle
+ORDEM_BYTES = 1 if sys.byteorder == "little" else 2
+TAMANHO_BLOCO = 1 << 20
+CODIGOS_ARRAY = {int: 'q', float: 'd'}
+
+def caminho_instantaneo(caminho_txt):
+    return os.path.splitext(caminho_txt)[0] + ".snap"
+
+def _crc_arquivo(caminho):
+    crc = 0
+    with open(caminho, 'rb') as f:
+        while True:
+            bloco = f.read(TAMANHO_BLOCO)
+            if not bloco:
+                return crc
+            crc = zlib.crc32(bloco, crc)
+
+def _alinhar(tamanho):
+    return (tamanho + 7) & ~7
+
+def gravar_instantaneo(caminho_txt, tipo, registros):
+    # `registros` deve refletir exatamente o conteúdo atual do .txt.
+    origem = os.stat(caminho_txt)
+    crc_origem = _crc_arquivo(caminho_txt)
+    registros = list(registros)
+    colunas = []
+    buffers = []
+    for posicao, conversor in enumerate(tipo.tipos):
+        valores = [registro[posicao] for registro in registros]
+        codigo = CODIGOS_ARRAY.get(conversor)
+        if codigo is None:
+            colunas.append(valores)
+        else:
+            colunas.append(pickle.PickleBuffer(array(codigo, valores)))
+    corpo = pickle.dumps((tipo.campos, colunas), protocol=5,
+                         buffer_callback=lambda buffer: buffers.append(buffer.raw()))
+    tamanhos = [_alinhar(buffer.nbytes) for buffer in buffers]
+    indice_buffers = struct.pack(f"<{len(buffers)}q", *tamanhos)
+    # O pickle é completado com zeros para que os buffers comecem alinhados.
+    preenchimento = b"\0" * (_alinhar(CABECALHO.size + len(indice_buffers) + len(corpo))
+                             - (CABECALHO.size + len(indice_buffers) + len(corpo)))
+    crc = zlib.crc32(indice_buffers)
+    crc = zlib.crc32(corpo, crc)
+    crc = zlib.crc32(preenchimento, crc)
+    for buffer, tamanho in zip(buffers, tamanhos):
+        crc = zlib.crc32(buffer, crc)
+        crc = zlib.crc32(b"\0" * (tamanho - buffer.nbytes), crc)
+    cabecalho = CABECALHO.pack(MAGICO, VERSAO, ORDEM_BYTES, len(buffers),
+                               origem.st_mtime_ns, origem.st_size, crc_origem, crc,
+                               len(registros), len(corpo) + len(preenchimento))
+    caminho = caminho_instantaneo(caminho_txt)
+    temporario = caminho + ".tmp"
+    with open(temporario, 'wb') as f:
+        f.write(cabecalho)
+        f.write(indice_buffers)
+        f.write(corpo)
+        f.write(preenchimento)
+        for buffer, tamanho in zip(buffers, tamanhos):
+            f.write(buffer)
+            f.write(b"\0" * (tamanho - buffer.nbytes))
+    os.replace(temporario, caminho)
+
+def _origem_confere(caminho_txt, mtime_ns, tamanho, crc_origem):
+    # mtime e tamanho iguais bastam; se só o mtime mudou (arquivo tocado ou
+    # copiado), compara o crc do conteúdo.
+    try:
+        origem = os.stat(caminho_txt)
+    except FileNotFoundError:
+        return False
+    if origem.st_size != tamanho:
+        return False
+    return origem.st_mtime_ns == mtime_ns or _crc_arquivo(caminho_txt) == crc_origem
+
+def carregar_instantaneo(caminho_txt, tipo):
+    # Devolve a lista de registros, ou None se o instantâneo não existe, está
+    # corrompido ou não corresponde mais ao .txt.
+    caminho = caminho_instantaneo(caminho_txt)
+    try:
+        f = open(caminho, 'rb')
+    except FileNotFoundError:
+        return None
+    with f:
+        if os.fstat(f.fileno()).st_size < CABECALHO.size:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            try:
+                return _ler_mapa(mapa, caminho_txt, tipo)
+            except (ValueError, struct.error, pickle.UnpicklingError):
+                return None
+
+def _ler_mapa(mapa, caminho_txt, tipo):
+    (magico, versao, ordem, quantidade_buffers, mtime_ns, tamanho, crc_origem, crc,
+     total, tamanho_corpo) = CABECALHO.unpack_from(mapa, 0)
+    if magico != MAGICO or versao != VERSAO or ordem != ORDEM_BYTES:
+        return None
+    if not _origem_confere(caminho_txt, mtime_ns, tamanho, crc_origem):
+        return None
+    visao = memoryview(mapa)
+    buffers = []
+    try:
+        inicio = CABECALHO.size
+        if zlib.crc32(visao[inicio:]) != crc:
+            return None
+        tamanhos = struct.unpack_from(f"<{quantidade_buffers}q", mapa, inicio)
+        inicio += 8 * quantidade_buffers
+        corpo = visao[inicio:inicio + tamanho_corpo]
+        inicio += tamanho_corpo
+        for tamanho_buffer in tamanhos:
+            buffers.append(visao[inicio:inicio + tamanho_buffer])
+            inicio += tamanho_buffer
+        campos, colunas = pickle.loads(corpo, buffers=buffers)
+        corpo.release()
+        if tuple(campos) != tipo.campos:
+            return None
+        for posicao, conversor in enumerate(tipo.tipos):
+            codigo = CODIGOS_ARRAY.get(conversor)
+            if codigo is not None:
+                # Copia para fora do mmap, que é fechado ao final da carga.
+                coluna = array(codigo)
+                coluna.frombytes(colunas[posicao][:total * coluna.itemsize])
+                colunas[posicao] = coluna
+        return tipo.de_colunas(colunas)
+    finally:
+        for buffer in buffers:
+            buffer.release()
+        visao.release()
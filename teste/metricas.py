@@ -0,0 +1,122 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# --- MÉTRICAS (FORMATO TEXTO DO PROMETHEUS) ---
+# Contadores, medidores e histogramas em memória, por processo, com rótulos.
+# exportar_texto() gera o conteúdo servido em /metrics. ACADEMIA_METRICAS=0
+# desliga a coleta (as funções passam a não fazer nada).
+
+ativo = os.environ.get("ACADEMIA_METRICAS", "1") != "0"
+
+BALDES_PADRAO = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_trava = threading.Lock()
+_descricoes = {}   # nome -> (tipo, ajuda, baldes)
+_valores = {}      # (nome, rótulos) -> valor (contador ou medidor)
+_histogramas = {}  # (nome, rótulos) -> [contagem por balde..., soma, total]
+
+def descrever(nome, tipo, ajuda, baldes=BALDES_PADRAO):
+    _descricoes[nome] = (tipo, ajuda, baldes)
+
+def _chave(nome, rotulos):
+    return nome, tuple(sorted(rotulos.items()))
+
+def incrementar(nome, valor=1, **rotulos):
+    if not ativo:
+        return
+    chave = _chave(nome, rotulos)
+    with _trava:
+        _valores[chave] = _valores.get(chave, 0) + valor
+
+def definir(nome, valor, **rotulos):
+    if not ativo:
+        return
+    with _trava:
+        _valores[_chave(nome, rotulos)] = valor
+
+def observar(nome, valor, **rotulos):
+    if not ativo:
+        return
+    baldes = _descricoes.get(nome, (None, None, BALDES_PADRAO))[2]
+    chave = _chave(nome, rotulos)
+    with _trava:
+        contagens = _histogramas.get(chave)
+        if contagens is None:
+            contagens = _histogramas[chave] = [0] * (len(baldes) + 2)
+        for posicao, limite in enumerate(baldes):
+            if valor <= limite:
+                contagens[posicao] += 1
+                break
+        contagens[-2] += valor
+        contagens[-1] += 1
+
+@contextmanager
+def cronometrar(nome, **rotulos):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(nome, time.perf_counter() - inicio, **rotulos)
+
+def cronometrado(nome, **rotulos):
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            with cronometrar(nome, **rotulos):
+                return funcao(*args, **kwargs)
+        return envoltorio
+    return decorador
+
+def zerar():
+    with _trava:
+        _valores.clear()
+        _histogramas.clear()
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _rotulos(pares, extra=()):
+    pares = list(pares) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + "}"
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+def exportar_texto():
+    with _trava:
+        valores = sorted(_valores.items())
+        histogramas = sorted((chave, list(contagens)) for chave, contagens in _histogramas.items())
+    linhas = []
+    cabecalhos = set()
+
+    def cabecalho(nome, tipo_padrao):
+        if nome in cabecalhos:
+            return
+        cabecalhos.add(nome)
+        tipo, ajuda, _ = _descricoes.get(nome, (tipo_padrao, None, None))
+        if ajuda:
+            linhas.append(f"# HELP {nome} {ajuda}")
+        linhas.append(f"# TYPE {nome} {tipo}")
+
+    for (nome, rotulos), valor in valores:
+        cabecalho(nome, "untyped")
+        linhas.append(f"{nome}{_rotulos(rotulos)} {_numero(valor)}")
+    for (nome, rotulos), contagens in histogramas:
+        cabecalho(nome, "histogram")
+        baldes = _descricoes.get(nome, (None, None, BALDES_PADRAO))[2]
+        acumulado = 0
+        for limite, contagem in zip(baldes, contagens):
+            acumulado += contagem
+            linhas.append(f"{nome}_bucket{_rotulos(rotulos, [('le', _numero(limite))])} {acumulado}")
+        linhas.append(f"{nome}_bucket{_rotulos(rotulos, [('le', '+Inf')])} {contagens[-1]}")
+        linhas.append(f"{nome}_sum{_rotulos(rotulos)} {_numero(contagens[-2])}")
+        linhas.append(f"{nome}_count{_rotulos(rotulos)} {contagens[-1]}")
+    return "\n".join(linhas) + "\n"
@@ -0,0 +1,75 @@
+import collections
+import itertools
+
+# --- REGISTROS TIPADOS DAS TABELAS ---
+# Cada linha das tabelas vira um objeto com __slots__ cujos campos já estão
+# convertidos (int/float/str) uma única vez, na carga ou na inclusão.
+# O acesso por posição (registro[0], registro[5] = ...) continua funcionando
+# para os templates e para a serialização em ';'.
+
+class Registro:
+    __slots__ = ()
+    campos = ()
+    tipos = ()
+
+    def __init__(self, *valores):
+        if len(valores) != len(self.campos):
+            raise ValueError(f"{type(self).__name__} espera {len(self.campos)} campos, recebeu {len(valores)}.")
+        for nome, tipo, valor in zip(self.campos, self.tipos, valores):
+            setattr(self, nome, tipo(valor))
+
+    @classmethod
+    def de_colunas(cls, colunas):
+        # Monta os registros a partir de colunas com valores já no tipo certo
+        # (instantâneo binário). Cria e preenche os objetos via map, sem
+        # passar pelo __init__ de cada linha.
+        registros = list(map(object.__new__, itertools.repeat(cls, len(colunas[0]) if colunas else 0)))
+        for nome, coluna in zip(cls.campos, colunas):
+            collections.deque(map(getattr(cls, nome).__set__, registros, coluna), maxlen=0)
+        return registros
+
+    @property
+    def cod(self):
+        return getattr(self, self.campos[0])
+
+    def __getitem__(self, posicao):
+        return getattr(self, self.campos[posicao])
+
+    def __setitem__(self, posicao, valor):
+        setattr(self, self.campos[posicao], self.tipos[posicao](valor))
+
+    def __iter__(self):
+        for nome in self.campos:
+            yield getattr(self, nome)
+
+    def __len__(self):
+        return len(self.campos)
+
+    def __eq__(self, outro):
+        return type(self) is type(outro) and tuple(self) == tuple(outro)
+
+    def __repr__(self):
+        return f"{type(self).__name__}{tuple(self)!r}"
+
+    def para_linha(self):
+        return ";".join(map(str, self))
+
+class Cidade(Registro):
+    __slots__ = campos = ("cod_cidade", "descricao", "estado")
+    tipos = (int, str, str)
+
+class Aluno(Registro):
+    __slots__ = campos = ("cod_aluno", "nome", "cod_cidade", "data_nasc", "peso", "altura")
+    tipos = (int, str, int, str, float, float)
+
+class Professor(Registro):
+    __slots__ = campos = ("cod_professor", "nome", "endereco", "telefone", "cod_cidade")
+    tipos = (int, str, str, str, int)
+
+class Modalidade(Registro):
+    __slots__ = campos = ("cod_modalidade", "descricao", "cod_professor", "valor_aula", "limite_alunos", "total_alunos")
+    tipos = (int, str, int, float, int, int)
+
+class Matricula(Registro):
+    __slots__ = campos = ("cod_matricula", "cod_aluno", "cod_modalidade", "qtde_aulas")
+    tipos = (int, int, int, int)
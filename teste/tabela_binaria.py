@@ -0,0 +1,378 @@
+import mmap
+import os
+import struct
+import time
+from array import array
+
+# --- TABELA BINÁRIA COM REGISTROS DE TAMANHO FIXO (.dat) ---
+# Cada registro ocupa uma posição (slot) de tamanho fixo, então o slot n
+# está sempre em INICIO_DADOS + n * tamanho: incluir, alterar ou excluir um
+# registro grava só os bytes dele e o cabeçalho, sem regravar a tabela.
+#   slot = estado (1 byte) + campos empacotados com struct:
+#          int -> 'q', float -> 'd', str -> UTF-8 completado com zeros ('Ns')
+# A exclusão marca o slot como livre (lápide) e o põe na lista de livres,
+# encadeada pelos próprios slots; as inclusões reaproveitam esses slots.
+# As leituras são feitas por um mmap do arquivo.
+#
+# O índice chave -> deslocamento fica em memória e é gravado no .idx, em
+# ordem de chave, ao fechar. Enquanto a tabela está aberta com alterações o
+# cabeçalho fica marcado como "sujo": se o processo cair, o índice e a lista
+# de livres são refeitos na abertura, lendo os slots.
+
+MAGICO = b"ACADREG1"
+MAGICO_INDICE = b"ACADIDX1"
+VERSAO = 1
+CABECALHO = struct.Struct("<8sHBxIqqqqH")
+# magico, versao, limpo, tamanho do slot, slots, primeiro livre, registros
+# vivos, geração, quantidade de campos; seguem as larguras dos campos (H).
+CABECALHO_INDICE = struct.Struct("<8sqq")
+# magico, geração do .dat a que corresponde, quantidade de chaves; seguem as
+# chaves e os deslocamentos (array 'q').
+INICIO_DADOS = 4096
+VIVO = 1
+LIVRE = struct.Struct("<Bq")  # estado 0 + próximo slot livre (-1 = fim)
+LARGURA_MINIMA = 16
+FORMATOS_NUMERICOS = {int: 'q', float: 'd'}
+
+def caminho_indice(caminho_dat):
+    return os.path.splitext(caminho_dat)[0] + ".idx"
+
+def _alinhar(tamanho):
+    return (tamanho + 7) & ~7
+
+def _larguras_para(tipo, registros, minimas=None):
+    # Largura de cada campo de texto com folga de 50%, para que a maioria
+    # das alterações caiba no slot sem precisar alargar a tabela.
+    larguras = []
+    for posicao, conversor in enumerate(tipo.tipos):
+        if conversor in FORMATOS_NUMERICOS:
+            larguras.append(0)
+            continue
+        maior = max((len(registro[posicao].encode('utf-8')) for registro in registros), default=0)
+        largura = max(LARGURA_MINIMA, _alinhar(maior + maior // 2))
+        if minimas:
+            largura = max(largura, minimas[posicao])
+        larguras.append(largura)
+    return larguras
+
+def _estrutura_slot(tipo, larguras):
+    formato = "".join(FORMATOS_NUMERICOS.get(conversor) or f"{largura}s"
+                      for conversor, largura in zip(tipo.tipos, larguras))
+    tamanho = struct.calcsize("<B" + formato)
+    # O slot livre guarda o ponteiro para o próximo livre.
+    if tamanho < LIVRE.size:
+        formato += f"{LIVRE.size - tamanho}x"
+    return struct.Struct("<B" + formato)
+
+def _gravar_arquivo(caminho, tipo, registros, larguras=None):
+    # Grava a tabela inteira, compacta, na ordem recebida, e o índice junto.
+    if larguras is None:
+        larguras = _larguras_para(tipo, registros)
+    slot = _estrutura_slot(tipo, larguras)
+    textos = [posicao for posicao, conversor in enumerate(tipo.tipos)
+              if conversor not in FORMATOS_NUMERICOS]
+    geracao = time.time_ns()
+    cabecalho = CABECALHO.pack(MAGICO, VERSAO, 1, slot.size, len(registros), -1,
+                               len(registros), geracao, len(larguras))
+    cabecalho += array('H', larguras).tobytes()
+    temporario = caminho + ".tmp"
+    with open(temporario, 'wb') as f:
+        f.write(cabecalho)
+        f.write(b"\0" * (INICIO_DADOS - len(cabecalho)))
+        for registro in registros:
+            valores = list(registro)
+            for posicao in textos:
+                valores[posicao] = valores[posicao].encode('utf-8')
+            f.write(slot.pack(VIVO, *valores))
+        f.flush()
+        os.fsync(f.fileno())
+    _gravar_indice(caminho, geracao, [registro.cod for registro in registros],
+                   [INICIO_DADOS + n * slot.size for n in range(len(registros))])
+    os.replace(temporario, caminho)
+
+def _gravar_indice(caminho_dat, geracao, chaves, deslocamentos):
+    caminho = caminho_indice(caminho_dat)
+    temporario = caminho + ".tmp"
+    with open(temporario, 'wb') as f:
+        f.write(CABECALHO_INDICE.pack(MAGICO_INDICE, geracao, len(chaves)))
+        f.write(array('q', chaves).tobytes())
+        f.write(array('q', deslocamentos).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+def _ler_indice(caminho_dat, geracao):
+    # Devolve {chave: deslocamento} ou None se o .idx não corresponde ao .dat.
+    try:
+        with open(caminho_indice(caminho_dat), 'rb') as f:
+            conteudo = f.read()
+    except FileNotFoundError:
+        return None
+    if len(conteudo) < CABECALHO_INDICE.size:
+        return None
+    magico, geracao_indice, quantidade = CABECALHO_INDICE.unpack_from(conteudo)
+    if magico != MAGICO_INDICE or geracao_indice != geracao:
+        return None
+    if len(conteudo) != CABECALHO_INDICE.size + 16 * quantidade:
+        return None
+    chaves = array('q')
+    chaves.frombytes(conteudo[CABECALHO_INDICE.size:CABECALHO_INDICE.size + 8 * quantidade])
+    deslocamentos = array('q')
+    deslocamentos.frombytes(conteudo[CABECALHO_INDICE.size + 8 * quantidade:])
+    return dict(zip(chaves, deslocamentos))
+
+class TabelaBinaria:
+    def __init__(self, caminho, tipo, sincronizar_a_cada=32, intervalo_sync=0.05):
+        # Absoluto: o .idx é gravado no fechamento (atexit), quando o
+        # diretório atual pode ser outro.
+        self.caminho = os.path.abspath(caminho)
+        self.tipo = tipo
+        self.sincronizar_a_cada = sincronizar_a_cada
+        self.intervalo_sync = intervalo_sync
+        self.posicoes = {}  # chave -> slot
+        self._arquivo = None
+        self._mapa = None
+        self._pendentes = 0
+        self._ultimo_sync = time.monotonic()
+        if not os.path.exists(self.caminho):
+            _gravar_arquivo(self.caminho, tipo, [])
+        self._abrir()
+
+    def __len__(self):
+        return self.vivos
+
+    def _abrir(self):
+        # Sem buffer: o que é escrito já aparece nas leituras pelo mmap.
+        self._arquivo = open(self.caminho, 'r+b', buffering=0)
+        cabecalho = self._ler_bytes(INICIO_DADOS, 0)
+        (magico, versao, limpo, tamanho, self.slots, self.livre, self.vivos, self.geracao,
+         quantidade) = CABECALHO.unpack_from(cabecalho)
+        if magico != MAGICO or versao != VERSAO or quantidade != len(self.tipo.campos):
+            self._fechar_arquivo()
+            raise ValueError(f"{self.caminho} não é uma tabela de {self.tipo.__name__}.")
+        self.larguras = list(array('H', cabecalho[CABECALHO.size:CABECALHO.size + 2 * quantidade]))
+        self._slot = _estrutura_slot(self.tipo, self.larguras)
+        if self._slot.size != tamanho:
+            self._fechar_arquivo()
+            raise ValueError(f"{self.caminho}: tamanho de registro inconsistente.")
+        self._textos = [posicao for posicao, conversor in enumerate(self.tipo.tipos)
+                        if conversor not in FORMATOS_NUMERICOS]
+        self.limpo = bool(limpo)
+        if not self.limpo:
+            # Sujo: vale o tamanho do arquivo, que pode ter um slot incluído
+            # depois da última gravação do cabeçalho; um slot gravado pela
+            # metade no final é descartado.
+            self.slots = (os.fstat(self._arquivo.fileno()).st_size - INICIO_DADOS) // tamanho
+        self._mapear()
+        deslocamentos = _ler_indice(self.caminho, self.geracao) if self.limpo else None
+        if deslocamentos is None:
+            self._reconstruir()
+        else:
+            self.posicoes = {chave: (deslocamento - INICIO_DADOS) // tamanho
+                             for chave, deslocamento in deslocamentos.items()}
+
+    def _mapear(self):
+        if self._mapa is not None:
+            self._mapa.close()
+        self._mapa = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _ler_bytes(self, tamanho, deslocamento):
+        self._arquivo.seek(deslocamento)
+        return self._arquivo.read(tamanho)
+
+    def _escrever(self, conteudo, deslocamento):
+        self._arquivo.seek(deslocamento)
+        return self._arquivo.write(conteudo)
+
+    def _deslocamento(self, slot):
+        return INICIO_DADOS + slot * self._slot.size
+
+    def _iterar_slots(self):
+        # (slot, valores) de todos os slots, direto do mmap.
+        fim = self._deslocamento(self.slots)
+        if fim > len(self._mapa):
+            self._mapear()
+        visao = memoryview(self._mapa)[INICIO_DADOS:fim]
+        try:
+            yield from enumerate(self._slot.iter_unpack(visao))
+        finally:
+            visao.release()
+
+    def _reconstruir(self):
+        # Refaz o índice e a lista de livres a partir dos slots. A lista é
+        # regravada em ordem crescente, o que também desfaz um encadeamento
+        # deixado pela metade.
+        self.posicoes = {}
+        livres = []
+        for slot, valores in self._iterar_slots():
+            if valores[0] == VIVO:
+                self.posicoes[valores[1]] = slot
+            else:
+                livres.append(slot)
+        self._marcar_sujo()
+        self.livre = -1
+        for slot in reversed(livres):
+            self._escrever(LIVRE.pack(0, self.livre), self._deslocamento(slot))
+            self.livre = slot
+        self.vivos = len(self.posicoes)
+        self._gravar_cabecalho()
+
+    def _gravar_cabecalho(self):
+        cabecalho = CABECALHO.pack(MAGICO, VERSAO, int(self.limpo), self._slot.size, self.slots,
+                                   self.livre, self.vivos, self.geracao, len(self.larguras))
+        return self._escrever(cabecalho, 0)
+
+    def _marcar_sujo(self):
+        # Antes da primeira alteração: o .idx deixa de valer até o fechamento.
+        if self.limpo:
+            self.limpo = False
+            self.geracao += 1
+            self._gravar_cabecalho()
+            os.fsync(self._arquivo.fileno())
+
+    def _decodificar(self, valores):
+        valores = list(valores[1:])
+        for posicao in self._textos:
+            valores[posicao] = valores[posicao].rstrip(b"\0").decode('utf-8')
+        return valores
+
+    def ler_todos(self):
+        # Registros vivos na ordem dos slots, montados por colunas.
+        vivos = [valores for _, valores in self._iterar_slots() if valores[0] == VIVO]
+        if not vivos:
+            return []
+        colunas = list(zip(*vivos))[1:]
+        for posicao in self._textos:
+            colunas[posicao] = [valor.rstrip(b"\0").decode('utf-8') for valor in colunas[posicao]]
+        return self.tipo.de_colunas(colunas)
+
+    def ler(self, chave):
+        slot = self.posicoes.get(chave)
+        if slot is None:
+            return None
+        if self._deslocamento(slot + 1) > len(self._mapa):
+            self._mapear()
+        return self.tipo(*self._decodificar(self._slot.unpack_from(self._mapa, self._deslocamento(slot))))
+
+    def gravar(self, registro):
+        # Inclui ou substitui o registro. Devolve quantos bytes foram gravados.
+        valores = list(registro)
+        for posicao in self._textos:
+            valores[posicao] = valores[posicao].encode('utf-8')
+            if len(valores[posicao]) > self.larguras[posicao]:
+                return self._alargar(registro)
+        self._marcar_sujo()
+        chave = registro.cod
+        slot = self.posicoes.get(chave)
+        gravados = 0
+        if slot is None:
+            if self.livre >= 0:
+                slot = self.livre
+                self.livre = LIVRE.unpack_from(self._ler_bytes(LIVRE.size, self._deslocamento(slot)))[1]
+            else:
+                slot = self.slots
+                self.slots += 1
+            self.vivos += 1
+        gravados += self._escrever(self._slot.pack(VIVO, *valores), self._deslocamento(slot))
+        if chave not in self.posicoes:
+            self.posicoes[chave] = slot
+            gravados += self._gravar_cabecalho()
+        self._talvez_sincronizar()
+        return gravados
+
+    def excluir(self, chave):
+        slot = self.posicoes.pop(chave, None)
+        if slot is None:
+            return 0
+        self._marcar_sujo()
+        gravados = self._escrever(LIVRE.pack(0, self.livre), self._deslocamento(slot))
+        self.livre = slot
+        self.vivos -= 1
+        gravados += self._gravar_cabecalho()
+        self._talvez_sincronizar()
+        return gravados
+
+    def _alargar(self, registro):
+        # Um texto não coube no slot: regrava a tabela com campos mais largos.
+        registros = {existente.cod: existente for existente in self.ler_todos()}
+        registros[registro.cod] = registro
+        ordenados = [registros[chave] for chave in sorted(registros)]
+        larguras = _larguras_para(self.tipo, ordenados, self.larguras)
+        return self._regravar(ordenados, larguras)
+
+    def compactar(self, registros):
+        # Regrava só os registros vivos (`registros`, em ordem de chave),
+        # sem lápides.
+        return self._regravar(registros, self.larguras)
+
+    def _regravar(self, registros, larguras):
+        self._fechar_arquivo()
+        _gravar_arquivo(self.caminho, self.tipo, registros, larguras)
+        self._abrir()
+        return os.path.getsize(self.caminho)
+
+    def exportar_texto(self, caminho_txt):
+        # Grava o .txt equivalente (mesmo formato de salvar_dados).
+        registros = sorted(self.ler_todos(), key=lambda registro: registro.cod)
+        temporario = caminho_txt + ".tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            for registro in registros:
+                f.write(f"{registro.para_linha()}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho_txt)
+        return len(registros)
+
+    def _talvez_sincronizar(self):
+        self._pendentes += 1
+        if (self._pendentes >= self.sincronizar_a_cada or
+                time.monotonic() - self._ultimo_sync >= self.intervalo_sync):
+            self.sincronizar()
+
+    def sincronizar(self):
+        if self._arquivo is not None and self._pendentes:
+            os.fsync(self._arquivo.fileno())
+        self._pendentes = 0
+        self._ultimo_sync = time.monotonic()
+
+    def fechar(self, ordem=None):
+        # Grava o índice (na ordem de chave recebida, por exemplo a da
+        # árvore da tabela) e marca o arquivo como limpo.
+        if self._arquivo is None:
+            return
+        if not self.limpo:
+            self.sincronizar()
+            chaves = list(ordem) if ordem is not None else []
+            if len(chaves) != len(self.posicoes) or not all(chave in self.posicoes for chave in chaves):
+                chaves = sorted(self.posicoes)
+            _gravar_indice(self.caminho, self.geracao, chaves,
+                           [self._deslocamento(self.posicoes[chave]) for chave in chaves])
+            self.limpo = True
+            self._gravar_cabecalho()
+            os.fsync(self._arquivo.fileno())
+        self._fechar_arquivo()
+
+    def _fechar_arquivo(self):
+        if self._mapa is not None:
+            self._mapa.close()
+            self._mapa = None
+        self._arquivo.close()
+        self._arquivo = None
+
+def converter_de_texto(caminho_txt, caminho_dat, tipo):
+    registros = []
+    with open(caminho_txt, 'r', encoding='utf-8') as f:
+        for linha in f:
+            linha = linha.strip()
+            if linha:
+                registros.append(tipo(*linha.split(';')))
+    registros.sort(key=lambda registro: registro.cod)
+    _gravar_arquivo(caminho_dat, tipo, registros)
+    return len(registros)
+
+def converter_para_texto(caminho_dat, caminho_txt, tipo):
+    tabela = TabelaBinaria(caminho_dat, tipo)
+    try:
+        return tabela.exportar_texto(caminho_txt)
+    finally:
+        tabela.fechar()
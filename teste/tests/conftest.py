@@ -0,0 +1,55 @@
+import os
+import shutil
+import sys
+import pytest
+
+# Os módulos da aplicação ficam soltos em teste/ e se importam pelo nome.
+DIRETORIO_APLICACAO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIRETORIO_APLICACAO)
+
+import unidades  # noqa: E402
+
+TABELAS_TXT = ("cidades.txt", "alunos.txt", "professores.txt", "modalidades.txt", "matriculas.txt")
+
+@pytest.fixture
+def diretorio_dados(tmp_path):
+    # Cópia dos .txt de exemplo num diretório temporário.
+    for nome in TABELAS_TXT:
+        shutil.copy(os.path.join(DIRETORIO_APLICACAO, nome), tmp_path / nome)
+    return tmp_path
+
+@pytest.fixture
+def abrir_lib(diretorio_dados):
+    # Cada chamada carrega uma instância nova de gestao_academia_lib (como as
+    # unidades de unidades.py) sobre o mesmo diretório e modo de persistência.
+    abertas = []
+
+    def abrir(persistencia, **configuracao):
+        lib = unidades._nova_instancia(f"teste{len(abertas)}", str(diretorio_dados))
+        lib.configuracao["persistencia"] = persistencia
+        lib.configuracao["instantaneo"] = False
+        lib.configuracao["gravacao"] = "sincrona"
+        lib.configuracao.update(configuracao)
+        lib.carregar_dados()
+        abertas.append(lib)
+        return lib
+
+    yield abrir
+    for lib in abertas:
+        lib.fechar_diarios()
+        lib.fechar_tabelas_binarias()
+
+@pytest.fixture
+def app_teste(abrir_lib, monkeypatch):
+    # A aplicação Flask servindo uma instância nova da biblioteca (modo
+    # texto), sem CSRF e com o cache de respostas vazio.
+    import app as modulo_app
+    monkeypatch.setattr(modulo_app, "lib", abrir_lib("texto"))
+    monkeypatch.setitem(modulo_app.app.config, "WTF_CSRF_ENABLED", False)
+    modulo_app.cache.limpar()
+    yield modulo_app
+    modulo_app.cache.limpar()
+
+@pytest.fixture
+def cliente(app_teste):
+    return app_teste.app.test_client()
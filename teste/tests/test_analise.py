@@ -0,0 +1,44 @@
+import random
+from types import SimpleNamespace as _registro
+import pytest
+import analise
+
+def _dados(semente):
+    # Só os campos que ColunasAcademia lê; inclui matrículas órfãs.
+    gerador = random.Random(semente)
+    alunos = {cod: _registro(cod_cidade=gerador.randrange(1, 6)) for cod in range(1, 80)}
+    modalidades = {cod: _registro(valor_aula=round(gerador.uniform(10, 90), 2),
+                                cod_professor=gerador.randrange(1, 4)) for cod in range(1, 9)}
+    matriculas = {cod: _registro(cod_aluno=gerador.randrange(1, 85), cod_modalidade=gerador.randrange(1, 10),
+                               qtde_aulas=gerador.randrange(1, 20)) for cod in range(1, 400)}
+    return {"alunos": alunos, "modalidades": modalidades, "matriculas": matriculas}
+
+@pytest.mark.skipif(not analise.numpy_disponivel(), reason="NumPy não instalado")
+@pytest.mark.parametrize("semente", range(3))
+def test_numpy_igual_a_python(semente):
+    dados = _dados(semente)
+    com_numpy = analise.ColunasAcademia(dados).faturamento()
+    sem_numpy = analise.ColunasAcademia(dados, usar_numpy=False).faturamento()
+    assert com_numpy.keys() == sem_numpy.keys()
+    for chave, valor in sem_numpy.items():
+        assert com_numpy[chave] == pytest.approx(valor)
+    pesos = [random.Random(semente).uniform(0, 120) for _ in range(50)] + [70]
+    alturas = [random.Random(semente + 1).uniform(1.4, 2.1) for _ in range(50)] + [0]
+    imcs, diagnosticos = analise.calcular_imc_lote(pesos, alturas)
+    assert imcs == pytest.approx(analise.calcular_imc_lote(pesos, alturas, usar_numpy=False)[0])
+    assert diagnosticos == analise.calcular_imc_lote(pesos, alturas, usar_numpy=False)[1]
+    assert diagnosticos[-1] == "Altura inválida"
+
+def test_faturamento_agrupado_acompanha_alteracoes(abrir_lib):
+    lib = abrir_lib("texto")
+    primeiro = lib.get_faturamento_agrupado()
+    assert lib.get_faturamento_agrupado() is primeiro
+    assert primeiro["por_modalidade"] == {5: 800.0}
+    assert primeiro["total"] == 800.0
+    assert lib.incluir_modalidade(100, "Pilates", 2, 30.0, 10)[0]
+    assert lib.incluir_matricula(2, 69, 100, 3)[0]
+    segundo = lib.get_faturamento_agrupado()
+    assert segundo["por_modalidade"] == {5: 800.0, 100: 90.0}
+    assert segundo["por_professor"] == {1: 800.0, 2: 90.0}
+    assert segundo["por_cidade"] == {30: 890.0}
+    assert segundo["total_matriculas"] == 2
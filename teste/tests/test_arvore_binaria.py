@@ -0,0 +1,105 @@
+import random
+import pytest
+from arvore_binaria import ArvoreAVL, ArvorePersistente
+
+SEMENTES = range(5)
+
+def _conferir_nos(no):
+    # Confere balanceamento, altura e tamanho de cada nó; devolve (altura, tamanho).
+    if no is None:
+        return 0, 0
+    altura_esq, tamanho_esq = _conferir_nos(no.esquerda)
+    altura_dir, tamanho_dir = _conferir_nos(no.direita)
+    assert abs(altura_esq - altura_dir) <= 1
+    assert no.altura == max(altura_esq, altura_dir) + 1
+    assert no.tamanho == tamanho_esq + tamanho_dir + 1
+    return no.altura, no.tamanho
+
+def _conferir_arvore(arvore, chaves):
+    esperadas = sorted(chaves)
+    _, tamanho = _conferir_nos(arvore.raiz)
+    assert tamanho == arvore.quantidade == len(esperadas)
+    assert list(arvore.iterar_em_ordem()) == esperadas
+    assert arvore.obter_chaves_em_ordem() == esperadas
+
+@pytest.mark.parametrize("semente", SEMENTES)
+def test_avl_aleatoria_confere_com_conjunto(semente):
+    gerador = random.Random(semente)
+    arvore = ArvoreAVL()
+    chaves = set()
+    for passo in range(3000):
+        chave = gerador.randrange(500)
+        if gerador.random() < 0.6:
+            arvore.inserir(chave)
+            chaves.add(chave)
+        else:
+            arvore.remover(chave)
+            chaves.discard(chave)
+        assert arvore.buscar(chave) == (chave in chaves)
+        if passo % 250 == 0:
+            _conferir_arvore(arvore, chaves)
+    _conferir_arvore(arvore, chaves)
+
+@pytest.mark.parametrize("semente", SEMENTES)
+def test_avl_consultas_ordenadas(semente):
+    gerador = random.Random(semente)
+    chaves = sorted(gerador.sample(range(2000), 400))
+    arvore = ArvoreAVL().construir_de_ordenadas(chaves)
+    _conferir_arvore(arvore, chaves)
+    for _ in range(200):
+        alvo = gerador.randrange(-10, 2010)
+        menores = [chave for chave in chaves if chave < alvo]
+        assert list(arvore.iterar_em_ordem(alvo)) == [chave for chave in chaves if chave >= alvo]
+        assert list(arvore.iterar_em_ordem(alvo, inclusivo=False)) == [chave for chave in chaves if chave > alvo]
+        assert list(arvore.iterar_decrescente(alvo)) == [chave for chave in reversed(chaves) if chave <= alvo]
+        maximo = alvo + gerador.randrange(300)
+        assert list(arvore.iterar_intervalo(alvo, maximo)) == [chave for chave in chaves if alvo <= chave <= maximo]
+        assert arvore.piso(alvo) == max((chave for chave in chaves if chave <= alvo), default=None)
+        assert arvore.teto(alvo) == min((chave for chave in chaves if chave >= alvo), default=None)
+        assert arvore.posicao(alvo) == len(menores)
+        limite = gerador.randrange(0, 60)
+        assert arvore.paginar(alvo, limite) == [chave for chave in chaves if chave > alvo][:limite]
+    for indice, chave in enumerate(chaves):
+        assert arvore.selecionar(indice) == chave
+    with pytest.raises(IndexError):
+        arvore.selecionar(len(chaves))
+
+@pytest.mark.parametrize("semente", SEMENTES)
+def test_persistente_confere_com_dicionario_e_instantaneos(semente):
+    gerador = random.Random(semente)
+    arvore = ArvorePersistente()
+    esperado = {}
+    fotos = []
+    for passo in range(3000):
+        chave = gerador.randrange(400)
+        if gerador.random() < 0.6:
+            valor = gerador.random()
+            arvore.inserir(chave, valor)
+            esperado[chave] = valor
+        else:
+            arvore.remover(chave)
+            esperado.pop(chave, None)
+        assert arvore.obter(chave) == esperado.get(chave)
+        if passo % 300 == 0:
+            fotos.append((arvore.instantaneo(), dict(esperado)))
+    _conferir_arvore(arvore, esperado)
+    assert list(arvore.iterar_itens()) == sorted(esperado.items())
+    # Os instantâneos não veem nada do que foi feito depois deles.
+    for foto, conteudo in fotos:
+        _conferir_arvore(foto, conteudo)
+        assert list(foto.iterar_itens()) == sorted(conteudo.items())
+        inicio = gerador.randrange(400)
+        assert list(foto.iterar_itens(inicio, inclusivo=False)) == sorted(
+            (chave, valor) for chave, valor in conteudo.items() if chave > inicio)
+
+def test_persistente_construida_de_ordenadas():
+    chaves = list(range(0, 1000, 3))
+    arvore = ArvorePersistente().construir_de_ordenadas(chaves, [chave * 2 for chave in chaves])
+    _conferir_arvore(arvore, chaves)
+    foto = arvore.instantaneo()
+    for chave in chaves[::2]:
+        arvore.remover(chave)
+    arvore.inserir(1, "novo")
+    assert foto.obter(1) is None and arvore.obter(1) == "novo"
+    assert list(foto.iterar_itens()) == [(chave, chave * 2) for chave in chaves]
+    _conferir_arvore(arvore, set(chaves[1::2]) | {1})
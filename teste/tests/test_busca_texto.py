@@ -0,0 +1,68 @@
+import random
+import pytest
+from busca_texto import IndiceTexto, normalizar
+
+NOMES = {1: "José Antônio", 2: "JOÃO DA SILVA", 3: "Marjorie Souza", 4: "Joana d'Arc",
+         5: "Ângela Maria", 6: "Antonieta", 7: "Conceição", 8: "Cecília Jô"}
+
+def test_normalizar():
+    assert normalizar("  Ângela   MARIA ") == "angela maria"
+    assert normalizar("Conceição") == "conceicao"
+
+def test_busca_sem_acentos_nem_maiusculas():
+    indice = IndiceTexto().construir(NOMES.items())
+    assert indice.buscar("jose") == [1]
+    assert indice.buscar("ANTONIO") == [1]
+    assert indice.buscar("antô") == [6, 1]
+    assert indice.buscar("joão") == indice.buscar("JOAO") == [2]
+    assert indice.buscar("ceicao") == [7]
+    assert indice.buscar("angela m") == [5]
+    assert indice.buscar("xyz") == []
+
+def test_termo_curto_busca_so_inicio_de_palavra():
+    indice = IndiceTexto().construir(NOMES.items())
+    # "jo" está no meio de "Marjorie", mas termos com menos de 3 letras só
+    # casam com o começo das palavras (em ordem da palavra encontrada).
+    assert indice.buscar("jo") == [8, 4, 2, 1]
+    assert indice.buscar("Jô", limite=2) == [8, 4]
+    assert indice.buscar("a") == [5, 6, 1]
+    assert indice.buscar("  ") == []
+    assert 3 in indice.buscar("rjo")
+
+@pytest.mark.parametrize("semente", range(3))
+def test_inclusoes_em_lote_iguais_a_uma_a_uma(semente):
+    gerador = random.Random(semente)
+    silabas = ("ma", "ri", "jo", "sé", "an", "tô", "ção", "lu", "ci", "a")
+    um_a_um = IndiceTexto()
+    em_lote = IndiceTexto()
+    esperado = {}
+    with em_lote.em_lote():
+        for _ in range(400):
+            cod = gerador.randrange(150)
+            if gerador.random() < 0.75:
+                nome = " ".join("".join(gerador.choices(silabas, k=gerador.randrange(1, 4)))
+                                for _ in range(gerador.randrange(1, 4)))
+                esperado[cod] = nome
+                um_a_um.adicionar(cod, nome)
+                em_lote.adicionar(cod, nome)
+            else:
+                esperado.pop(cod, None)
+                um_a_um.remover(cod)
+                em_lote.remover(cod)
+    construido = IndiceTexto().construir(esperado.items())
+    for indice in (um_a_um, em_lote):
+        assert indice.nomes == construido.nomes
+        assert indice._ordenados == construido._ordenados
+        assert indice._por_nome == construido._por_nome
+    for termo in ("ma", "a", "jose", "ção", "rijo", "tô l"):
+        assert em_lote.buscar(termo) == construido.buscar(termo)
+
+def test_sincronizacao_atualiza_a_busca(abrir_lib):
+    lib = abrir_lib("sqlite")
+    outra = abrir_lib("sqlite")
+    assert lib.buscar_nomes("joana") == {"alunos": [], "cidades": [], "professores": []}
+    for cod in range(100, 150):
+        assert outra.incluir_aluno(cod, f"Joana {cod}", 30, "01/01/2000", 60, 1.6)[0]
+    assert outra.excluir_aluno(120)[0]
+    encontrados = [cod for cod, _ in lib.buscar_nomes("joana", ["alunos"], limite=100)["alunos"]]
+    assert encontrados == [cod for cod in range(100, 150) if cod != 120]
@@ -0,0 +1,63 @@
+import gzip
+import time
+from werkzeug.http import http_date
+
+ROTA = "/relatorio/faturamento"
+TABELAS = ("modalidades", "professores", "matriculas")
+
+def _obter(cliente, **cabecalhos):
+    resposta = cliente.get(ROTA, headers=cabecalhos)
+    resposta.corpo = resposta.get_data()
+    resposta.close()
+    return resposta
+
+def test_falta_em_fluxo_e_acerto_do_cache(app_teste, cliente):
+    # Dados alterados há uma hora: o Last-Modified é essa data nas duas
+    # respostas, não o momento em que a página foi gerada ou guardada.
+    app_teste.lib.alteradas_em["matriculas"] = time.time() - 3600
+    data = http_date(app_teste.lib.modificado_em(TABELAS))
+    falta = _obter(cliente)
+    assert falta.status_code == 200
+    assert "Content-Length" not in falta.headers
+    acerto = _obter(cliente)
+    assert acerto.status_code == 200
+    assert acerto.headers["Content-Length"] == str(len(falta.corpo))
+    assert acerto.corpo == falta.corpo
+    for resposta in (falta, acerto):
+        assert resposta.headers["ETag"] == falta.headers["ETag"]
+        assert resposta.headers["Last-Modified"] == data
+        assert "Accept-Encoding" in resposta.vary
+
+def test_gzip_negociado(app_teste, cliente):
+    simples = _obter(cliente)
+    comprimida = _obter(cliente, **{"Accept-Encoding": "gzip"})
+    assert comprimida.headers["Content-Encoding"] == "gzip"
+    assert comprimida.headers["ETag"] == simples.headers["ETag"][:-1] + '.gz"'
+    assert gzip.decompress(comprimida.corpo) == simples.corpo
+    assert "Content-Encoding" not in _obter(cliente, **{"Accept-Encoding": "identity"}).headers
+
+def test_304_com_a_mesma_versao(app_teste, cliente):
+    etag = _obter(cliente).headers["ETag"]
+    etag_gzip = _obter(cliente, **{"Accept-Encoding": "gzip"}).headers["ETag"]
+    assert _obter(cliente, **{"If-None-Match": etag}).status_code == 304
+    resposta = _obter(cliente, **{"If-None-Match": etag_gzip, "Accept-Encoding": "gzip"})
+    assert resposta.status_code == 304
+    assert resposta.headers["ETag"] == etag_gzip
+    # Sem a entrada no cache (outro processo, cache cheio) também.
+    app_teste.cache.limpar()
+    for conhecida in (etag, etag_gzip):
+        resposta = _obter(cliente, **{"If-None-Match": conhecida})
+        assert resposta.status_code == 304
+        assert resposta.headers["ETag"] == conhecida
+        assert "Accept-Encoding" in resposta.vary
+
+def test_alteracao_invalida_a_resposta(app_teste, cliente):
+    antiga = _obter(cliente)
+    assert b"Pilates" not in antiga.corpo
+    assert app_teste.lib.incluir_modalidade(100, "Pilates", 2, 30.0, 10)[0]
+    nova = _obter(cliente, **{"If-None-Match": antiga.headers["ETag"]})
+    assert nova.status_code == 200
+    assert nova.headers["ETag"] != antiga.headers["ETag"]
+    assert b"Pilates" in nova.corpo
+    assert "Content-Length" not in nova.headers
+    assert _obter(cliente).corpo == nova.corpo
@@ -0,0 +1,59 @@
+import threading
+from test_persistencia import _estado
+
+TODAS = {"cidades", "alunos", "professores", "modalidades", "matriculas"}
+
+def _abrir_adiada(abrir_lib, persistencia="texto"):
+    lib = abrir_lib(persistencia, carga_sob_demanda=True, pre_carga=False)
+    lib.preparar_dados()
+    return lib
+
+def _carregadas(lib):
+    return TODAS - lib.tabelas_pendentes
+
+def test_so_carrega_o_que_foi_usado(abrir_lib):
+    lib = _abrir_adiada(abrir_lib)
+    assert _carregadas(lib) == set()
+    assert not lib.estado_carga()["tabelas"]["cidades"]["carregada"]
+    assert [cidade.descricao for cidade in lib.get_pagina("cidades")["itens"]] == ["Londrina"]
+    assert _carregadas(lib) == {"cidades"}
+    # Detalhar matrículas precisa de alunos e modalidades, e só deles.
+    assert [item["aluno_nome"] for item in lib.get_pagina("matriculas")["itens"]] == ["Muriloco"]
+    assert _carregadas(lib) == {"cidades", "matriculas", "alunos", "modalidades"}
+    assert lib.estado_carga()["tabelas"]["alunos"]["carregada"]
+    assert not lib.estado_carga()["tabelas"]["professores"]["carregada"]
+
+def test_escrita_carrega_a_tabela_antes(abrir_lib):
+    # Incluir numa tabela ainda não lida não pode regravar o arquivo só com
+    # o registro novo.
+    lib = _abrir_adiada(abrir_lib)
+    assert lib.incluir_professor(100, "Ana", "Rua A, 1", "1899999999", 30)[0]
+    assert _carregadas(lib) == {"cidades", "professores"}
+    assert sorted(lib.dados["professores"]) == [1, 2, 100]
+    assert not lib.excluir_cidade(30)[0]
+    assert sorted(abrir_lib("texto").dados["professores"]) == [1, 2, 100]
+
+def test_chamada_aninhada_carrega_as_suas_tabelas(abrir_lib):
+    lib = _abrir_adiada(abrir_lib)
+    resultado = []
+
+    @lib._travar(leitura=("cidades",))
+    def externa():
+        # As travas de "cidades" já estão seguradas; a chamada interna ainda
+        # precisa ler matrículas, alunos e modalidades pela primeira vez.
+        resultado.append(lib.get_pagina("matriculas")["total"])
+
+    thread = threading.Thread(target=externa, daemon=True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive()
+    assert resultado == [1]
+    assert _carregadas(lib) == {"cidades", "matriculas", "alunos", "modalidades"}
+
+def test_carga_adiada_igual_a_completa(abrir_lib):
+    completa = _estado(abrir_lib("texto"))
+    lib = _abrir_adiada(abrir_lib)
+    lib.get_relatorio_matriculas_ordenado()
+    assert _carregadas(lib) == TODAS
+    assert _estado(lib) == completa
+    assert lib.estado_carga()["pronta"]
@@ -0,0 +1,34 @@
+import threading
+import pytest
+
+THREADS = 16
+POR_THREAD = 10
+LIMITE = 30
+
+@pytest.mark.parametrize("persistencia, gravacao", [("texto", "grupo"), ("diario", "sincrona")])
+def test_matriculas_simultaneas_nao_passam_do_limite(abrir_lib, persistencia, gravacao):
+    lib = abrir_lib(persistencia, gravacao=gravacao)
+    assert lib.incluir_modalidade(100, "Spinning", 1, 30.0, LIMITE)[0]
+    barreira = threading.Barrier(THREADS)
+    resultados = []
+
+    def matricular(indice):
+        barreira.wait()
+        for passo in range(POR_THREAD):
+            cod = 1000 + indice * POR_THREAD + passo
+            resultados.append(lib.incluir_matricula(cod, 69, 100, 2)[0])
+
+    threads = [threading.Thread(target=matricular, args=(indice,)) for indice in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    lib.descarregar_gravacoes()
+
+    assert sum(resultados) == LIMITE
+    assert lib.dados["modalidades"][100].total_alunos == LIMITE
+    assert len(lib.get_filhos("matriculas_por_modalidade", 100)) == LIMITE
+    lib.fechar_diarios()
+    reaberta = abrir_lib(persistencia)
+    assert reaberta.dados["modalidades"][100].total_alunos == LIMITE
+    assert len(reaberta.get_filhos("matriculas_por_modalidade", 100)) == LIMITE
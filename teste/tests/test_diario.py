@@ -0,0 +1,52 @@
+import random
+from diario import Diario
+
+def _aplicar(diario):
+    estado = {}
+    for operacao, campos in diario.ler():
+        if operacao == "G":
+            estado[campos[0]] = ";".join(campos)
+        elif operacao == "E":
+            estado.pop(campos[0], None)
+    return estado
+
+def test_diario_aleatorio_reaplicado_confere(tmp_path):
+    gerador = random.Random(3)
+    caminho = str(tmp_path / "cidades.log")
+    diario = Diario(caminho, sincronizar_a_cada=8)
+    esperado = {}
+    for passo in range(2000):
+        cod = str(gerador.randrange(100))
+        if gerador.random() < 0.6:
+            campos = [cod, f"Cidade {gerador.randrange(10 ** 6)}", "PR"]
+            diario.anexar("G", campos)
+            esperado[cod] = ";".join(campos)
+        else:
+            diario.anexar("E", [cod])
+            esperado.pop(cod, None)
+        if passo % 500 == 499:
+            diario.fechar()
+            assert _aplicar(Diario(caminho)) == esperado
+    diario.fechar()
+    relido = Diario(caminho)
+    assert _aplicar(relido) == esperado
+    assert relido.registros == 2000
+
+def test_linha_incompleta_no_final_e_ignorada(tmp_path):
+    caminho = tmp_path / "alunos.log"
+    diario = Diario(str(caminho))
+    diario.anexar("G", [1, "Ana", 30])
+    diario.anexar("G", [2, "Bia", 30])
+    diario.fechar()
+    with open(caminho, "a", encoding="utf-8") as f:
+        f.write("E;1")  # escrita interrompida
+    relido = Diario(str(caminho))
+    assert _aplicar(relido) == {"1": "1;Ana;30", "2": "2;Bia;30"}
+    assert relido.registros == 2
+
+def test_truncar_esvazia(tmp_path):
+    caminho = str(tmp_path / "cidades.log")
+    diario = Diario(caminho)
+    diario.anexar("G", [1, "X", "PR"])
+    diario.truncar()
+    assert _aplicar(Diario(caminho)) == {}
@@ -0,0 +1,47 @@
+import csv
+import gzip
+import io
+import json
+
+def _obter(cliente, rota, **cabecalhos):
+    resposta = cliente.get(rota, headers=cabecalhos)
+    resposta.corpo = resposta.get_data()
+    resposta.close()
+    return resposta
+
+def test_csv_e_ndjson(cliente):
+    linhas = list(csv.reader(io.StringIO(_obter(cliente, "/exportar/matriculas.csv").corpo.decode("utf-8"))))
+    assert linhas == [["cod_matricula", "cod_aluno", "cod_modalidade", "qtde_aulas"], ["1", "69", "5", "20"]]
+    registros = [json.loads(linha) for linha in _obter(cliente, "/exportar/matriculas.ndjson").corpo.splitlines()]
+    assert registros == [{"cod_matricula": 1, "cod_aluno": 69, "cod_modalidade": 5, "qtde_aulas": 20}]
+    assert _obter(cliente, "/exportar/nada.csv").status_code == 404
+    assert _obter(cliente, "/exportar/matriculas.xml").status_code == 404
+
+def test_gzip_negociado(cliente):
+    simples = _obter(cliente, "/exportar/alunos.csv")
+    comprimida = _obter(cliente, "/exportar/alunos.csv", **{"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in simples.headers
+    assert comprimida.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(comprimida.corpo) == simples.corpo
+    assert comprimida.headers["ETag"] != simples.headers["ETag"]
+    for resposta in (simples, comprimida):
+        assert "Accept-Encoding" in resposta.vary
+        assert "Last-Modified" in resposta.headers
+
+def test_304_ate_os_dados_mudarem(app_teste, cliente):
+    rota = "/exportar/relatorio_faturamento.csv"
+    etag = _obter(cliente, rota).headers["ETag"]
+    etag_gzip = _obter(cliente, rota, **{"Accept-Encoding": "gzip"}).headers["ETag"]
+    assert _obter(cliente, rota, **{"If-None-Match": etag}).status_code == 304
+    assert _obter(cliente, rota, **{"If-None-Match": etag_gzip, "Accept-Encoding": "gzip"}).status_code == 304
+    # A versão comprimida não vale para quem não aceita gzip.
+    assert _obter(cliente, rota, **{"If-None-Match": etag_gzip}).status_code == 200
+
+    # Tabela de que o relatório não depende: a versão continua a mesma.
+    assert app_teste.lib.incluir_cidade(100, "Assis", "SP")[0]
+    assert _obter(cliente, rota, **{"If-None-Match": etag}).status_code == 304
+    assert app_teste.lib.incluir_modalidade(100, "Pilates", 2, 30.0, 10)[0]
+    resposta = _obter(cliente, rota, **{"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert resposta.headers["ETag"] != etag
+    assert b"Pilates" in resposta.corpo
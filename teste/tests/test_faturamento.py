@@ -0,0 +1,48 @@
+import random
+from decimal import Decimal
+from test_persistencia import _operar
+
+def _consistente(lib):
+    assert lib.verificar_consistencia_faturamento() == (True, {})
+
+def test_acumulados_iguais_ao_recalculo(abrir_lib):
+    lib = abrir_lib("texto")
+    _consistente(lib)
+    for semente in range(5):
+        _operar(lib, semente=20 + semente, passos=60)
+        _consistente(lib)
+    # Alteração de uma matrícula existente (como a sincronização do modo
+    # "sqlite" aplica): sai a quantidade antiga, entra a nova.
+    assert lib.incluir_modalidade(200, "Pilates", 2, 30.0, 10)[0]
+    assert lib.incluir_matricula(200, 69, 200, 3)[0]
+    lib._aplicar_gravacao("matriculas", lib.Matricula(200, 69, 200, 8))
+    assert lib.aulas_por_modalidade[200] == 8
+    _consistente(lib)
+    assert lib.excluir_matricula(200)[0]
+    assert 200 not in lib.aulas_por_modalidade
+    _consistente(lib)
+
+def test_totais_da_pagina_iguais_a_soma_das_linhas(abrir_lib):
+    # Valores que não têm representação exata em float.
+    lib = abrir_lib("texto")
+    gerador = random.Random(7)
+    valores = (0.1, 0.7, 19.99, 33.33, 12.35)
+    for cod, valor in enumerate(valores, 100):
+        assert lib.incluir_modalidade(cod, f"Modalidade {cod}", 2, valor, 1000)[0]
+    for cod in range(100, 400):
+        assert lib.incluir_matricula(cod, 69, gerador.randrange(100, 105), gerador.randrange(1, 30))[0]
+
+    completo = lib.get_relatorio_matriculas_ordenado()
+    linhas = sum(Decimal(linha["valor_a_pagar"]) for linha in completo["matriculas"])
+    assert Decimal(completo["valor_total_geral"]) == linhas
+    faturamento = sum(Decimal(item["valor_faturado"]) for item in lib.get_relatorio_faturamento().values())
+    assert faturamento == linhas
+    for limite in (1, 7, 50):
+        pagina = lib.get_relatorio_matriculas_ordenado(None, limite)
+        assert pagina["valor_total_geral"] == completo["valor_total_geral"]
+        relatorio = lib.RelatorioMatriculas(150, limite)
+        assert len(list(relatorio)) == limite
+        assert relatorio.valor_total_geral == completo["valor_total_geral"]
+    relatorio = lib.RelatorioMatriculas()
+    assert sum(1 for _ in relatorio) == completo["total_matriculas"]
+    assert relatorio.valor_total_geral == completo["valor_total_geral"]
@@ -0,0 +1,58 @@
+import threading
+import pytest
+from gravacao import AgendadorGravacao
+from test_persistencia import _estado, _operar
+
+# Intervalo e limite altos: a thread de gravação não grava sozinha durante
+# o teste, só quando alguém descarrega.
+PARADO = {"gravacao_intervalo": 60, "gravacao_limite": 10 ** 6}
+CONFIGURACOES = {"sincrona": {}, "grupo": {"gravacao_intervalo": 0.001}, "assincrona": PARADO}
+
+@pytest.mark.parametrize("gravacao", CONFIGURACOES)
+def test_descarregar_grava_tudo(abrir_lib, gravacao):
+    lib = abrir_lib("texto", gravacao=gravacao, **CONFIGURACOES[gravacao])
+    _operar(lib, semente=5, passos=200)
+    esperado = _estado(lib)
+    lib.descarregar_gravacoes()
+    assert _estado(abrir_lib("texto")) == esperado
+
+def test_grupo_responde_depois_do_disco(abrir_lib):
+    lib = abrir_lib("texto", gravacao="grupo", gravacao_intervalo=0.01)
+    assert lib.incluir_cidade(100, "Assis", "SP")[0]
+    # Sem descarregar: a inclusão já estava no disco quando retornou.
+    assert 100 in abrir_lib("texto").dados["cidades"]
+
+def test_queda_antes_da_gravacao_adiada(abrir_lib):
+    lib = abrir_lib("texto", gravacao="assincrona", **PARADO)
+    antes = _estado(lib)
+    assert lib.incluir_cidade(100, "Assis", "SP")[0]
+    assert lib.incluir_aluno(100, "Joana", 100, "01/01/2000", 60, 1.6)[0]
+    # Uma queda aqui perde as alterações ainda não gravadas, mas os arquivos
+    # continuam inteiros, com o estado da última gravação.
+    assert _estado(abrir_lib("texto")) == antes
+    depois = _estado(lib)
+    lib._agendador.encerrar()
+    assert _estado(abrir_lib("texto")) == depois
+
+def test_falha_na_gravacao_mantem_tabela_suja():
+    gravadas = []
+    falhar = threading.Event()
+    falhar.set()
+
+    def gravar(tabela):
+        if falhar.is_set():
+            raise OSError("disco cheio")
+        gravadas.append(tabela)
+
+    agendador = AgendadorGravacao(gravar, intervalo=60, limite=10 ** 6)
+    bilhete = agendador.marcar("alunos")
+    with pytest.raises(OSError):
+        agendador.descarregar()
+    # Quem esperava por aquela marcação recebe o erro em vez de ficar preso.
+    with pytest.raises(OSError):
+        agendador.aguardar(bilhete)
+    falhar.clear()
+    assert agendador.descarregar() == 1
+    agendador.aguardar(bilhete)
+    agendador.encerrar()
+    assert gravadas == ["alunos"]
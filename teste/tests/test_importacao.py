@@ -0,0 +1,75 @@
+import pytest
+
+def _arquivo(diretorio, nome, linhas):
+    caminho = diretorio / nome
+    caminho.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+    return str(caminho)
+
+@pytest.mark.parametrize("persistencia", ("texto", "diario"))
+def test_arquivo_valido(abrir_lib, tmp_path, persistencia):
+    lib = abrir_lib(persistencia)
+    entradas = {
+        "cidades": _arquivo(tmp_path, "cidades.csv", ["cod,descricao,estado", "100,Assis,SP"]),
+        "alunos": _arquivo(tmp_path, "alunos.csv", ["100;Joana;100;01/01/2000;60.0;1.6",
+                                                     "101;Bruno;30;02/02/2002;80.0;1.8"]),
+        "modalidades": _arquivo(tmp_path, "modalidades.csv", ["100;Pilates;2;30.0;5;0"]),
+        "matriculas": _arquivo(tmp_path, "matriculas.csv", ["100;100;100;4", "101;101;100;2", "102;69;100;1"])
+    }
+    relatorio = lib.importar_dados(entradas, tamanho_lote=2)
+    assert relatorio.rejeitados == []
+    assert relatorio.aceitos == {"cidades": 1, "alunos": 2, "modalidades": 1, "matriculas": 3}
+    assert lib.dados["modalidades"][100].total_alunos == 3
+    assert lib.get_filhos("matriculas_por_modalidade", 100) == [100, 101, 102]
+    assert lib.get_relatorio_faturamento()[100]["valor_faturado"] == "210.00"
+    lib.fechar_diarios()
+    reaberta = abrir_lib(persistencia)
+    assert sorted(reaberta.dados["matriculas"]) == [1, 100, 101, 102]
+    assert reaberta.dados["modalidades"][100].total_alunos == 3
+
+def test_chave_estrangeira_inexistente(abrir_lib, tmp_path):
+    lib = abrir_lib("texto")
+    entradas = {
+        "alunos": _arquivo(tmp_path, "alunos.csv", ["100;Joana;999;01/01/2000;60.0;1.6",
+                                                     "101;Bruno;30;02/02/2002;80.0;1.8",
+                                                     "69;Repetido;30;02/02/2002;80.0;1.8",
+                                                     "102;Sem altura;30;02/02/2002;80.0"]),
+        # A matrícula do aluno rejeitado também é rejeitada.
+        "matriculas": _arquivo(tmp_path, "matriculas.csv", ["100;100;5;4", "101;101;5;2", "102;101;77;2"])
+    }
+    relatorio = lib.importar_dados(entradas)
+    rejeitados = {(tabela, linha): motivo for tabela, linha, motivo in relatorio.rejeitados}
+    assert rejeitados.pop(("alunos", 4)).startswith("linha inválida")
+    assert rejeitados == {
+        ("alunos", 1): "Cidade não encontrada.",
+        ("alunos", 3): "Código já existe.",
+        ("matriculas", 1): "Aluno não encontrado.",
+        ("matriculas", 3): "Modalidade não encontrada."
+    }
+    assert sorted(lib.dados["alunos"]) == [69, 101]
+    assert sorted(lib.dados["matriculas"]) == [1, 101]
+
+def test_vagas_contadas_a_partir_de_total_alunos(abrir_lib, tmp_path):
+    # A modalidade 5 dos dados de exemplo tem 1 de 2 vagas ocupada.
+    lib = abrir_lib("texto")
+    entradas = {
+        "modalidades": _arquivo(tmp_path, "modalidades.csv", ["100;Pilates;2;30.0;2;7"]),
+        "matriculas": _arquivo(tmp_path, "matriculas.csv", ["10;69;5;1", "11;69;5;1",
+                                                             "12;69;100;1", "13;69;100;1", "14;69;100;1"])
+    }
+    relatorio = lib.importar_dados(entradas)
+    assert relatorio.rejeitados == [("matriculas", 2, "Não há vagas nesta modalidade."),
+                                    ("matriculas", 5, "Não há vagas nesta modalidade.")]
+    assert lib.dados["modalidades"][5].total_alunos == 2
+    # O total_alunos de uma modalidade importada começa em zero.
+    assert lib.dados["modalidades"][100].total_alunos == 2
+    assert not lib.incluir_matricula(20, 69, 5, 1)[0]
+
+def test_vagas_iguais_as_de_incluir_matricula(abrir_lib, diretorio_dados, tmp_path):
+    # total_alunos gravado diferente do número de matrículas: a importação
+    # segue o mesmo contador que incluir_matricula usa, sem recontar.
+    (diretorio_dados / "modalidades.txt").write_text("5;Zumba;1;40.0;2;2\n", encoding="utf-8")
+    lib = abrir_lib("texto")
+    assert lib.incluir_matricula(10, 69, 5, 1) == (False, "Não há vagas nesta modalidade.")
+    relatorio = lib.importar_dados({"matriculas": _arquivo(tmp_path, "matriculas.csv", ["10;69;5;1"])})
+    assert relatorio.rejeitados == [("matriculas", 1, "Não há vagas nesta modalidade.")]
+    assert lib.dados["modalidades"][5].total_alunos == 2
@@ -0,0 +1,52 @@
+import pytest
+from test_persistencia import _operar
+
+def _reversos_esperados(lib):
+    # Os índices reversos recalculados do zero a partir das tabelas.
+    esperados = {nome: {} for nome in lib.indices_reversos}
+    for tabela, campos in lib.chaves_estrangeiras.items():
+        for nome, campo in campos.items():
+            for cod, registro in lib.dados[tabela].items():
+                esperados[nome].setdefault(getattr(registro, campo), set()).add(cod)
+    return esperados
+
+def test_exclusao_recusada_enquanto_ha_dependentes(abrir_lib):
+    # Nos dados de exemplo: aluno 69 (cidade 30) matriculado na modalidade 5,
+    # que é do professor 1; o professor 2 também é da cidade 30.
+    lib = abrir_lib("texto")
+    assert lib.excluir_aluno(69) == (False, "Não é possível excluir, aluno possui matrículas.")
+    assert lib.excluir_modalidade(5) == (False, "Não é possível excluir, modalidade possui matrículas.")
+    assert lib.excluir_professor(1) == (False, "Não é possível excluir, professor está em uma modalidade.")
+    assert not lib.excluir_cidade(30)[0]
+    assert lib.get_filhos("matriculas_por_aluno", 69) == [1]
+
+    assert lib.excluir_matricula(1)[0]
+    assert not lib.excluir_professor(1)[0]
+    assert lib.excluir_aluno(69)[0]
+    assert lib.excluir_modalidade(5)[0]
+    assert lib.excluir_professor(1)[0]
+    assert not lib.excluir_cidade(30)[0]
+    assert lib.excluir_professor(2)[0]
+    assert lib.excluir_cidade(30)[0]
+    assert lib.get_filhos("matriculas_por_aluno", 69) == []
+
+@pytest.mark.parametrize("persistencia", ("texto", "diario"))
+def test_reversos_conferem_depois_de_incluir_excluir_alterar_e_recarregar(abrir_lib, persistencia):
+    lib = abrir_lib(persistencia)
+    _operar(lib, semente=4)
+    assert lib.indices_reversos == _reversos_esperados(lib)
+
+    # Alteração de uma chave estrangeira, como a sincronização do modo
+    # "sqlite" aplica: o filho sai do pai antigo e entra no novo.
+    assert lib.incluir_cidade(200, "Assis", "SP")[0]
+    assert lib.incluir_aluno(200, "Joana", 200, "01/01/2000", 60, 1.6)[0]
+    aluno = lib.dados["alunos"][200]
+    lib._aplicar_gravacao("alunos", lib.Aluno(200, aluno.nome, 30, aluno.data_nasc, aluno.peso, aluno.altura))
+    lib._persistir("alunos", "G", 200)
+    assert 200 not in lib.indices_reversos["alunos_por_cidade"].get(200, ())
+    assert lib.excluir_cidade(200)[0]
+    assert lib.indices_reversos == _reversos_esperados(lib)
+
+    esperados = _reversos_esperados(lib)
+    lib.fechar_diarios()
+    assert abrir_lib(persistencia).indices_reversos == esperados
@@ -0,0 +1,45 @@
+import pytest
+
+TODOS = {
+    "alunos": "get_todos_alunos_detalhado",
+    "professores": "get_todos_professores_detalhado",
+    "modalidades": "get_todas_modalidades_detalhado",
+    "matriculas": "get_todas_matriculas_detalhado"
+}
+
+@pytest.mark.parametrize("tabela", TODOS)
+def test_listas_completas_iguais_as_paginas(abrir_lib, tabela):
+    lib = abrir_lib("texto")
+    assert lib.incluir_cidade(100, "Assis", "SP")[0]
+    assert lib.incluir_aluno(100, "Joana", 100, "01/01/2000", 60, 1.6)[0]
+    assert lib.incluir_modalidade(100, "Pilates", 2, 30.0, 10)[0]
+    assert lib.incluir_matricula(100, 100, 100, 4)[0]
+    todos = getattr(lib, TODOS[tabela])
+    assert todos() == lib.get_pagina(tabela, por_pagina=1000)["itens"]
+    # O resultado memorizado acompanha as alterações.
+    assert lib.incluir_aluno(101, "Bruno", 100, "02/02/2002", 80, 1.8)[0]
+    assert lib.incluir_matricula(101, 101, 100, 2)[0]
+    assert todos() == lib.get_pagina(tabela, por_pagina=1000)["itens"]
+
+def test_matriculas_paginadas_por_chave(abrir_lib):
+    lib = abrir_lib("texto")
+    assert lib.incluir_modalidade(100, "Pilates", 2, 30.0, 10)[0]
+    for cod in range(2, 8):
+        assert lib.incluir_matricula(cod, 69, 100, cod)[0]
+    pagina = lib.get_todas_matriculas_detalhado(3, 2)
+    assert [linha["cod_matricula"] for linha in pagina] == [4, 5]
+
+def test_memorizacao_descarta_so_os_menos_usados(abrir_lib, monkeypatch):
+    lib = abrir_lib("texto")
+    monkeypatch.setattr(lib, "LIMITE_CACHE_LEITURAS", 4)
+    quente = ("_chaves_ordenadas", "alunos", "nome", False, None)
+    lib.get_pagina("alunos", ordenar_por="nome")
+    for numero in range(20):
+        lib.get_pagina("alunos", ordenar_por="nome", filtro=f"termo {numero}")
+        # Cheio, o cache descarta o filtro mais antigo, não a ordenação que
+        # continua sendo pedida a cada duas buscas.
+        assert quente in lib._cache_leituras
+        assert len(lib._cache_leituras) <= 4
+        if numero % 2:
+            lib.get_pagina("alunos", ordenar_por="nome")
+    assert ("_chaves_ordenadas", "alunos", "nome", False, "termo 0") not in lib._cache_leituras
@@ -0,0 +1,93 @@
+import pytest
+
+def _preparar(lib, limite=3):
+    assert lib.incluir_aluno(100, "Joana", 30, "01/01/2000", 60, 1.6)[0]
+    assert lib.incluir_modalidade(100, "Pilates", 2, 30.0, limite)[0]
+
+def _matriculas(lib):
+    return sorted(lib.dados["matriculas"])
+
+def test_lote_com_erro_nao_grava_nada(abrir_lib):
+    lib = abrir_lib("texto")
+    _preparar(lib)
+    sucesso, _, resultados = lib.incluir_matriculas_em_lote([(10, 69, 100, 2), (11, 999, 100, 2), (12, 100, 100, 2)])
+    assert not sucesso
+    assert [ok for _, ok, _ in resultados] == [False, False, False]
+    assert resultados[1] == (11, False, "Aluno não encontrado.")
+    assert _matriculas(lib) == [1]
+    assert lib.dados["modalidades"][100].total_alunos == 0
+    # Nada foi gravado: a tabela reaberta continua igual.
+    assert _matriculas(abrir_lib("texto")) == [1]
+
+def test_lote_confere_vagas_do_lote_inteiro(abrir_lib):
+    lib = abrir_lib("texto")
+    _preparar(lib, limite=3)
+    sucesso, _, resultados = lib.incluir_matriculas_em_lote([(None, 69, 100, 1)] * 4)
+    assert not sucesso
+    assert {msg for _, _, msg in resultados} == {"Vagas insuficientes nesta modalidade (restam 3)."}
+    assert lib.incluir_matriculas_em_lote([(None, 69, 100, 1)] * 3)[0]
+    assert lib.dados["modalidades"][100].total_alunos == 3
+    # A modalidade 5 dos dados de exemplo já tem 1 de 2 vagas ocupada.
+    sucesso, _, resultados = lib.incluir_matriculas_em_lote([(None, 100, 5, 1), (None, 69, 5, 1)])
+    assert not sucesso
+    assert resultados[0][2] == "Vagas insuficientes nesta modalidade (restam 1)."
+
+def test_lote_numera_os_codigos_livres(abrir_lib):
+    lib = abrir_lib("texto")
+    _preparar(lib, limite=10)
+    sucesso, _, resultados = lib.incluir_matriculas_em_lote(
+        [(None, 69, 100, 1), (None, 100, 100, 1), (3, 69, 100, 1), (None, 100, 100, 1)])
+    assert sucesso
+    # Os automáticos continuam depois do maior código e pulam o 3 pedido
+    # mais adiante no lote.
+    assert [cod for cod, _, _ in resultados] == [2, 4, 3, 5]
+    assert _matriculas(lib) == [1, 2, 3, 4, 5]
+    assert lib.dados["modalidades"][100].total_alunos == 4
+    sucesso, _, resultados = lib.incluir_matriculas_em_lote([(6, 69, 100, 1), (6, 100, 100, 1)])
+    assert not sucesso
+    assert resultados[1][2] == "Código repetido no lote."
+    assert lib.incluir_matriculas_em_lote([]) == (False, "Nenhum item informado.", [])
+
+def test_api_lote(app_teste, cliente):
+    _preparar(app_teste.lib)
+    resposta = cliente.post("/api/matriculas/lote", json={"itens": [
+        {"cod_aluno": 69, "cod_modalidade": 100, "qtde_aulas": 2},
+        {"cod_matricula": 20, "cod_aluno": 100, "cod_modalidade": 100, "qtde_aulas": 3}
+    ]})
+    assert resposta.status_code == 200
+    assert [item["cod_matricula"] for item in resposta.get_json()["resultados"]] == [2, 20]
+
+    resposta = cliente.post("/api/matriculas/lote", json={"itens": [
+        {"cod_aluno": 69, "cod_modalidade": 100, "qtde_aulas": 2},
+        {"cod_aluno": 100, "cod_modalidade": 100, "qtde_aulas": 2}
+    ]})
+    assert resposta.status_code == 409
+    assert not resposta.get_json()["sucesso"]
+    assert _matriculas(app_teste.lib) == [1, 2, 20]
+
+@pytest.mark.parametrize("corpo", [
+    {"itens": [{"cod_aluno": 69, "cod_modalidade": 100}]},
+    {"itens": [{"cod_matricula": "x", "cod_aluno": 69, "cod_modalidade": 100, "qtde_aulas": 1}]},
+    {"itens": [{"cod_aluno": 69, "cod_modalidade": 100, "qtde_aulas": 0}]},
+    {"itens": ["69"]},
+    {"itens": None}
+])
+def test_api_lote_itens_invalidos(app_teste, cliente, corpo):
+    _preparar(app_teste.lib)
+    resposta = cliente.post("/api/matriculas/lote", json=corpo)
+    assert resposta.status_code == 400
+    assert not resposta.get_json()["sucesso"]
+    assert _matriculas(app_teste.lib) == [1]
+
+def test_formulario_lote(app_teste, cliente):
+    _preparar(app_teste.lib)
+    resposta = cliente.post("/matriculas/lote", data={"cod_modalidade": 100, "alunos": "69, 100, 999",
+                                                     "qtde_aulas": 2, "cod_inicial": ""})
+    assert resposta.status_code == 200
+    assert "Aluno não encontrado." in resposta.get_data(as_text=True)
+    assert _matriculas(app_teste.lib) == [1]
+
+    resposta = cliente.post("/matriculas/lote", data={"cod_modalidade": 100, "alunos": "69\n100",
+                                                     "qtde_aulas": 2, "cod_inicial": 30})
+    assert resposta.status_code == 302
+    assert _matriculas(app_teste.lib) == [1, 30, 31]
@@ -0,0 +1,78 @@
+import random
+import pytest
+
+MODOS = ("texto", "diario", "binario", "sqlite")
+
+def _estado(lib):
+    # Conteúdo de todas as tabelas, conferindo também os índices.
+    estado = {}
+    for tabela in lib.arquivos:
+        registros = lib.dados[tabela]
+        assert list(lib.indices[tabela].iterar_em_ordem()) == sorted(registros)
+        estado[tabela] = {cod: registro.para_linha() for cod, registro in registros.items()}
+    return estado
+
+def _operar(lib, semente, passos=300):
+    # Inclusões e exclusões aleatórias pela API pública; as que a própria
+    # biblioteca recusa (código repetido, registro em uso...) também contam.
+    gerador = random.Random(semente)
+    sucessos = 0
+    for _ in range(passos):
+        cidade = gerador.randrange(100, 110)
+        aluno = gerador.randrange(100, 140)
+        modalidade = gerador.randrange(100, 104)
+        matricula = gerador.randrange(100, 160)
+        operacoes = [
+            lambda: lib.incluir_cidade(cidade, f"Cidade {cidade}", "SP"),
+            lambda: lib.excluir_cidade(cidade),
+            lambda: lib.incluir_aluno(aluno, f"Aluno {gerador.randrange(10 ** 6)}", cidade,
+                                      "01/01/2000", 60 + gerador.random() * 40, 1.5 + gerador.random() / 2),
+            lambda: lib.excluir_aluno(aluno),
+            lambda: lib.incluir_modalidade(modalidade, f"Modalidade {modalidade}", 2, 25.5, 20),
+            lambda: lib.excluir_modalidade(modalidade),
+            lambda: lib.incluir_matricula(matricula, aluno, modalidade, gerador.randrange(1, 9)),
+            lambda: lib.incluir_matricula(matricula, aluno, modalidade, gerador.randrange(1, 9)),
+            lambda: lib.excluir_matricula(matricula)
+        ]
+        sucesso, _ = gerador.choice(operacoes)()
+        sucessos += sucesso
+    return sucessos
+
+@pytest.mark.parametrize("persistencia", MODOS)
+def test_reabrir_depois_de_fechar(abrir_lib, persistencia):
+    lib = abrir_lib(persistencia, diario_limite_compactacao=100)
+    assert _operar(lib, semente=1) > 50
+    esperado = _estado(lib)
+    lib.fechar_diarios()
+    lib.fechar_tabelas_binarias()
+    assert _estado(abrir_lib(persistencia)) == esperado
+
+@pytest.mark.parametrize("persistencia", ("diario", "binario", "sqlite"))
+def test_reabrir_sem_fechar(abrir_lib, persistencia):
+    # Como depois de uma queda: a segunda instância lê o que a primeira
+    # deixou no disco sem passar pelo fechamento.
+    lib = abrir_lib(persistencia)
+    _operar(lib, semente=2)
+    esperado = _estado(lib)
+    assert _estado(abrir_lib(persistencia)) == esperado
+
+@pytest.mark.parametrize("persistencia", ("diario", "binario", "sqlite"))
+def test_reabrir_varias_vezes(abrir_lib, persistencia):
+    esperado = None
+    for rodada in range(3):
+        lib = abrir_lib(persistencia)
+        if esperado is not None:
+            assert _estado(lib) == esperado
+        _operar(lib, semente=10 + rodada, passos=150)
+        esperado = _estado(lib)
+        lib.fechar_diarios()
+        lib.fechar_tabelas_binarias()
+    assert _estado(abrir_lib(persistencia)) == esperado
+
+def test_binario_volta_para_texto(abrir_lib):
+    lib = abrir_lib("binario")
+    _operar(lib, semente=3)
+    esperado = _estado(lib)
+    lib.converter_para_texto()
+    lib.fechar_tabelas_binarias()
+    assert _estado(abrir_lib("texto")) == esperado
@@ -0,0 +1,14 @@
+def _codigos(relatorio):
+    return [linha["cod_matricula"] for linha in relatorio["matriculas"]]
+
+def test_relatorio_le_alteracoes_de_outro_processo(abrir_lib):
+    # Duas instâncias no mesmo banco fazem o papel de dois processos: o
+    # relatório memorizado na primeira não pode esconder a matrícula que a
+    # segunda incluiu.
+    lib = abrir_lib("sqlite")
+    outra = abrir_lib("sqlite")
+    assert _codigos(lib.get_relatorio_matriculas_ordenado()) == [1]
+    assert outra.incluir_matricula(2, 69, 5, 4)[0]
+    relatorio = lib.get_relatorio_matriculas_ordenado()
+    assert _codigos(relatorio) == [1, 2]
+    assert relatorio["total_matriculas"] == 2
@@ -0,0 +1,86 @@
+import random
+import pytest
+from registros import Cidade, Aluno
+from tabela_binaria import TabelaBinaria, caminho_indice, converter_de_texto, converter_para_texto
+
+def _texto(gerador):
+    # Tamanhos variados para forçar o alargamento dos campos.
+    return "".join(gerador.choice("abcdeçãé ") for _ in range(gerador.randrange(1, 40))).strip() or "x"
+
+def _conteudo(tabela):
+    return {registro.cod: registro.para_linha() for registro in tabela.ler_todos()}
+
+def _conferir(tabela, esperado):
+    assert len(tabela) == len(esperado)
+    assert _conteudo(tabela) == esperado
+    for cod, linha in esperado.items():
+        assert tabela.ler(cod).para_linha() == linha
+
+@pytest.mark.parametrize("semente", range(4))
+def test_operacoes_aleatorias_sobrevivem_a_reabertura(tmp_path, semente):
+    gerador = random.Random(semente)
+    caminho = str(tmp_path / "cidades.dat")
+    tabela = TabelaBinaria(caminho, Cidade)
+    esperado = {}
+    for passo in range(1500):
+        cod = gerador.randrange(200)
+        if gerador.random() < 0.65:
+            registro = Cidade(cod, _texto(gerador), gerador.choice(["PR", "SP", "SC"]))
+            tabela.gravar(registro)
+            esperado[cod] = registro.para_linha()
+        else:
+            tabela.excluir(cod)
+            esperado.pop(cod, None)
+        if passo % 300 == 299:
+            # Fechamento normal: o índice salvo é reaproveitado.
+            tabela.fechar()
+            tabela = TabelaBinaria(caminho, Cidade)
+            assert tabela.limpo
+            _conferir(tabela, esperado)
+    _conferir(tabela, esperado)
+    tabela.compactar([Cidade(*linha.split(";")) for _, linha in sorted(esperado.items())])
+    _conferir(tabela, esperado)
+    tabela.fechar()
+    _conferir(TabelaBinaria(caminho, Cidade), esperado)
+
+def test_reabertura_sem_fechar_reconstroi_indice(tmp_path):
+    gerador = random.Random(7)
+    caminho = str(tmp_path / "alunos.dat")
+    tabela = TabelaBinaria(caminho, Aluno)
+    esperado = {}
+    for cod in gerador.sample(range(1000), 300):
+        registro = Aluno(cod, _texto(gerador), 1, "01/01/2000", 70.5, 1.75)
+        tabela.gravar(registro)
+        esperado[cod] = registro.para_linha()
+    for cod in list(esperado)[::3]:
+        tabela.excluir(cod)
+        del esperado[cod]
+    tabela.sincronizar()
+    # Sem fechar (como numa queda do processo): o arquivo fica marcado como
+    # sujo e a próxima abertura ignora o .idx e relê os slots.
+    reaberta = TabelaBinaria(caminho, Aluno)
+    assert not reaberta.limpo
+    _conferir(reaberta, esperado)
+    reaberta.fechar()
+    tabela._fechar_arquivo()
+
+def test_indice_de_outra_geracao_e_ignorado(tmp_path):
+    caminho = str(tmp_path / "cidades.dat")
+    tabela = TabelaBinaria(caminho, Cidade)
+    for cod in range(1, 50):
+        tabela.gravar(Cidade(cod, f"Cidade {cod}", "PR"))
+    tabela.fechar()
+    with open(caminho_indice(caminho), "r+b") as f:
+        f.seek(8)
+        f.write(b"\xff" * 8)
+    _conferir(TabelaBinaria(caminho, Cidade), {cod: f"{cod};Cidade {cod};PR" for cod in range(1, 50)})
+
+def test_conversao_de_e_para_texto(tmp_path):
+    txt = tmp_path / "cidades.txt"
+    linhas = [f"{cod};Cidade Ç {cod};SP" for cod in range(1, 30)]
+    txt.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+    dat = str(tmp_path / "cidades.dat")
+    converter_de_texto(str(txt), dat, Cidade)
+    volta = tmp_path / "volta.txt"
+    converter_para_texto(dat, str(volta), Cidade)
+    assert volta.read_text(encoding="utf-8") == txt.read_text(encoding="utf-8")
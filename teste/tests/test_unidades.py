@@ -0,0 +1,40 @@
+import multiprocessing
+import os
+import shutil
+import pytest
+import unidades
+from conftest import DIRETORIO_APLICACAO, TABELAS_TXT
+from test_persistencia import _operar
+
+@pytest.fixture
+def rede(tmp_path, monkeypatch):
+    # Três unidades com dados diferentes, cada uma no seu diretório; todas
+    # partem dos mesmos .txt, então há cidades e modalidades com o mesmo nome.
+    monkeypatch.setattr(unidades, "instancias", {})
+    for indice, nome in enumerate(("centro", "norte", "sul")):
+        diretorio = tmp_path / nome
+        diretorio.mkdir()
+        for arquivo in TABELAS_TXT:
+            shutil.copy(os.path.join(DIRETORIO_APLICACAO, arquivo), diretorio / arquivo)
+        lib = unidades._nova_instancia(f"rede-{nome}", str(diretorio))
+        lib.configuracao.update(persistencia="texto", instantaneo=False, gravacao="sincrona")
+        lib.carregar_dados()
+        _operar(lib, semente=30 + indice, passos=400)
+        unidades.instancias[nome] = lib
+    return unidades.instancias
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="sem fork")
+def test_agregacao_em_processos_igual_a_serial(rede):
+    fotos = {nome: lib.tirar_instantaneo() for nome, lib in rede.items()}
+    serial = {nome: rede[nome].agregar_instantaneo(foto) for nome, foto in fotos.items()}
+    assert sum(parcial["matriculas"] for parcial in serial.values()) > 10
+    assert unidades._agregar_em_processos(fotos) == serial
+    assert unidades._juntar(unidades._agregar_em_processos(fotos)) == unidades.relatorio_rede()
+
+def test_relatorio_da_rede_soma_as_unidades(rede):
+    relatorio = unidades.relatorio_rede()
+    assert list(relatorio["unidades"]) == ["centro", "norte", "sul"]
+    assert relatorio["matriculas"] == sum(len(lib.dados["matriculas"]) for lib in rede.values())
+    assert relatorio["matriculas"] == sum(cidade["matriculas"] for cidade in relatorio["cidades"].values())
+    assert relatorio["valor_total"] == pytest.approx(
+        sum(modalidade["valor_faturado"] for modalidade in relatorio["modalidades"].values()))
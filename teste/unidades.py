@@ -0,0 +1,119 @@
+import concurrent.futures
+import importlib.util
+import multiprocessing
+import os
+import threading
+
+# --- UNIDADES (FILIAIS DA REDE) ---
+# Com ACADEMIA_UNIDADES apontando para um diretório, cada subdiretório dele
+# é uma unidade com os seus próprios .txt. Cada unidade recebe uma instância
+# separada de gestao_academia_lib (dados, índices, travas e arquivos
+# próprios), carregada do mesmo código-fonte.
+#
+# Os relatórios da rede tiram um instantâneo de cada unidade e agregam as
+# unidades. Num processo de um só thread (scripts, lotes) a agregação é feita
+# em paralelo, em processos criados por fork que leem os instantâneos
+# herdados da memória. Com outros threads vivos (servidor Flask, gravação
+# adiada) o fork copiaria travas possivelmente presas, então as unidades são
+# agregadas no próprio processo, assim como sem fork (Windows), com uma
+# unidade só ou com poucos dados.
+
+DIRETORIO = os.environ.get("ACADEMIA_UNIDADES", "")
+CAMINHO_LIB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gestao_academia_lib.py")
+# Total de matrículas da rede a partir do qual vale a pena abrir processos.
+MINIMO_PARALELO = 20000
+
+instancias = {}
+# Instantâneos entregues aos filhos do fork; a trava cobre a atribuição e
+# toda a vida do pool.
+_fotos = {}
+_trava_fotos = threading.Lock()
+
+def carregar(diretorio=DIRETORIO):
+    # Uma instância por subdiretório, em ordem alfabética.
+    for nome in sorted(os.listdir(diretorio)):
+        caminho = os.path.join(diretorio, nome)
+        if os.path.isdir(caminho) and not nome.startswith((".", "_")):
+            instancias[nome] = _nova_instancia(nome, caminho)
+    if not instancias:
+        raise ValueError(f"Nenhuma unidade encontrada em {diretorio}.")
+    return instancias
+
+def _nova_instancia(nome, caminho):
+    especificacao = importlib.util.spec_from_file_location(f"gestao_academia_lib[{nome}]", CAMINHO_LIB)
+    modulo = importlib.util.module_from_spec(especificacao)
+    especificacao.loader.exec_module(modulo)
+    modulo.usar_diretorio(caminho)
+    return modulo
+
+def preparar():
+    for modulo in instancias.values():
+        modulo.preparar_dados()
+
+def padrao():
+    return next(iter(instancias))
+
+def estado_carga():
+    estados = {nome: modulo.estado_carga() for nome, modulo in instancias.items()}
+    return {
+        "pronta": all(estado["pronta"] for estado in estados.values()),
+        "unidades": estados,
+        "memoria_bytes": sum(estado["memoria_bytes"] for estado in estados.values())
+    }
+
+# --- RELATÓRIOS DA REDE ---
+
+def versao_rede():
+    return ".".join(modulo.versao_dados(tuple(modulo.arquivos)) for modulo in instancias.values())
+
+def modificado_em_rede():
+    return max(modulo.modificado_em(tuple(modulo.arquivos)) for modulo in instancias.values())
+
+def relatorio_rede():
+    fotos = {nome: modulo.tirar_instantaneo() for nome, modulo in instancias.items()}
+    return _juntar(_agregar_unidades(fotos))
+
+def _agregar_unidades(fotos):
+    matriculas = sum(len(foto.arvores["matriculas"]) for foto in fotos.values())
+    if (len(fotos) > 1 and matriculas >= MINIMO_PARALELO and threading.active_count() == 1 and
+            "fork" in multiprocessing.get_all_start_methods()):
+        return _agregar_em_processos(fotos)
+    return {nome: instancias[nome].agregar_instantaneo(foto) for nome, foto in fotos.items()}
+
+def _agregar_em_processos(fotos):
+    global _fotos
+    with _trava_fotos:
+        # Os filhos nascem depois desta atribuição e herdam os instantâneos.
+        _fotos = fotos
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=min(len(fotos), os.cpu_count() or 1),
+                    mp_context=multiprocessing.get_context("fork")) as executor:
+                return dict(zip(fotos, executor.map(_agregar, fotos)))
+        finally:
+            _fotos = {}
+
+def _agregar(nome):
+    return instancias[nome].agregar_instantaneo(_fotos[nome])
+
+def _juntar(parciais):
+    # Soma as unidades. Modalidades e cidades são juntadas pelo nome, já que
+    # cada unidade numera as suas.
+    rede = {"unidades": {}, "modalidades": {}, "cidades": {}, "matriculas": 0, "valor_total": 0}
+    for nome, parcial in parciais.items():
+        rede["unidades"][nome] = {"matriculas": parcial["matriculas"], "valor_total": parcial["valor_total"]}
+        rede["matriculas"] += parcial["matriculas"]
+        rede["valor_total"] += parcial["valor_total"]
+        for descricao, _, valor in parcial["faturamento"].values():
+            modalidade = rede["modalidades"].setdefault(descricao, {"valor_faturado": 0, "unidades": []})
+            modalidade["valor_faturado"] += valor
+            if nome not in modalidade["unidades"]:
+                modalidade["unidades"].append(nome)
+        for cidade, (quantidade, valor) in parcial["por_cidade"].items():
+            totais = rede["cidades"].setdefault(cidade, {"matriculas": 0, "valor_total": 0})
+            totais["matriculas"] += quantidade
+            totais["valor_total"] += valor
+    rede["modalidades"] = dict(sorted(rede["modalidades"].items(),
+                                      key=lambda item: -item[1]["valor_faturado"]))
+    rede["cidades"] = dict(sorted(rede["cidades"].items(), key=lambda item: -item[1]["matriculas"]))
+    return rede